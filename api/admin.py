@@ -1,13 +1,18 @@
+from collections import Counter
+
 from django.contrib import admin, messages
 from django import forms
 from django.db import IntegrityError, transaction
 from django.db import transaction
 from django.utils import timezone
 
-from .models import LiveSession, SeatReservation, Attendance
+from .models import LiveSession, SeatReservation, Attendance, AttendanceSegment
+from . import admission
+from .presence import broadcast_seats
+from .utils_attendance import close_segments, recompute_totals
 from .models_academics import Lesson
 
-from .models_academics import  Level, Course, Module, Lesson, LessonAsset
+from .models_academics import  Level, Course, Module, Lesson, LessonAsset, AssetBlob
 
 
 
@@ -46,10 +51,17 @@ class ModuleAdmin(admin.ModelAdmin):
 
 @admin.register(LessonAsset)
 class LessonAssetAdmin(admin.ModelAdmin):
-    list_display = ("id","org","lesson","type","ready","created_at")
-    list_filter  = ("org","type","ready")
+    list_display = ("id","org","lesson","type","ready","processing_state","processing_progress","integrity_state","created_at")
+    list_filter  = ("org","type","ready","processing_state","integrity_state")
     search_fields = ("lesson__title",)
-    readonly_fields = ("storage_key","size_bytes","created_at")
+    readonly_fields = ("storage_key","size_bytes","duration_seconds","page_count","probed_at","sha256","blob",
+                       "integrity_state","checksum_verified_at","created_at")
+
+@admin.register(AssetBlob)
+class AssetBlobAdmin(admin.ModelAdmin):
+    list_display = ("id","sha256","size_bytes","ref_count","created_at")
+    search_fields = ("sha256",)
+    readonly_fields = ("sha256","storage_key","size_bytes","ref_count","created_at")
 
 
 
@@ -95,14 +107,9 @@ class LiveSessionAdmin(admin.ModelAdmin):
     # Handy actions
     actions = ["end_session_now"]
 
-    @admin.action(description="End session now (set left_at for open attendances)")
+    @admin.action(description="End session now (close open attendance segments)")
     def end_session_now(self, request, queryset):
-        now = timezone.now()
-        updated = 0
-        with transaction.atomic():
-            for sess in queryset:
-                rows = Attendance.objects.filter(session=sess, left_at__isnull=True).update(left_at=now)
-                updated += rows
+        updated = close_segments(Attendance.objects.filter(session__in=queryset), timezone.now())
         self.message_user(request, f"Closed {updated} open attendance rows.", level=messages.SUCCESS)
 
 # -------- SeatReservation Admin --------
@@ -122,12 +129,28 @@ class SeatReservationAdmin(admin.ModelAdmin):
         n = queryset.update(state="CONFIRMED", expires_at=None)
         self.message_user(request, f"{n} reservation(s) marked CONFIRMED.", level=messages.SUCCESS)
 
-    @admin.action(description="Mark selected → RELEASEED")
+    @admin.action(description="Mark selected → RELEASED")
     def mark_released(self, request, queryset):
-        n = queryset.update(state="RELEASEED")
-        self.message_user(request, f"{n} reservation(s) marked RELEASEED.", level=messages.SUCCESS)
+        seats = list(queryset.exclude(state="RELEASED").values_list("session_id", "user_id"))
+        n = queryset.update(state="RELEASED")
+        # give the seats back to admission and tell the rooms
+        freed, taken = Counter(), {}
+        for sid, uid in seats:
+            taken[sid] = admission.release(sid, uid)
+            freed[sid] += 1
+        capacity = dict(LiveSession.objects.filter(pk__in=freed).values_list("id", "max_participants"))
+        for sid, k in freed.items():
+            broadcast_seats(sid, capacity.get(sid, 0), taken[sid], freed=k)
+        self.message_user(request, f"{n} reservation(s) marked RELEASED.", level=messages.SUCCESS)
 
 # -------- Attendance Admin --------
+class AttendanceSegmentInline(admin.TabularInline):
+    model = AttendanceSegment
+    extra = 0
+    fields = ("started_at", "ended_at", "seconds")
+    readonly_fields = ("started_at", "ended_at", "seconds")
+    can_delete = False
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ("id", "org", "session", "user", "joined_at", "left_at", "total_seconds")
@@ -137,32 +160,19 @@ class AttendanceAdmin(admin.ModelAdmin):
     raw_id_fields = ["user", "session"]
     date_hierarchy = "joined_at"
     ordering = ("-joined_at",)
+    inlines = [AttendanceSegmentInline]
 
     actions = ["close_open_and_compute", "compute_total_seconds"]
 
     @admin.action(description="Close open attendance (left_at=now) + recompute total_seconds")
     def close_open_and_compute(self, request, queryset):
-        now = timezone.now()
-        changed = 0
-        with transaction.atomic():
-            for att in queryset.select_related("session", "user"):
-                if att.left_at is None:
-                    att.left_at = now
-                if att.joined_at and att.left_at:
-                    att.total_seconds = int((att.left_at - att.joined_at).total_seconds())
-                att.save(update_fields=["left_at", "total_seconds"])
-                changed += 1
+        close_segments(queryset, timezone.now())
+        changed = recompute_totals(queryset)
         self.message_user(request, f"Updated {changed} attendance rows.", level=messages.SUCCESS)
 
-    @admin.action(description="Recompute total_seconds")
+    @admin.action(description="Recompute total_seconds (sum of segments)")
     def compute_total_seconds(self, request, queryset):
-        changed = 0
-        with transaction.atomic():
-            for att in queryset.only("id", "joined_at", "left_at"):
-                if att.joined_at and att.left_at:
-                    att.total_seconds = int((att.left_at - att.joined_at).total_seconds())
-                    att.save(update_fields=["total_seconds"])
-                    changed += 1
+        changed = recompute_totals(queryset)
         self.message_user(request, f"Recomputed {changed} rows.", level=messages.SUCCESS)
 
 # -------- Lesson Admin: expose live_session on form --------
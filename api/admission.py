@@ -0,0 +1,141 @@
+# api/admission.py
+"""
+Seat admission for LiveSession.join without touching the database.
+
+seats:<sid>          zset user_id → seat expiry (epoch sec); the live seat count
+                     (a short hold: join and every heartbeat push it SEAT_HOLD_SEC ahead)
+seats:writes         list of pending SeatReservation upserts (JSON)
+
+One Lua call drops expired seats, checks max_participants, reserves (or
+refreshes) the caller's seat and sets the key TTL, so 500 students joining in
+the same second never wait on a row lock. SeatReservation rows follow a
+moment later: api.tasks.flush_seat_writes bulk-upserts the queued writes.
+"""
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+_ADMIT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+local held = redis.call('ZSCORE', KEYS[1], ARGV[1])
+local n = redis.call('ZCARD', KEYS[1])
+if not held and n >= tonumber(ARGV[4]) then
+  return {0, n}
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+if held then return {2, n} end
+return {1, n + 1}
+"""
+
+WRITES_KEY = "seats:writes"
+FLUSH_GUARD_KEY = "seats:flush-scheduled"
+
+_scripts = {}
+
+
+def _conn():
+    conn = get_redis_connection("default")
+    if "admit" not in _scripts:
+        _scripts["admit"] = conn.register_script(_ADMIT)
+    return conn
+
+
+def seats_key(session_id) -> str:
+    return f"seats:{session_id}"
+
+
+def seat_expiry(now=None) -> int:
+    """Seats are a sliding hold: SEAT_HOLD_SEC past the last join or heartbeat."""
+    return int(now if now is not None else time.time()) + settings.SEAT_HOLD_SEC
+
+
+def _key_ttl() -> int:
+    # every score is at most now + SEAT_HOLD_SEC → the zset outlives its last seat
+    return settings.SEAT_HOLD_SEC + 60
+
+
+def admit(session, user_id) -> tuple[bool, int, int]:
+    """(admitted, seats taken, seat expiry). Re-joins keep (and refresh) their seat."""
+    conn = _conn()
+    now = int(time.time())
+    expires = seat_expiry(now)
+    status, taken = _scripts["admit"](
+        keys=[seats_key(session.pk)],
+        args=[user_id, now, expires, session.max_participants, _key_ttl()],
+        client=conn,
+    )
+    return int(status) > 0, int(taken), expires
+
+
+def slide(pipe, session_id, user_id, now: int):
+    """Queue on `pipe`: move an existing seat's expiry to now + SEAT_HOLD_SEC (heartbeats)."""
+    pipe.zadd(seats_key(session_id), {user_id: seat_expiry(now)}, xx=True)  # never re-admit
+    pipe.expire(seats_key(session_id), _key_ttl())
+
+
+def release(session_id, user_id) -> int:
+    """Give the seat back; returns seats still taken."""
+    conn = _conn()
+    pipe = conn.pipeline()
+    pipe.zrem(seats_key(session_id), user_id)
+    pipe.zcard(seats_key(session_id))
+    return int(pipe.execute()[1])
+
+
+def release_many(pairs) -> dict:
+    """Free the seats of [(session_id, user_id)] → {session_id: (seats freed, seats still taken)}."""
+    conn = _conn()
+    pipe = conn.pipeline()
+    for sid, uid in pairs:
+        pipe.zrem(seats_key(sid), uid)
+    freed = Counter(sid for (sid, _), n in zip(pairs, pipe.execute() if pairs else []) if n)
+    for sid in freed:
+        pipe.zcard(seats_key(sid))
+    return {sid: (freed[sid], int(taken)) for sid, taken in zip(freed, pipe.execute() if freed else [])}
+
+
+def holds_seat(session_id, user_id) -> bool:
+    score = _conn().zscore(seats_key(session_id), user_id)
+    return score is not None and score > time.time()
+
+
+def held_until(pairs) -> list:
+    """Seat expiry (epoch sec) or None for each (session_id, user_id), one round trip."""
+    pipe = _conn().pipeline()
+    for sid, uid in pairs:
+        pipe.zscore(seats_key(sid), uid)
+    return pipe.execute() if pairs else []
+
+
+def drop_expired(session_id) -> int:
+    """Sweep expired seats out of the live count; returns seats still taken."""
+    conn = _conn()
+    pipe = conn.pipeline()
+    pipe.zremrangebyscore(seats_key(session_id), "-inf", int(time.time()))
+    pipe.zcard(seats_key(session_id))
+    return int(pipe.execute()[1])
+
+
+def queue_write(session, user_id, state: str, expires_at=None):
+    """Buffer a SeatReservation upsert; at most one flush task per SEAT_FLUSH_DELAY_SEC."""
+    conn = _conn()
+    conn.rpush(WRITES_KEY, json.dumps({
+        "org_id": session.org_id, "session_id": session.pk, "user_id": user_id,
+        "state": state, "expires_at": expires_at,
+    }))
+    delay = settings.SEAT_FLUSH_DELAY_SEC
+    if conn.set(FLUSH_GUARD_KEY, 1, nx=True, ex=delay):
+        from .tasks import flush_seat_writes
+        flush_seat_writes.apply_async(countdown=delay)
+
+
+def pop_writes(limit: int) -> list:
+    conn = _conn()
+    pipe = conn.pipeline()  # MULTI: read + trim as one step
+    pipe.lrange(WRITES_KEY, 0, limit - 1)
+    pipe.ltrim(WRITES_KEY, limit, -1)
+    return [json.loads(r) for r in pipe.execute()[0]]
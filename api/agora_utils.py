@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.core.cache import cache
 from time import time
 try:
     from agora_token_builder import RtcTokenBuilder, RtmTokenBuilder
@@ -6,31 +7,72 @@ except Exception:
     RtcTokenBuilder = None
     RtmTokenBuilder = None
 
-def build_rtc_token(channel: str, uid: int | str, role: str = "publisher", ttl: int | None = None) -> str:
+
+def _cached(key: str, ttl: int, sign):
+    """
+    (token, expire_at) for `key`, shared by all workers through the Redis cache.
+    A token is handed out again until AGORA_TOKEN_REUSE_FRACTION of its TTL has
+    passed (the cache entry expires right then), so every caller still gets at
+    least the rest of the TTL; reconnect storms cost cache hits, not HMACs.
+    """
+    hit = cache.get(key)
+    if hit and hit["ttl"] == ttl:
+        return hit["token"], hit["expire_at"]
+    now = int(time())
+    entry = {"token": sign(now + ttl), "expire_at": now + ttl, "ttl": ttl}
+    reuse_for = int(ttl * settings.AGORA_TOKEN_REUSE_FRACTION)
+    if reuse_for > 0 and not cache.add(key, entry, reuse_for):
+        raced = cache.get(key)
+        if raced and raced["ttl"] == ttl:
+            entry = raced  # another worker signed first → hand out the same token
+        else:
+            cache.set(key, entry, reuse_for)  # entry for a different TTL → replace it
+    return entry["token"], entry["expire_at"]
+
+
+def _rtc_uid(uid) -> int:
+    # Agora SDK expects numeric uid (0 allowed). If string, force int or 0.
+    try:
+        return int(uid)
+    except Exception:
+        return 0
+
+
+def issue_rtc_token(channel: str, uid: int | str, role: str = "publisher", ttl: int | None = None) -> tuple[str, int]:
     """
-    role: "publisher" (host/teacher) or "subscriber" (student)
+    role: "publisher" (host/teacher) or "subscriber" (student) → (token, expire_at epoch sec)
     """
     app_id = settings.AGORA_APP_ID
     app_cert = settings.AGORA_APP_CERT
-    ttl = ttl or settings.AGORA_TOKEN_TTL_SEC
+    ttl = int(ttl or settings.AGORA_TOKEN_TTL_SEC)
     if not (RtcTokenBuilder and app_id and app_cert):
         # Dev fallback (DON'T use in prod)
-        return f"DUMMY_RTC_{channel}_{uid}"
+        return f"DUMMY_RTC_{channel}_{uid}", int(time()) + ttl
     # role: 1 = PUBLISHER, 2 = SUBSCRIBER
     agora_role = 1 if role.lower() == "publisher" else 2
-    expire_ts = int(time()) + int(ttl) # type: ignore
-    # Agora SDK expects numeric uid (0 allowed). If string, force int or 0.
-    try:
-        agora_uid = int(uid)
-    except Exception:
-        agora_uid = 0
-    return RtcTokenBuilder.buildTokenWithUid(app_id, app_cert, channel, agora_uid, agora_role, expire_ts)
+    agora_uid = _rtc_uid(uid)
+    return _cached(
+        f"agora:rtc:{channel}:{agora_uid}:{agora_role}", ttl,
+        lambda expire_ts: RtcTokenBuilder.buildTokenWithUid(app_id, app_cert, channel, agora_uid, agora_role, expire_ts), # type: ignore
+    )
 
-def build_rtm_token(uid: str | int, ttl: int | None = None) -> str:
+
+def issue_rtm_token(uid: str | int, ttl: int | None = None) -> tuple[str, int]:
     app_id = settings.AGORA_APP_ID
     app_cert = settings.AGORA_APP_CERT
-    ttl = ttl or settings.AGORA_TOKEN_TTL_SEC
+    ttl = int(ttl or settings.AGORA_TOKEN_TTL_SEC)
     if not (RtmTokenBuilder and app_id and app_cert):
-        return f"DUMMY_RTM_{uid}"
-    expire_ts = int(time()) + int(ttl) # type: ignore
-    return RtmTokenBuilder.buildToken(app_id, app_cert, str(uid), expire_ts) # type: ignore
+        return f"DUMMY_RTM_{uid}", int(time()) + ttl
+    return _cached(
+        f"agora:rtm:{uid}", ttl,
+        # role 1 = Role_Rtm_User
+        lambda expire_ts: RtmTokenBuilder.buildToken(app_id, app_cert, str(uid), 1, expire_ts), # type: ignore
+    )
+
+
+def build_rtc_token(channel: str, uid: int | str, role: str = "publisher", ttl: int | None = None) -> str:
+    return issue_rtc_token(channel, uid, role=role, ttl=ttl)[0]
+
+
+def build_rtm_token(uid: str | int, ttl: int | None = None) -> str:
+    return issue_rtm_token(uid, ttl=ttl)[0]
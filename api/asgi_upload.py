@@ -0,0 +1,114 @@
+# api/asgi_upload.py
+"""
+`PUT /api/assets/<id>/upload/` handled in front of Django (see loxa/asgi.py).
+
+Django's ASGI handler spools the whole request body before a view runs, and a
+sync view then holds a worker thread for the rest of the transfer. Here each
+body message is appended to the asset's staged part file as it arrives; the
+event loop only hands ~1 MiB writes (+ SHA-256) to the default executor, so
+hundreds of slow uploads cost coroutines, not threads. Bearer JWT + X-Org-ID
+only (no session/CSRF on this path). Everything else passes through to Django,
+including a multipart POST to the same URL, which Django spools before
+AssetUpload.post runs; large uploads under ASGI should use PUT.
+"""
+import asyncio
+import hashlib
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from corsheaders.conf import conf as cors_conf
+from django.db import close_old_connections
+
+from orgs.models import Org
+from .models_academics import LessonAsset
+from .upload_handlers import StagedUploadedFile, StreamingAssetUploadHandler
+from .utils_async import ais_org_member, user_from_bearer
+from .views_content import _build_media_path, finish_local_upload, upload_rejection
+
+UPLOAD_PATH = re.compile(r"^/api/assets/(\d+)/upload/?$")
+CHUNK = StreamingAssetUploadHandler.chunk_size
+
+
+def _write(f, digest, data: bytes):
+    f.write(data)
+    digest.update(data)
+
+
+def _cors_headers(origin: str) -> list:
+    # corsheaders only sees requests that reach Django
+    if not origin or not (cors_conf.CORS_ALLOW_ALL_ORIGINS or origin in cors_conf.CORS_ALLOWED_ORIGINS):
+        return []
+    headers = [(b"access-control-allow-origin", origin.encode("latin1")), (b"vary", b"origin")]
+    if cors_conf.CORS_ALLOW_CREDENTIALS:
+        headers.append((b"access-control-allow-credentials", b"true"))
+    return headers
+
+
+class StreamingUploadApp:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "PUT":
+            m = UPLOAD_PATH.match(scope["path"])
+            if m:
+                return await self.upload(int(m.group(1)), scope, receive, send)
+        return await self.app(scope, receive, send)
+
+    async def upload(self, pk, scope, receive, send):
+        headers = {k.decode("latin1").lower(): v.decode("latin1") for k, v in scope["headers"]}
+        cors = _cors_headers(headers.get("origin", ""))
+
+        async def reply(status, data):
+            body = json.dumps(data).encode()
+            await send({"type": "http.response.start", "status": status, "headers": [
+                (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *cors,
+            ]})
+            await send({"type": "http.response.body", "body": body})
+
+        # what Django's request_started/finished would do for us
+        await sync_to_async(close_old_connections)()
+        try:
+            user = await user_from_bearer(headers.get("authorization", ""))
+            if user is None:
+                return await reply(401, {"detail": "Authentication credentials were not provided."})
+            org_id = headers.get("x-org-id", "")
+            org = await Org.objects.filter(pk=org_id).afirst() if org_id.isdigit() else None
+            if not await ais_org_member(user, org):
+                return await reply(403, {"detail": "Org membership required (set X-Org-ID header)."})
+            asset = await LessonAsset.objects.filter(pk=pk, org=org).afirst()
+            if asset is None:
+                return await reply(404, {"detail": "Not found."})
+            if asset.storage_backend != "local":
+                return await reply(400, {"detail": "bucket-stored asset: use /multipart/"})
+            await self.receive_into(asset, org, receive, reply)
+        finally:
+            await sync_to_async(close_old_connections)()
+
+    async def receive_into(self, asset, org, receive, reply):
+        loop = asyncio.get_running_loop()
+        f = await loop.run_in_executor(None, StagedUploadedFile.open_for, _build_media_path(asset.storage_key))
+        digest, size, buf = hashlib.sha256(), 0, bytearray()
+        try:
+            more = True
+            while more:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return  # client went away → part file removed below
+                buf += message.get("body", b"")
+                more = message.get("more_body", False)
+                if len(buf) >= CHUNK or (not more and buf):
+                    data = bytes(buf)
+                    buf.clear()
+                    await loop.run_in_executor(None, _write, f, digest, data)
+                    size += len(data)
+                    if rejected := upload_rejection(org, asset, size):
+                        return await reply(*rejected)  # over declared size / quota → stop here
+            if not size:
+                return await reply(400, {"detail": "file required"})
+            await loop.run_in_executor(None, f.finalize, size, digest.hexdigest())
+            # short DB/rename section (CAS row locks, on_commit scheduling) → thread
+            await reply(*await sync_to_async(finish_local_upload)(asset, f))
+        finally:
+            await loop.run_in_executor(None, f.close)  # no-op once committed / linked
@@ -0,0 +1,94 @@
+# api/asset_storage.py
+"""
+Where LessonAsset bytes live. "local" = MEDIA_ROOT (upload through Django,
+serve via nginx); "s3" = any S3-compatible bucket (AWS, MinIO, ...), where
+clients upload parts directly with presigned URLs and play via presigned GETs.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+try:
+    import boto3  # type: ignore
+    from botocore.config import Config  # type: ignore
+    from botocore.exceptions import ClientError  # type: ignore
+except Exception:
+    boto3 = None
+    Config = None
+
+    class ClientError(Exception):  # without boto3 nothing raises it
+        response: dict = {}
+
+
+class S3AssetStorage:
+    name = "s3"
+
+    def __init__(self):
+        if boto3 is None:
+            raise RuntimeError("ASSET_STORAGE_BACKEND=s3 requires boto3")
+        self.bucket = settings.ASSET_S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.ASSET_S3_ENDPOINT_URL or None,  # MinIO etc.
+            region_name=settings.ASSET_S3_REGION or None,
+            aws_access_key_id=settings.ASSET_S3_ACCESS_KEY or None,
+            aws_secret_access_key=settings.ASSET_S3_SECRET_KEY or None,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),  # type: ignore
+        )
+
+    # ---- multipart upload (client → bucket, Django only signs) ----
+    def create_multipart(self, key: str, content_type: str = "application/octet-stream") -> str:
+        resp = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)
+        return resp["UploadId"]
+
+    def presign_parts(self, key: str, upload_id: str, part_count: int, ttl: int | None = None) -> list:
+        ttl = ttl or settings.ASSET_S3_PRESIGN_TTL_SEC
+        return [
+            self.client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": self.bucket, "Key": key, "UploadId": upload_id, "PartNumber": n},
+                ExpiresIn=ttl,
+            )
+            for n in range(1, part_count + 1)
+        ]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: list) -> int:
+        """parts: [{"PartNumber": 1, "ETag": "..."}]; returns the object size."""
+        parts = sorted(
+            ({"PartNumber": int(p["PartNumber"]), "ETag": p["ETag"]} for p in parts),
+            key=lambda p: p["PartNumber"],
+        )
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+        )
+        return int(self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"])
+
+    def abort_multipart(self, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    # ---- playback ----
+    def presign_get(self, key: str, ttl: int | None = None) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=ttl or settings.MEDIA_LINK_TTL_SEC,
+        )
+
+    def iter_object(self, key: str, chunk_size: int = 1024 * 1024):
+        """Stream an object's body in bounded chunks (server-side zips etc.)."""
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+@lru_cache(maxsize=1)
+def s3_storage() -> S3AssetStorage:
+    return S3AssetStorage()
+
+
+def default_backend() -> str:
+    return getattr(settings, "ASSET_STORAGE_BACKEND", "local")
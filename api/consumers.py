@@ -0,0 +1,93 @@
+# api/consumers.py
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from orgs.models import OrgMembership
+
+from . import admission, heartbeats, presence
+from .models import Attendance, LiveSession, SeatReservation
+from .models_academics import Enrollment
+from .views_sessions import _user_can_host
+
+
+def may_watch(user, sess) -> bool:
+    """
+    Roster access: a member of the session's org who is its owner or a host,
+    enrolled in a course that schedules it, or holding a seat / open attendance.
+    """
+    if sess.org_id is not None and not OrgMembership.objects.filter(org_id=sess.org_id, user=user).exists():
+        return False
+    if sess.owner_id == user.pk or _user_can_host(user, org=sess.org):
+        return True
+    if Enrollment.objects.filter(user=user, course__modules__lessons__live_session=sess).exists():
+        return True
+    if admission.holds_seat(sess.pk, user.pk):
+        return True
+    return (
+        SeatReservation.objects.filter(session=sess, user=user, state__in=["PENDING", "CONFIRMED"]).exists()
+        or Attendance.objects.filter(session=sess, user=user, left_at__isnull=True).exists()
+    )
+
+
+class SessionPresenceConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/sessions/<id>/presence/ — who is in the room, pushed instead of polled.
+
+    → on connect: {"type": "roster", "members": [...]}        (full snapshot, also after reconnects)
+    → afterwards: {"type": "join" | "leave", "member": {...}}  (diffs, via the channel layer)
+                  {"type": "seats", "capacity", "taken", "freed"}  (expired / released seats)
+    ← {"type": "ping"} → {"type": "pong", "alive"}  (also the attendance heartbeat, api.heartbeats)
+      {"type": "roster"} → fresh snapshot
+    Closes 4401 (anonymous), 4404 (no session), 4403 (not a participant, see may_watch).
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        self.session_id = int(self.scope["url_route"]["kwargs"]["session_id"])
+        self.member = None
+        if not user or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        sess = await LiveSession.objects.select_related("org").filter(pk=self.session_id).afirst()
+        if sess is None:
+            await self.close(code=4404)
+            return
+        if not await sync_to_async(may_watch)(user, sess):
+            await self.close(code=4403)
+            return
+        self.group = presence.group_name(self.session_id)
+        self.member = presence.member_of(user)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+        if await presence.add_member(self.session_id, self.member):
+            await self.channel_layer.group_send(self.group, {"type": "presence.join", "member": self.member})
+        await self.send_roster()
+
+    async def disconnect(self, code):
+        if self.member is None:
+            return
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+        if await presence.remove_member(self.session_id, self.member["user_id"]):
+            await self.channel_layer.group_send(self.group, {"type": "presence.leave", "member": self.member})
+
+    async def receive_json(self, content, **kwargs):
+        kind = content.get("type") if isinstance(content, dict) else None
+        if kind == "ping":
+            alive = await sync_to_async(heartbeats.beat)(self.session_id, self.member["user_id"])  # type: ignore
+            await self.send_json({"type": "pong", "alive": alive})
+        elif kind == "roster":
+            await self.send_roster()
+
+    async def send_roster(self):
+        await self.send_json({"type": "roster", "members": await presence.snapshot(self.session_id)})
+
+    # ---- channel layer events ----
+    async def presence_join(self, event):
+        if event["member"]["user_id"] != self.member["user_id"]:  # type: ignore
+            await self.send_json({"type": "join", "member": event["member"]})
+
+    async def presence_leave(self, event):
+        await self.send_json({"type": "leave", "member": event["member"]})
+
+    async def presence_seats(self, event):
+        await self.send_json({"type": "seats", **{k: event[k] for k in ("capacity", "taken", "freed")}})
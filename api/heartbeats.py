@@ -0,0 +1,68 @@
+# api/heartbeats.py
+"""
+Attendance last-seen in Redis, so a heartbeat costs no database write:
+
+attendance:seen      zset "<sid>:<uid>" → last heartbeat (epoch sec)
+
+join adds the member, leave removes it, heartbeats (HTTP or the presence
+socket's ping) only refresh members that exist, and slide the member's seat
+hold (api.admission) in the same round trip. api.tasks.flush_attendance
+turns the zset into Attendance/AttendanceSegment rows in bulk: open segments
+run up to the last heartbeat, and members silent longer than
+HEARTBEAT_TIMEOUT_SEC (crashed apps, closed tabs) are closed there and lose
+their seat. Join counts as the first heartbeat: a client that never pings is
+closed HEARTBEAT_TIMEOUT_SEC after joining.
+"""
+import time
+
+from django_redis import get_redis_connection
+
+from . import admission
+
+SEEN_KEY = "attendance:seen"
+
+
+def _member(session_id, user_id) -> str:
+    return f"{session_id}:{user_id}"
+
+
+def parse(member) -> tuple[int, int]:
+    sid, uid = (member.decode() if isinstance(member, bytes) else member).split(":")
+    return int(sid), int(uid)
+
+
+def start(session_id, user_id):
+    get_redis_connection("default").zadd(SEEN_KEY, {_member(session_id, user_id): int(time.time())})
+
+
+def beat(session_id, user_id) -> bool:
+    """False when the user is not (or no longer) in the session → client should re-join."""
+    now = int(time.time())
+    pipe = get_redis_connection("default").pipeline()
+    pipe.zadd(SEEN_KEY, {_member(session_id, user_id): now}, xx=True)  # never resurrect
+    pipe.zscore(SEEN_KEY, _member(session_id, user_id))
+    admission.slide(pipe, session_id, user_id, now)
+    return pipe.execute()[1] is not None
+
+
+def stop(session_id, user_id):
+    get_redis_connection("default").zrem(SEEN_KEY, _member(session_id, user_id))
+
+
+def snapshot() -> list:
+    """[(member, last_seen)]; one entry per open attendance, so this stays small."""
+    return get_redis_connection("default").zrange(SEEN_KEY, 0, -1, withscores=True)
+
+
+def forget(entries: list) -> list:
+    """Drop [(member, last_seen)] unless a heartbeat arrived since (racing re-join); returns the dropped members."""
+    if not entries:
+        return []
+    conn = get_redis_connection("default")
+    pipe = conn.pipeline()
+    for m, _ in entries:
+        pipe.zscore(SEEN_KEY, m)
+    stale = [m for (m, ts), now in zip(entries, pipe.execute()) if now is not None and now <= ts]
+    if stale:
+        conn.zrem(SEEN_KEY, *stale)
+    return stale
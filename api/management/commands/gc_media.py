@@ -0,0 +1,186 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models_academics import AssetBlob, LessonAsset
+from api.utils_renditions import DERIVED_ROOTS, storage_dir
+
+
+def _walk_files(top):
+    """Iterative os.scandir walk; yields DirEntry for regular files only."""
+    stack = [top]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    yield e
+
+
+def _whole_chunk(rel):
+    # lesson dirs (org/<id>/lesson/<id>/, org/<id>/course/<id>/lesson/<id>/) and cas/<aa>/<bb>/
+    parts = rel.rstrip("/").split("/")
+    return (parts[0] == "cas" and len(parts) == 3) or (parts[0] == "org" and len(parts) >= 4 and parts[-2] == "lesson")
+
+
+def _chunks(root):
+    """
+    (prefix, whole) pairs. Every lesson / cas/<aa>/<bb>/ dir is one whole chunk,
+    so the referenced set is per lesson however big the org; the dirs above
+    them only contribute the loose files sitting directly inside.
+    """
+    stack = ["cas/", "org/"]
+    while stack:
+        rel = stack.pop()
+        try:
+            it = os.scandir(os.path.join(root, rel))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with it:
+            subs = sorted(f"{rel}{e.name}/" for e in it if e.is_dir(follow_symlinks=False))
+        yield rel, False
+        for sub in subs:
+            if _whole_chunk(sub):
+                yield sub, True
+        stack.extend(reversed([sub for sub in subs if not _whole_chunk(sub)]))
+
+
+def _loose_files(top):
+    try:
+        it = os.scandir(top)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    with it:
+        return [e for e in it if e.is_file(follow_symlinks=False)]
+
+
+def _referenced(prefixes=(), keys=()):
+    """Keys + asset dirs of everything stored under `prefixes` or at exactly `keys`."""
+    assets, blobs = Q(storage_key__in=keys) | Q(file__in=keys), Q(storage_key__in=keys)
+    for prefix in prefixes:
+        assets |= Q(storage_key__startswith=prefix) | Q(file__startswith=prefix)
+        blobs |= Q(storage_key__startswith=prefix)
+    exact, dirs = set(), set()
+    rows = LessonAsset.objects.filter(assets).values_list("storage_key", "file")
+    for key, name in rows.iterator(chunk_size=2000):
+        for k in (key, name):
+            if k:
+                exact.add(k)
+                dirs.add(storage_dir(k))
+    for key in AssetBlob.objects.filter(blobs).values_list("storage_key", flat=True):
+        exact.add(key)
+        dirs.add(storage_dir(key))
+    return exact, dirs
+
+
+def _owner_dirs(rel):
+    """Asset dirs `rel` would be a derived output of (…/<dir>/hls/…, …/<dir>/poster.jpg)."""
+    parts = rel.split("/")
+    return {"/".join(parts[:i]) + "/" for i in range(1, len(parts)) if parts[i] in DERIVED_ROOTS}
+
+
+def abandoned_placeholders(cutoff):
+    """
+    AssetInitAsync rows whose upload never arrived: nothing recorded (size, hash,
+    file, CAS blob), local backend, and no bytes at storage_key. Anything
+    else with ready=False (viewset/admin uploads, FAILED transcodes, bucket
+    objects) is real content and stays.
+    """
+    rows = (LessonAsset.objects
+            .filter(ready=False, created_at__lt=cutoff, size_bytes=0, sha256="",
+                    blob__isnull=True, storage_backend="local")
+            .filter(Q(file="") | Q(file__isnull=True))
+            .exclude(processing_state__in=["QUEUED", "RUNNING"])
+            .values_list("id", "storage_key"))
+    for pk, key in rows.iterator(chunk_size=2000):
+        try:
+            if key and os.path.getsize(os.path.join(settings.MEDIA_ROOT, key)) > 0:
+                continue
+        except OSError:
+            pass  # nothing on disk
+        yield pk
+
+
+def _is_referenced(rel, exact, dirs):
+    if rel in exact:
+        return True
+    parts = rel.split("/")
+    for i in range(len(parts) - 1, 0, -1):
+        if parts[i] in DERIVED_ROOTS and "/".join(parts[:i]) in dirs:
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = ("Delete media files under MEDIA_ROOT/org and MEDIA_ROOT/cas that no LessonAsset "
+            "references, and assets/init placeholders whose upload never arrived.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--placeholder-hours", type=int, default=24,
+                            help="delete never-uploaded assets/init placeholders older than this (0 = skip)")
+        parser.add_argument("--min-age-hours", type=float, default=6,
+                            help="never touch files modified more recently (in-flight uploads/transcodes)")
+
+    def handle(self, *args, **opts):
+        dry = opts["dry_run"]
+        verbose = opts["verbosity"] > 1
+
+        if opts["placeholder_hours"]:
+            cutoff = timezone.now() - timedelta(hours=opts["placeholder_hours"])
+            ids = []
+            for pk in abandoned_placeholders(cutoff):
+                ids.append(pk)
+                if len(ids) >= 100_000:
+                    break
+            if not dry:
+                for i in range(0, len(ids), 1000):
+                    # per-row post_delete releases CAS blobs / bucket objects
+                    LessonAsset.objects.filter(pk__in=ids[i:i + 1000]).delete()
+            self.stdout.write(f"placeholders: {'would delete' if dry else 'deleted'} {len(ids)}")
+
+        root = settings.MEDIA_ROOT
+        newest = time.time() - opts["min_age_hours"] * 3600
+        scanned = removed = freed = 0
+        for prefix, whole in _chunks(root):
+            if whole:
+                entries = _walk_files(os.path.join(root, prefix))
+                exact, dirs = _referenced(prefixes=[prefix])
+            else:
+                entries = _loose_files(os.path.join(root, prefix))
+                if not entries:
+                    continue
+                keys = [prefix + e.name for e in entries]
+                exact, dirs = _referenced(set().union(*map(_owner_dirs, keys)), keys)
+            for entry in entries:
+                scanned += 1
+                rel = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                if _is_referenced(rel, exact, dirs):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                if st.st_mtime > newest:
+                    continue
+                removed += 1
+                freed += st.st_size
+                if verbose:
+                    self.stdout.write(f"orphan: {rel}")
+                if not dry:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+        verb = "would remove" if dry else "removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"scanned {scanned} file(s), {verb} {removed} orphan(s), {freed / 1024 / 1024:.1f} MiB"
+        ))
@@ -0,0 +1,73 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.media_probe import probe_file
+from api.models_academics import LessonAsset
+from api.utils_quota import charge_storage
+
+
+def _probe(job):
+    pk, path, asset_type = job
+    try:
+        return pk, probe_file(path, asset_type)
+    except Exception:
+        return pk, None
+
+
+class Command(BaseCommand):
+    help = "Backfill LessonAsset size/duration/page_count in parallel (ffprobe / pypdf)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="re-probe assets that were already probed")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+        parser.add_argument("--batch", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        # workers read MEDIA_ROOT → local assets; viewset uploads keep their bytes at `file`
+        qs = (LessonAsset.objects.filter(storage_backend="local")
+              .exclude(Q(storage_key=""), Q(file="") | Q(file__isnull=True)))
+        if not opts["all"]:
+            qs = qs.filter(probed_at__isnull=True)
+        rows = qs.order_by("id").values_list("id", "storage_key", "file", "type")
+
+        done = failed = 0
+        batch = []
+        with ProcessPoolExecutor(max_workers=opts["workers"]) as pool:
+            jobs = ((pk, os.path.join(settings.MEDIA_ROOT, name or key), t) for pk, key, name, t in rows.iterator())
+            for pk, meta in pool.map(_probe, jobs, chunksize=8):
+                if meta is None:
+                    failed += 1
+                    continue
+                batch.append(LessonAsset(pk=pk, probed_at=timezone.now(), **meta))
+                if len(batch) >= opts["batch"]:
+                    done += self._flush(batch)
+        done += self._flush(batch)
+        self.stdout.write(self.style.SUCCESS(f"probed {done} asset(s), {failed} failed"))
+
+    def _flush(self, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            # size_bytes may change → move each org's storage_used_bytes by the difference
+            old = LessonAsset.objects.select_for_update().filter(pk__in=[a.pk for a in batch]).order_by("pk")
+            old = {pk: (org_id, size) for pk, org_id, size in old.values_list("pk", "org_id", "size_bytes")}
+            LessonAsset.objects.bulk_update(
+                batch, ["size_bytes", "duration_seconds", "page_count", "probed_at"]
+            )
+            delta = Counter()
+            for a in batch:
+                if a.pk in old:
+                    org_id, size = old[a.pk]
+                    delta[org_id] += a.size_bytes - size
+            for org_id, d in delta.items():
+                charge_storage(org_id, d)
+        n = len(batch)
+        batch.clear()
+        return n
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from api.models_academics import LessonAsset
+from orgs.models import Org
+
+
+class Command(BaseCommand):
+    help = "Rebuild Org.storage_used_bytes from SUM(LessonAsset.size_bytes) (one grouped query)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            # lock org rows so concurrent F() increments wait instead of being overwritten
+            orgs = list(Org.objects.select_for_update().only("id", "storage_used_bytes"))
+            totals = dict(
+                LessonAsset.objects.filter(org__isnull=False)
+                .values_list("org_id")
+                .annotate(total=Sum("size_bytes"))
+                .order_by()
+            )
+            changed = []
+            for org in orgs:
+                total = totals.get(org.pk) or 0
+                if org.storage_used_bytes != total:
+                    self.stdout.write(f"org {org.pk}: {org.storage_used_bytes} → {total}")
+                    org.storage_used_bytes = total
+                    changed.append(org)
+            if not opts["dry_run"]:
+                Org.objects.bulk_update(changed, ["storage_used_bytes"], batch_size=500)
+        verb = "would fix" if opts["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{len(orgs)} org(s), {verb} {len(changed)}"))
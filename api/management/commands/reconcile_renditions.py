@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api.models_academics import LessonAsset
+from api.utils_renditions import detect_renditions
+
+
+class Command(BaseCommand):
+    help = "Re-scan asset directories and fix LessonAsset.renditions for files changed out of band."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--batch", type=int, default=500)
+        parser.add_argument("--asset", type=int, action="append", help="limit to asset id (repeatable)")
+
+    def handle(self, *args, **opts):
+        qs = LessonAsset.objects.exclude(storage_key="").only("id", "type", "storage_key", "renditions")
+        if opts["asset"]:
+            qs = qs.filter(pk__in=opts["asset"])
+
+        scanned = changed = 0
+        batch = []
+        for asset in qs.order_by("id").iterator(chunk_size=opts["batch"]):
+            scanned += 1
+            found = detect_renditions(asset.storage_key, asset.type)
+            if found == (asset.renditions or {}):
+                continue
+            changed += 1
+            if opts["verbosity"] > 1:
+                self.stdout.write(f"asset {asset.pk}: {asset.renditions} -> {found}")
+            asset.renditions = found
+            batch.append(asset)
+            if len(batch) >= opts["batch"] and not opts["dry_run"]:
+                LessonAsset.objects.bulk_update(batch, ["renditions"])
+                batch.clear()
+        if batch and not opts["dry_run"]:
+            LessonAsset.objects.bulk_update(batch, ["renditions"])
+
+        verb = "would update" if opts["dry_run"] else "updated"
+        self.stdout.write(self.style.SUCCESS(f"scanned {scanned}, {verb} {changed}"))
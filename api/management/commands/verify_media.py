@@ -0,0 +1,118 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models_academics import LessonAsset
+
+CHECKPOINT_KEY = "verify_media:last_id"
+CHUNK = 1024 * 1024
+
+_rate = 0.0  # bytes/sec per worker process, 0 = unthrottled
+
+
+def _init_worker(rate):
+    global _rate
+    _rate = rate
+    try:
+        os.nice(10)  # CPU priority below the web/transcode processes
+    except OSError:
+        pass
+
+
+def _hash(job):
+    """(key, sha256 | None) — None when the file is gone or can't be read (EIO, EACCES, ...)."""
+    key, path = job
+    digest = hashlib.sha256()
+    started, read = time.monotonic(), 0
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK):
+                digest.update(chunk)
+                read += len(chunk)
+                if _rate:
+                    ahead = read / _rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            if hasattr(os, "posix_fadvise"):
+                # a full pass would otherwise push hot media out of the page cache
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:  # one bad file must not abort the pool.map for the whole run
+        return key, None
+    return key, digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = ("Re-hash local LessonAsset sources in parallel and flag MISMATCH / MISSING files. "
+            "Resumes from the last checkpoint; assets without a stored sha256 get one recorded.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--max-mbps", type=float, default=50,
+                            help="total read budget in MB/s shared by all workers (0 = unthrottled)")
+        parser.add_argument("--batch", type=int, default=200)
+        parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first asset")
+
+    def handle(self, *args, **opts):
+        start_after = 0 if opts["restart"] else int(cache.get(CHECKPOINT_KEY) or 0)
+        if start_after:
+            self.stdout.write(f"resuming after asset {start_after}")
+        rows = (LessonAsset.objects
+                .filter(pk__gt=start_after, storage_backend="local", ready=True)  # uploads in flight are partial
+                .exclude(Q(storage_key=""), Q(file="") | Q(file__isnull=True))  # nothing on disk to hash
+                .order_by("id")
+                .values_list("id", "storage_key", "file", "sha256", "blob_id"))
+
+        workers = max(1, opts["workers"])
+        rate = opts["max_mbps"] * 1_000_000 / workers
+        self.counts = {"OK": 0, "MISMATCH": 0, "MISSING": 0, "RECORDED": 0}
+        self.blob_digests = {}  # CAS blob id → digest, so a shared blob is read once per run
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rate,)) as pool:
+            # bounded windows: memory stays flat and each window ends in a checkpoint
+            window = []
+            for row in rows.iterator(chunk_size=2000):
+                window.append(row)
+                if len(window) >= opts["batch"]:
+                    self._verify(pool, window)
+                    window = []
+            self._verify(pool, window)
+        cache.delete(CHECKPOINT_KEY)  # full pass done → next run starts over
+        self.stdout.write(self.style.SUCCESS(
+            "verified: {OK} ok, {MISMATCH} mismatch, {MISSING} missing, {RECORDED} baseline(s) recorded".format(**self.counts)
+        ))
+
+    def _verify(self, pool, window):
+        if not window:
+            return
+        # viewset uploads live at `file`; AssetInitAsync / CAS ones at storage_key
+        jobs = {}  # CAS blob id, or ("asset", pk) for a private file → path
+        for pk, key, name, _, blob_id in window:
+            job = blob_id or ("asset", pk)
+            if job not in self.blob_digests:
+                jobs.setdefault(job, os.path.join(settings.MEDIA_ROOT, name or key))
+        digests = dict(pool.map(_hash, jobs.items()))
+        self.blob_digests.update((job, d) for job, d in digests.items() if not isinstance(job, tuple))
+        now = timezone.now()
+        checked, baselines = [], []
+        for pk, _, _, sha, blob_id in window:
+            digest = self.blob_digests[blob_id] if blob_id else digests[("asset", pk)]
+            a = LessonAsset(pk=pk, checksum_verified_at=now)
+            if digest and not sha:
+                a.sha256, a.integrity_state = digest, "OK"  # first baseline
+                baselines.append(a)
+                self.counts["RECORDED"] += 1
+                continue
+            a.integrity_state = "MISSING" if digest is None else ("OK" if digest == sha else "MISMATCH")
+            self.counts[a.integrity_state] += 1
+            if a.integrity_state != "OK":
+                self.stderr.write(f"asset {pk}: {a.integrity_state}")
+            checked.append(a)
+        LessonAsset.objects.bulk_update(checked, ["integrity_state", "checksum_verified_at"])
+        LessonAsset.objects.bulk_update(baselines, ["sha256", "integrity_state", "checksum_verified_at"])
+        cache.set(CHECKPOINT_KEY, window[-1][0], None)
@@ -0,0 +1,83 @@
+# api/media_ffmpeg.py
+"""Thin wrappers around the local ffmpeg/ffprobe binaries (used by Celery workers only)."""
+import json
+import subprocess
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+class MediaToolError(RuntimeError):
+    pass
+
+
+def ffprobe(path: str) -> dict:
+    """
+    Return {"duration": float, "width": int, "height": int, "has_audio": bool}.
+    """
+    cmd = [
+        settings.FFPROBE_BIN, "-v", "error", "-print_format", "json",
+        "-show_format", "-show_streams", path,
+    ]
+    timeout = int(getattr(settings, "FFPROBE_TIMEOUT_SEC", 60))
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise MediaToolError(f"ffprobe timed out after {timeout}s")
+    if proc.returncode != 0:
+        raise MediaToolError(proc.stderr.strip()[-500:] or "ffprobe failed")
+    info = json.loads(proc.stdout or "{}")
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    try:
+        duration = float(info.get("format", {}).get("duration") or video.get("duration") or 0)
+    except (TypeError, ValueError):
+        duration = 0.0
+    return {
+        "duration": duration,
+        "width": int(video.get("width") or 0),
+        "height": int(video.get("height") or 0),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def run_ffmpeg(args: list, duration: float = 0.0, on_progress=None):
+    """
+    Run ffmpeg with `-progress pipe:1` and call on_progress(percent) whenever
+    the integer percentage changes. Killed after FFMPEG_TIMEOUT_SEC.
+    """
+    cmd = [settings.FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y",
+           "-progress", "pipe:1", "-nostats", *args]
+    timeout = int(getattr(settings, "FFMPEG_TIMEOUT_SEC", 6 * 3600))
+    expired = threading.Event()
+    # stderr into a file: only stdout is read here, a full stderr pipe would stall ffmpeg
+    with tempfile.TemporaryFile(mode="w+") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err, text=True)
+        timer = threading.Timer(timeout, lambda: (expired.set(), proc.kill()))
+        timer.start()
+        try:
+            last = -1
+            for line in proc.stdout:  # type: ignore
+                key, _, value = line.strip().partition("=")
+                if key != "out_time_us" or not duration or on_progress is None:
+                    continue
+                try:
+                    pct = min(99, int(int(value) / 1_000_000 / duration * 100))
+                except ValueError:
+                    continue
+                if pct > last:
+                    last = pct
+                    on_progress(pct)
+            code = proc.wait()
+        finally:
+            timer.cancel()
+            if proc.poll() is None:  # on_progress raised
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()  # type: ignore
+        if expired.is_set():
+            raise MediaToolError(f"ffmpeg timed out after {timeout}s")
+        if code != 0:
+            err.seek(0)
+            raise MediaToolError(err.read().strip()[-500:] or "ffmpeg failed")
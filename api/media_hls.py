@@ -0,0 +1,90 @@
+# api/media_hls.py
+"""
+Transcode an asset source into an HLS ABR ladder beside it:
+
+<base_dir>/hls/index.m3u8             master playlist (what AssetPlayAsync serves)
+<base_dir>/hls/<720p>/index.m3u8      variant playlists
+<base_dir>/hls/<720p>/seg_00001.ts    segments
+"""
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+
+from .media_ffmpeg import ffprobe, run_ffmpeg
+
+# (name, height, video kbps, audio kbps)
+DEFAULT_LADDER = [
+    ("1080p", 1080, 5000, 128),
+    ("720p", 720, 2800, 128),
+    ("480p", 480, 1400, 96),
+    ("360p", 360, 800, 64),
+]
+
+
+def ladder_for(height: int) -> list:
+    """Never upscale: keep rungs at or below the source height (at least the lowest one)."""
+    ladder = getattr(settings, "HLS_LADDER", None) or DEFAULT_LADDER
+    rungs = [r for r in ladder if not height or r[1] <= height]
+    return rungs or [ladder[-1]]
+
+
+def _write_master(path: str, rungs: list, info: dict):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for name, h, vk, ak in rungs:
+        bw = (vk + (ak if info["has_audio"] else 0)) * 1000
+        attrs = f"BANDWIDTH={bw}"
+        if info["width"] and info["height"]:
+            w = int(round(info["width"] * h / info["height"] / 2)) * 2
+            attrs += f",RESOLUTION={w}x{h}"
+        lines += [f"#EXT-X-STREAM-INF:{attrs}", f"{name}/index.m3u8"]
+    with open(path, "w") as out:
+        out.write("\n".join(lines) + "\n")
+
+
+def build_hls(src: str, base_dir: str, on_progress=None) -> str:
+    """
+    Write the ladder into a scratch dir and rename it to `hls` at the end, so a
+    half-written ladder is never visible to players. Returns the hls dir path.
+    """
+    info = ffprobe(src)
+    rungs = ladder_for(info["height"])
+    seg = int(getattr(settings, "HLS_SEGMENT_SECONDS", 6))
+    work = os.path.join(base_dir, f"hls.tmp-{uuid.uuid4().hex[:8]}")
+    os.makedirs(work, exist_ok=True)
+
+    split = "".join(f"[v{i}]" for i in range(len(rungs)))
+    filters = [f"[0:v]split={len(rungs)}{split}"]
+    filters += [f"[v{i}]scale=-2:{h}[v{i}o]" for i, (_, h, _, _) in enumerate(rungs)]
+    args = ["-i", src, "-filter_complex", ";".join(filters)]
+    stream_map = []
+    for i, (name, _, vk, ak) in enumerate(rungs):
+        args += [
+            "-map", f"[v{i}o]", f"-c:v:{i}", "libx264", f"-b:v:{i}", f"{vk}k",
+            f"-maxrate:v:{i}", f"{int(vk * 1.07)}k", f"-bufsize:v:{i}", f"{int(vk * 1.5)}k",
+        ]
+        entry = f"v:{i}"
+        if info["has_audio"]:
+            args += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", f"{ak}k", "-ac", "2"]
+            entry += f",a:{i}"
+        stream_map.append(f"{entry},name:{name}")
+    args += [
+        "-preset", getattr(settings, "HLS_X264_PRESET", "veryfast"),
+        # aligned keyframes on segment boundaries so every rung switches cleanly
+        "-force_key_frames", f"expr:gte(t,n_forced*{seg})", "-sc_threshold", "0",
+        "-f", "hls", "-hls_time", str(seg), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(work, "%v", "seg_%05d.ts"),
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(work, "%v", "index.m3u8"),
+    ]
+    try:
+        run_ffmpeg(args, duration=info["duration"], on_progress=on_progress)
+        _write_master(os.path.join(work, "index.m3u8"), rungs, info)
+        final = os.path.join(base_dir, "hls")
+        if os.path.isdir(final):
+            shutil.rmtree(final)
+        os.replace(work, final)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return final
@@ -0,0 +1,81 @@
+# api/media_pdf.py
+"""
+Post-upload PDF stage, outputs beside the source:
+
+<base_dir>/linear.pdf            qpdf --linearize (first page renders before the rest arrives)
+<base_dir>/thumbs/page-<n>.jpg   low-res page thumbnails (pdftoppm, zero-padded n)
+"""
+import glob
+import os
+import subprocess
+import uuid
+
+from django.conf import settings
+
+from .media_ffmpeg import MediaToolError
+
+try:
+    from pypdf import PdfReader  # type: ignore
+except Exception:
+    PdfReader = None
+
+
+def _run(cmd: list, ok_codes=(0,)):
+    timeout = int(getattr(settings, "PDF_TOOL_TIMEOUT_SEC", 300))
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise MediaToolError(f"{cmd[0]} timed out after {timeout}s")
+    if proc.returncode not in ok_codes:
+        raise MediaToolError(proc.stderr.strip()[-500:] or f"{cmd[0]} failed")
+
+
+def linearize(src: str, base_dir: str) -> str:
+    dest = os.path.join(base_dir, "linear.pdf")
+    part = f"{dest}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        # qpdf exits 3 for "succeeded with warnings"
+        _run([settings.QPDF_BIN, "--linearize", src, part], ok_codes=(0, 3))
+        os.replace(part, dest)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return dest
+
+
+def render_thumbnails(src: str, base_dir: str) -> list:
+    out_dir = os.path.join(base_dir, "thumbs")
+    os.makedirs(out_dir, exist_ok=True)
+    last = int(getattr(settings, "PDF_THUMB_MAX_PAGES", 50))
+    size = int(getattr(settings, "PDF_THUMB_PX", 160))
+    _run([
+        settings.PDFTOPPM_BIN, "-jpeg", "-jpegopt", "quality=70",
+        "-scale-to", str(size), "-f", "1", "-l", str(last),
+        src, os.path.join(out_dir, "page"),
+    ])
+    return sorted(glob.glob(os.path.join(out_dir, "page-*.jpg")))
+
+
+def extract_text(src: str) -> str:
+    """
+    Plain text for the search index, capped (tsvector values are limited to 1MB).
+    A file pypdf can't open raises MediaToolError; a page that won't extract is skipped.
+    """
+    if PdfReader is None:
+        return ""
+    limit = int(getattr(settings, "PDF_TEXT_MAX_CHARS", 500_000))
+    parts, total = [], 0
+    try:
+        pages = PdfReader(src).pages
+        for page in pages:
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                continue
+            parts.append(text)
+            total += len(text)
+            if total >= limit:
+                break
+    except Exception as e:  # PdfReadError, but broken files also raise plain ValueError/KeyError
+        raise MediaToolError(f"unreadable PDF: {e}"[:500]) from e
+    return "\n".join(parts)[:limit]
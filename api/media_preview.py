@@ -0,0 +1,84 @@
+# api/media_preview.py
+"""
+Video previews beside the source (worker only):
+
+<base_dir>/poster.jpg              one frame, shown before playback / in course trees
+<base_dir>/sprites/index.vtt       WebVTT thumbnail track: cue → sheet_001.jpg#xywh=x,y,w,h
+<base_dir>/sprites/sheet_001.jpg   grid of SPRITE_COLUMNS x SPRITE_COLUMNS thumbnails
+"""
+import math
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+
+from .media_ffmpeg import run_ffmpeg
+
+
+def extract_poster(src: str, base_dir: str, info: dict) -> str:
+    """Frame at 10% of the runtime (capped at 30s) → intros/black leaders are skipped."""
+    at = min(30.0, info["duration"] * 0.1)
+    out = os.path.join(base_dir, "poster.jpg")
+    tmp = f"{out}.{uuid.uuid4().hex[:8]}.part.jpg"
+    try:
+        # -ss before -i: keyframe seek, no decoding of everything before it
+        run_ffmpeg(["-ss", f"{at:.2f}", "-i", src, "-frames:v", "1",
+                    "-vf", "scale=-2:'min(720,ih)'", "-q:v", "3", tmp])
+        os.replace(tmp, out)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return out
+
+
+def _vtt_time(sec: float) -> str:
+    ms = int(round(sec * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def write_sprite_vtt(path: str, duration: float, interval: int, cols: int, w: int, h: int):
+    per_sheet = cols * cols
+    lines = ["WEBVTT", ""]
+    for i in range(max(1, math.ceil(duration / interval))):
+        sheet, idx = divmod(i, per_sheet)
+        x, y = (idx % cols) * w, (idx // cols) * h
+        lines += [
+            f"{_vtt_time(i * interval)} --> {_vtt_time(min((i + 1) * interval, duration))}",
+            f"sheet_{sheet + 1:03d}.jpg#xywh={x},{y},{w},{h}",
+            "",
+        ]
+    with open(path, "w") as out:
+        out.write("\n".join(lines))
+
+
+def build_sprites(src: str, base_dir: str, info: dict) -> str:
+    """
+    One thumbnail every SPRITE_INTERVAL_SEC, tiled into sheets by ffmpeg.
+    Only keyframes are decoded (-skip_frame nokey), so this costs a fraction
+    of a transcode. Written to a scratch dir and renamed like build_hls.
+    """
+    interval = int(getattr(settings, "SPRITE_INTERVAL_SEC", 10))
+    cols = int(getattr(settings, "SPRITE_COLUMNS", 10))
+    w = int(getattr(settings, "SPRITE_THUMB_WIDTH", 160))
+    h = int(round(w * info["height"] / info["width"] / 2)) * 2 if info["width"] else w * 9 // 16
+    work = os.path.join(base_dir, f"sprites.tmp-{uuid.uuid4().hex[:8]}")
+    os.makedirs(work, exist_ok=True)
+    try:
+        run_ffmpeg([
+            "-skip_frame", "nokey", "-i", src, "-an",
+            "-vf", f"fps=1/{interval},scale={w}:{h},tile={cols}x{cols}",
+            "-q:v", "5",
+            os.path.join(work, "sheet_%03d.jpg"),
+        ])
+        write_sprite_vtt(os.path.join(work, "index.vtt"), info["duration"], interval, cols, w, h)
+        final = os.path.join(base_dir, "sprites")
+        if os.path.isdir(final):
+            shutil.rmtree(final)
+        os.replace(work, final)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return final
@@ -0,0 +1,40 @@
+# api/media_probe.py
+"""
+Metadata probe for asset sources. probe_file() only touches the filesystem and
+subprocesses (no ORM), so it is safe to fan out in a ProcessPoolExecutor.
+"""
+import os
+import re
+
+from .media_ffmpeg import MediaToolError, ffprobe
+
+try:
+    from pypdf import PdfReader  # type: ignore
+except Exception:
+    PdfReader = None
+
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page[^s]")
+
+
+def pdf_page_count(path: str) -> int:
+    if PdfReader is not None:
+        try:
+            return len(PdfReader(path).pages)
+        except Exception:
+            pass
+    # rough fallback: count page objects (misses pages inside compressed object streams)
+    with open(path, "rb") as f:
+        return len(_PDF_PAGE_RE.findall(f.read()))
+
+
+def probe_file(path: str, asset_type: str) -> dict:
+    """Return {"size_bytes", "duration_seconds", "page_count"} for one source file."""
+    out = {"size_bytes": os.path.getsize(path), "duration_seconds": 0, "page_count": 0}
+    if asset_type == "PDF":
+        out["page_count"] = pdf_page_count(path)
+    else:
+        try:
+            out["duration_seconds"] = int(round(ffprobe(path)["duration"]))
+        except MediaToolError:
+            pass
+    return out
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_assetblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='processing_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='lessonasset',
+            name='processing_progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lessonasset',
+            name='processing_state',
+            field=models.CharField(blank=True, choices=[('', '-'), ('QUEUED', 'QUEUED'), ('RUNNING', 'RUNNING'), ('DONE', 'DONE'), ('FAILED', 'FAILED')], default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_lessonasset_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lessonasset',
+            name='probed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
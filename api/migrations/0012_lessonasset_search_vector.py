@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_lessonasset_probe'),
+        ('orgs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lessonasset',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='asset_search_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_lessonasset_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
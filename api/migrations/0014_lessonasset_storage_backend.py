@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_lessonasset_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='storage_backend',
+            field=models.CharField(choices=[('local', 'local'), ('s3', 's3')], default='local', max_length=10),
+        ),
+    ]
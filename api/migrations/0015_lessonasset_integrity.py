@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_lessonasset_storage_backend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='checksum_verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lessonasset',
+            name='integrity_state',
+            field=models.CharField(blank=True, choices=[('', '-'), ('OK', 'OK'), ('MISMATCH', 'MISMATCH'), ('MISSING', 'MISSING')], default='', max_length=10),
+        ),
+    ]
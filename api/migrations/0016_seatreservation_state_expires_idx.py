@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_lessonasset_integrity'),
+        ('orgs', '0002_org_storage_usage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seatreservation',
+            index=models.Index(fields=['state', 'expires_at'], name='seat_state_exp_idx'),
+        ),
+    ]
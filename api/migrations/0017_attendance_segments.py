@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_segments(apps, schema_editor):
+    # every existing attendance becomes its (last) single interval
+    Attendance = apps.get_model("api", "Attendance")
+    AttendanceSegment = apps.get_model("api", "AttendanceSegment")
+    batch = []
+    for att in Attendance.objects.only("id", "session_id", "user_id", "joined_at", "left_at", "total_seconds").iterator(chunk_size=2000):
+        batch.append(AttendanceSegment(
+            attendance_id=att.id, session_id=att.session_id, user_id=att.user_id,
+            started_at=att.joined_at, ended_at=att.left_at, seconds=att.total_seconds,
+        ))
+        if len(batch) >= 2000:
+            AttendanceSegment.objects.bulk_create(batch)
+            batch = []
+    AttendanceSegment.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_seatreservation_state_expires_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('seconds', models.PositiveIntegerField(default=0)),
+                ('attendance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='api.attendance')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_segments', to='api.livesession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_segments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['started_at'],
+                'indexes': [models.Index(fields=['session', 'user', 'started_at'], name='attseg_sess_user_start_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_segments, migrations.RunPython.noop),
+    ]
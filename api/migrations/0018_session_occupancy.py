@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_attendance_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionOccupancy',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy', serialize=False, to='api.livesession')),
+                ('started_at', models.DateTimeField()),
+                ('peak', models.PositiveIntegerField(default=0)),
+                ('peak_at', models.DateTimeField(blank=True, null=True)),
+                ('participant_seconds', models.PositiveBigIntegerField(default=0)),
+                ('curve', models.BinaryField(default=b'')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_session_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonasset',
+            name='declared_size',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -29,6 +29,7 @@ class SeatReservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     class Meta:
         unique_together = [("org","session","user")]
+        indexes = [models.Index(fields=["state","expires_at"], name="seat_state_exp_idx")]  # release_expired_seats
     def __str__(self):
         return f"Seat({self.pk}) user={getattr(self.user,'id',None)} sess={getattr(self.session,'id',None)}"
 
@@ -36,14 +37,40 @@ class Attendance(models.Model):
     org = models.ForeignKey("orgs.Org", on_delete=models.CASCADE, null=True, blank=True)
     session = models.ForeignKey(LiveSession, on_delete=models.CASCADE, related_name="attendance")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="attendance")
-    joined_at = models.DateTimeField(default=timezone.now)
-    left_at = models.DateTimeField(null=True, blank=True)
-    total_seconds = models.PositiveIntegerField(default=0)
+    joined_at = models.DateTimeField(default=timezone.now)  # first join
+    left_at = models.DateTimeField(null=True, blank=True)   # last leave; NULL while a segment is open
+    total_seconds = models.PositiveIntegerField(default=0)  # = Sum(segments.seconds), kept by api.utils_attendance
     class Meta:
         unique_together = [("org","session","user")]
     def __str__(self):
         return f"Att({self.pk}) user={getattr(self.user,'id',None)} sess={getattr(self.session,'id',None)}"
 
+class AttendanceSegment(models.Model):
+    """One join → leave interval; reconnects add segments instead of resetting the total."""
+    attendance = models.ForeignKey(Attendance, on_delete=models.CASCADE, related_name="segments")
+    session = models.ForeignKey(LiveSession, on_delete=models.CASCADE, related_name="attendance_segments")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="attendance_segments")
+    started_at = models.DateTimeField(default=timezone.now)
+    ended_at = models.DateTimeField(null=True, blank=True)
+    seconds = models.PositiveIntegerField(default=0)  # running while open (heartbeats), final once ended
+    class Meta:
+        ordering = ["started_at"]
+        indexes = [models.Index(fields=["session","user","started_at"], name="attseg_sess_user_start_idx")]
+    def __str__(self):
+        return f"Seg({self.pk}) att={self.attendance_id} sess={self.session_id} seconds={self.seconds}" # type: ignore
+
+
+class SessionOccupancy(models.Model):
+    """Concurrency summary for dashboards, written by `manage.py compute_occupancy` (api.occupancy)."""
+    session = models.OneToOneField(LiveSession, on_delete=models.CASCADE, primary_key=True, related_name="occupancy")
+    started_at = models.DateTimeField()  # minute 0 of the curve
+    peak = models.PositiveIntegerField(default=0)
+    peak_at = models.DateTimeField(null=True, blank=True)
+    participant_seconds = models.PositiveBigIntegerField(default=0)  # Σ connected time (billable minutes)
+    curve = models.BinaryField(default=b"")  # per-minute max concurrency, uint16 little-endian
+    computed_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"Occupancy(sess={self.session_id}) peak={self.peak}" # type: ignore
 
 
 from .models_academics import Course, Module, Lesson, LessonAsset
\ No newline at end of file
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from orgs.models import Level, Org
 from .utils_autofill import smart_slug, next_code_for_org
@@ -55,28 +57,55 @@ class Lesson(models.Model):
 
 
 def asset_upload_to(instance, filename):
-    # MEDIA_ROOT/org/<id>/lesson/<id>/asset/<ts>_<name>
-    import time, os
+    # MEDIA_ROOT/org/<id>/lesson/<id>/asset/<uuid>/<name> — own dir, pipeline outputs go beside it
+    import os
     name = os.path.basename(filename)
-    return f"org/{instance.org_id}/lesson/{instance.lesson_id}/asset/{int(time.time())}_{name}"
+    return f"org/{instance.org_id}/lesson/{instance.lesson_id}/asset/{uuid.uuid4().hex}/{name}"
+
+class AssetBlob(models.Model):
+    """Content-addressed file shared by every LessonAsset with the same SHA-256."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    storage_key = models.CharField(max_length=500)
+    size_bytes = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    def __str__(self): return f"Blob {self.sha256[:12]} refs={self.ref_count}"
 
 class LessonAsset(models.Model):
     TYPES = [("PDF","PDF"), ("VIDEO","VIDEO"), ("RECORDING","RECORDING")]
+    PROCESSING = [("","-"), ("QUEUED","QUEUED"), ("RUNNING","RUNNING"), ("DONE","DONE"), ("FAILED","FAILED")]
     org    = models.ForeignKey(Org, on_delete=models.CASCADE, null=True, blank=True)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="assets")
     type   = models.CharField(max_length=20, choices=TYPES)
     file   = models.FileField(upload_to=asset_upload_to, blank=True, null=True)
     storage_key = models.CharField(max_length=500, blank=True)
+    STORAGE_BACKENDS = [("local","local"), ("s3","s3")]
+    storage_backend = models.CharField(max_length=10, choices=STORAGE_BACKENDS, default="local")  # api.asset_storage
     ready  = models.BooleanField(default=False)
     duration_seconds = models.PositiveIntegerField(default=0)
+    page_count = models.PositiveIntegerField(default=0)               # PDF only
+    probed_at  = models.DateTimeField(null=True, blank=True)          # set by api.tasks.probe_asset
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)  # PDF text, api.tasks.process_pdf
     size_bytes = models.BigIntegerField(default=0)
+    declared_size = models.BigIntegerField(default=0)  # "size" sent to assets/init; uploads can't exceed it (0 = none)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    INTEGRITY = [("","-"), ("OK","OK"), ("MISMATCH","MISMATCH"), ("MISSING","MISSING")]
+    integrity_state = models.CharField(max_length=10, choices=INTEGRITY, blank=True, default="")  # verify_media
+    checksum_verified_at = models.DateTimeField(null=True, blank=True)
+    blob   = models.ForeignKey(AssetBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="assets")
     is_preview = models.BooleanField(default=False)   # intro/free-to-view
     published  = models.BooleanField(default=True)    # hide/unhide switch
+    processing_state    = models.CharField(max_length=10, choices=PROCESSING, blank=True, default="")
+    processing_progress = models.PositiveSmallIntegerField(default=0)  # 0..100
+    processing_error    = models.TextField(blank=True, default="")
+    # what exists beside storage_key, relative to its dir: {"source": "source", "hls": "hls/index.m3u8", ...}
+    renditions = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     class Meta:
          indexes = [
             models.Index(fields=["org","lesson","type","ready"], name="asset_ready_idx"),
             models.Index(fields=["lesson","published","is_preview"], name="asset_vis_idx"),
+            GinIndex(fields=["search_vector"], name="asset_search_idx"),
         ]
     def save(self, *args, **kwargs):
         if not self.storage_key:
@@ -0,0 +1,139 @@
+# api/occupancy.py
+"""
+Peak concurrency and per-minute occupancy of live sessions from their
+AttendanceSegment intervals, as one vectorised sweep per session:
+
+  events  = starts (+1) ∪ ends (−1), sorted by time (leaves first on ties)
+  level   = cumsum(deltas)            → concurrency after every event
+  peak    = max(level)
+  curve   = per-minute max(level), carrying the level across event-free minutes
+
+Inputs are flat NumPy arrays for a whole batch of sessions (see
+`load_batch`), so the worker processes never touch the database and a day
+of 10k sessions is a handful of array operations per session.
+"""
+import array
+import sys
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None
+
+MAX_MINUTES = 24 * 60  # curve length cap (sessions left open for days)
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("occupancy timelines require numpy")
+
+
+def load_batch(sessions):
+    """
+    sessions: LiveSession rows → (meta, seg_session, starts, ends) where meta is
+    [(session_id, scheduled start)] and the arrays hold epoch seconds per segment.
+    Open segments run to the scheduled end (or now, if earlier).
+    """
+    _require_numpy()
+    from .models import AttendanceSegment
+
+    now = timezone.now().timestamp()
+    meta = []
+    ends_by_session = {}
+    for s in sessions:
+        t0 = s.start_time.timestamp()
+        meta.append((s.pk, t0))
+        ends_by_session[s.pk] = min(now, t0 + s.duration_minutes * 60)
+
+    rows = (AttendanceSegment.objects
+            .filter(session_id__in=list(ends_by_session))  # host included: Agora bills every seat
+            .order_by()
+            .values_list("session_id", "started_at", "ended_at"))
+    sid, starts, ends = [], [], []
+    for session_id, started_at, ended_at in rows.iterator(chunk_size=10000):
+        sid.append(session_id)
+        starts.append(started_at.timestamp())
+        ends.append(ended_at.timestamp() if ended_at else max(ends_by_session[session_id], started_at.timestamp()))
+    return (
+        meta,
+        np.asarray(sid, dtype=np.int64),
+        np.asarray(starts, dtype=np.float64),
+        np.asarray(ends, dtype=np.float64),
+    )
+
+
+def sweep(starts, ends, t0):
+    """One session's segments → (t0, peak, peak_time, participant_seconds, curve uint16[])."""
+    _require_numpy()
+    if not len(starts):
+        return t0, 0, None, 0, np.zeros(0, dtype="<u2")
+    ends = np.maximum(ends, starts)
+    t0 = min(t0, float(starts.min()))
+    times = np.concatenate([starts, ends])
+    deltas = np.concatenate([np.ones(len(starts), np.int32), -np.ones(len(ends), np.int32)])
+    order = np.lexsort((deltas, times))  # by time, −1 before +1: back-to-back segments don't double count
+    times, level = times[order], np.cumsum(deltas[order])
+
+    i = int(level.argmax())
+    minutes = min(MAX_MINUTES, int((times[-1] - t0) // 60) + 1)
+    curve = np.zeros(minutes, dtype=np.int32)
+    idx = ((times - t0) // 60).astype(np.int64)
+    inside = idx < minutes
+    np.maximum.at(curve, idx[inside], level[inside])
+    # level carried into each minute from the last event before it
+    last = np.searchsorted(times, t0 + 60 * np.arange(minutes), side="right") - 1
+    curve = np.maximum(curve, np.where(last >= 0, level[np.maximum(last, 0)], 0))
+    return (
+        t0, int(level[i]), float(times[i]), int((ends - starts).sum()),
+        np.minimum(curve, np.iinfo(np.uint16).max).astype("<u2"),
+    )
+
+
+def compute_batch(batch):
+    """Process-pool entry point: load_batch() output → [(session_id, t0, peak, peak_at, seconds, curve bytes)]."""
+    _require_numpy()
+    meta, sid, starts, ends = batch
+    order = np.argsort(sid, kind="stable")
+    sid, starts, ends = sid[order], starts[order], ends[order]
+    out = []
+    for session_id, t0 in meta:
+        lo, hi = np.searchsorted(sid, session_id, side="left"), np.searchsorted(sid, session_id, side="right")
+        t0, peak, peak_at, seconds, curve = sweep(starts[lo:hi], ends[lo:hi], t0)
+        out.append((session_id, t0, peak, peak_at, seconds, curve.tobytes()))
+    return out
+
+
+def to_row(result):
+    from .models import SessionOccupancy
+
+    session_id, t0, peak, peak_at, seconds, curve = result
+    ts = lambda t: datetime.fromtimestamp(t, tz=dt_timezone.utc)  # noqa: E731
+    return SessionOccupancy(
+        session_id=session_id, started_at=ts(t0), peak=peak,
+        peak_at=ts(peak_at) if peak_at is not None else None,
+        participant_seconds=seconds, curve=curve, computed_at=timezone.now(),
+    )
+
+
+def decode_curve(raw) -> list:
+    """Stored uint16 LE bytes → [int] (no numpy needed on the web side)."""
+    a = array.array("H", bytes(raw))
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tolist()
+
+
+def payload(occ) -> dict:
+    return {
+        "session": occ.session_id,
+        "started_at": occ.started_at,
+        "peak": occ.peak,
+        "peak_at": occ.peak_at,
+        "participant_minutes": round(occ.participant_seconds / 60, 1),
+        "curve_step_sec": 60,
+        "curve": decode_curve(occ.curve),
+        "computed_at": occ.computed_at,
+    }
@@ -0,0 +1,95 @@
+# api/presence.py
+"""
+Live-session roster in Redis, shared by every web worker:
+
+presence:<sid>:conns   hash user_id → open sockets (tabs/devices) of that user
+presence:<sid>:users   hash user_id → member JSON ({"user_id", "name"})
+
+Join/leave diffs are only broadcast on a user's first/last socket, so a
+second tab or a reconnect does not flap the roster for everyone else.
+"""
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:
+    aioredis = None
+
+_JOIN = """
+local n = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return n
+"""
+_LEAVE = """
+local n = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+if n <= 0 then
+  redis.call('HDEL', KEYS[1], ARGV[1])
+  redis.call('HDEL', KEYS[2], ARGV[1])
+  return 0
+end
+return n
+"""
+
+_client = None
+_scripts = {}
+
+
+def _redis():
+    global _client
+    if _client is None:
+        if aioredis is None:
+            raise RuntimeError("session presence requires redis-py")
+        _client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        _scripts["join"] = _client.register_script(_JOIN)
+        _scripts["leave"] = _client.register_script(_LEAVE)
+    return _client
+
+
+def group_name(session_id) -> str:
+    return f"presence.session.{session_id}"
+
+
+def _keys(session_id):
+    return [f"presence:{session_id}:conns", f"presence:{session_id}:users"]
+
+
+def member_of(user) -> dict:
+    name = f"{user.first_name} {user.last_name}".strip() or user.email.split("@")[0]
+    return {"user_id": user.pk, "name": name}
+
+
+async def add_member(session_id, member: dict) -> bool:
+    """True when this is the user's first open socket (→ broadcast a join)."""
+    _redis()
+    n = await _scripts["join"](
+        keys=_keys(session_id),
+        args=[member["user_id"], json.dumps(member), settings.PRESENCE_TTL_SEC],
+    )
+    return int(n) == 1
+
+
+async def remove_member(session_id, user_id) -> bool:
+    """True when the user's last socket closed (→ broadcast a leave)."""
+    _redis()
+    return int(await _scripts["leave"](keys=_keys(session_id), args=[user_id])) == 0
+
+
+async def snapshot(session_id) -> list:
+    raw = await _redis().hgetall(_keys(session_id)[1])
+    return sorted((json.loads(v) for v in raw.values()), key=lambda m: m["name"].lower())
+
+
+def broadcast_seats(session_id, capacity: int, taken: int, freed: int = 0):
+    """Sync callers (sweeper, admin): tell the room that capacity changed."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    async_to_sync(layer.group_send)(group_name(session_id), {
+        "type": "presence.seats", "capacity": capacity, "taken": taken, "freed": freed,
+    })
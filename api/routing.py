@@ -0,0 +1,8 @@
+# api/routing.py — WebSocket routes (mounted in loxa/asgi.py)
+from django.urls import re_path
+
+from .consumers import SessionPresenceConsumer
+
+websocket_urlpatterns = [
+    re_path(r"^ws/sessions/(?P<session_id>\d+)/presence/$", SessionPresenceConsumer.as_asgi()),
+]
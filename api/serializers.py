@@ -58,8 +58,11 @@ class LessonSer(serializers.ModelSerializer):
 class AssetSer(serializers.ModelSerializer):
     class Meta:
         model = LessonAsset
-        fields = "__all__"
-        read_only_fields = ("org","ready","size_bytes","duration_seconds")
+        exclude = ("search_vector",)
+        read_only_fields = ("org","ready","size_bytes","duration_seconds","sha256","blob",
+                            "processing_state","processing_progress","processing_error",
+                            "page_count","probed_at","renditions","integrity_state","checksum_verified_at",
+                            "storage_key","storage_backend","declared_size")
 
 
 
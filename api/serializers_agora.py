@@ -10,4 +10,5 @@ class AgoraTokenResponseSer(serializers.Serializer):
     uid = serializers.CharField()
     rtc_token = serializers.CharField()
     rtm_token = serializers.CharField()
-    expires_in = serializers.IntegerField()
+    expires_in = serializers.IntegerField()  # seconds left on the (possibly reused) tokens
+    expire_at = serializers.IntegerField()
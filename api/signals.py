@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models_academics import LessonAsset
+from .utils_blobs import release_blob
+from .utils_quota import charge_storage
+from .asset_storage import s3_storage
+
+
+@receiver(post_delete, sender=LessonAsset)
+def release_asset_storage(sender, instance, **kwargs):
+    charge_storage(instance.org_id, -instance.size_bytes)
+    # shared CAS blob: last reference going away removes the files
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+    # bucket object (ASSET_STORAGE_BACKEND=s3)
+    if instance.storage_backend == "s3" and instance.storage_key:
+        key = instance.storage_key
+        transaction.on_commit(lambda: s3_storage().delete(key))
@@ -0,0 +1,293 @@
+# api/tasks.py
+import os
+import shutil
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import transaction
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from .models import Attendance, AttendanceSegment, LiveSession, SeatReservation
+from .models_academics import LessonAsset
+from .utils_quota import charge_storage
+from .utils_renditions import VIDEO_TYPES, detect_renditions, source_key
+
+
+def _abs(rel: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, rel)
+
+
+def schedule_asset_processing(asset: LessonAsset):
+    """
+    Called after the source bytes are in place. VIDEO/RECORDING stay ready=False
+    until the HLS ladder exists; jobs are queued only once the row is committed.
+    Workers read MEDIA_ROOT, so bucket-stored (s3) assets are not processed.
+    """
+    if asset.storage_backend != "local":
+        return
+    transaction.on_commit(lambda: probe_asset.delay(asset.pk))
+    if asset.type in VIDEO_TYPES:
+        asset.ready = False
+        asset.processing_state = "QUEUED"
+        asset.processing_progress = 0
+        asset.processing_error = ""
+        asset.save(update_fields=["ready", "processing_state", "processing_progress", "processing_error"])
+        transaction.on_commit(lambda: transcode_asset_hls.delay(asset.pk))
+        transaction.on_commit(lambda: build_video_previews.delay(asset.pk))
+    elif asset.type == "PDF":
+        # PDFs stay ready; linear copy / thumbs / search text are extras
+        asset.processing_state = "QUEUED"
+        asset.save(update_fields=["processing_state"])
+        transaction.on_commit(lambda: process_pdf.delay(asset.pk))
+
+
+def _shared_blob_done(asset: LessonAsset) -> bool:
+    """
+    CAS blob already processed for another asset → its derived outputs belong
+    to the same bytes. Anything else is a new source and rebuilds from scratch.
+    """
+    return bool(asset.blob_id) and LessonAsset.objects.filter(  # type: ignore
+        blob_id=asset.blob_id, processing_state="DONE",  # type: ignore
+    ).exclude(pk=asset.pk).exists()
+
+
+@shared_task(bind=True, acks_late=True, max_retries=2, default_retry_delay=60)
+def transcode_asset_hls(self, asset_id):
+    asset = LessonAsset.objects.filter(pk=asset_id).first()
+    if asset is None or asset.type not in VIDEO_TYPES:
+        return
+    from .utils_hls import invalidate
+    key = source_key(asset)
+    src = _abs(key)
+    base_dir = os.path.dirname(src)
+    qs = LessonAsset.objects.filter(pk=asset_id)
+
+    if not (_shared_blob_done(asset) and os.path.exists(os.path.join(base_dir, "hls", "index.m3u8"))):
+        from .media_hls import build_hls
+        from .media_ffmpeg import MediaToolError
+        # a re-upload must not keep serving the previous source's ladder meanwhile
+        shutil.rmtree(os.path.join(base_dir, "hls"), ignore_errors=True)
+        invalidate(f"{os.path.dirname(key)}/hls")
+        qs.update(processing_state="RUNNING", processing_progress=0)
+        try:
+            build_hls(src, base_dir, on_progress=lambda pct: qs.update(processing_progress=pct))
+        except (MediaToolError, OSError) as e:
+            if self.request.retries < self.max_retries:
+                raise self.retry(exc=e)
+            # source MP4 is still playable → ready, but keep the failure visible
+            qs.update(ready=True, processing_state="FAILED", processing_error=str(e)[:2000],
+                      renditions=detect_renditions(key, asset.type))
+            return
+    invalidate(f"{os.path.dirname(key)}/hls")  # cached playlist templates
+    qs.update(ready=True, processing_state="DONE", processing_progress=100, processing_error="",
+              renditions=detect_renditions(key, asset.type))
+
+
+@shared_task(acks_late=True)
+def build_video_previews(asset_id):
+    """Poster frame + seek-preview sprite sheet; runs beside the transcode, never blocks ready."""
+    from .media_ffmpeg import MediaToolError, ffprobe
+    from .media_preview import build_sprites, extract_poster
+    asset = LessonAsset.objects.filter(pk=asset_id, type__in=VIDEO_TYPES).first()
+    if asset is None:
+        return
+    key = source_key(asset)
+    src = _abs(key)
+    base_dir = os.path.dirname(src)
+    poster = os.path.join(base_dir, "poster.jpg")
+    sprites = os.path.join(base_dir, "sprites")
+    reuse = _shared_blob_done(asset)
+    if not reuse:  # new source: the old poster/sprites must not survive a failed rebuild
+        if os.path.exists(poster):
+            os.remove(poster)
+        shutil.rmtree(sprites, ignore_errors=True)
+    try:
+        info = ffprobe(src)
+        if not (reuse and os.path.exists(poster)):
+            extract_poster(src, base_dir, info)
+        if info["duration"] and not (reuse and os.path.exists(os.path.join(sprites, "index.vtt"))):
+            build_sprites(src, base_dir, info)
+    except (MediaToolError, OSError):
+        pass  # previews are optional; whatever was produced is still recorded
+    LessonAsset.objects.filter(pk=asset_id).update(renditions=detect_renditions(key, asset.type))
+
+
+@shared_task(acks_late=True)
+def probe_asset(asset_id):
+    """Backfill size/duration/page count from the stored file (ffprobe / pypdf)."""
+    from .media_probe import probe_file
+    asset = LessonAsset.objects.filter(pk=asset_id).only("id", "type", "storage_key", "file").first()
+    if asset is None:
+        return
+    try:
+        meta = probe_file(_abs(source_key(asset)), asset.type)
+    except OSError:
+        return
+    with transaction.atomic():
+        old = LessonAsset.objects.select_for_update().filter(pk=asset_id).values("org_id", "size_bytes").first()
+        if old is None:
+            return
+        LessonAsset.objects.filter(pk=asset_id).update(probed_at=timezone.now(), **meta)
+        charge_storage(old["org_id"], meta["size_bytes"] - old["size_bytes"])  # keep storage_used_bytes = Σ size_bytes
+
+
+@shared_task(acks_late=True)
+def process_pdf(asset_id):
+    """Linearize, render page thumbnails and index the text of a PDF asset."""
+    from .media_pdf import extract_text, linearize, render_thumbnails
+    from .media_ffmpeg import MediaToolError
+    asset = LessonAsset.objects.filter(pk=asset_id, type="PDF").only("id", "type", "storage_key").first()
+    if asset is None:
+        return
+    src = _abs(asset.storage_key)
+    base_dir = os.path.dirname(src)
+    qs = LessonAsset.objects.filter(pk=asset_id)
+    qs.update(processing_state="RUNNING", processing_progress=0)
+    try:
+        linearize(src, base_dir)
+        qs.update(processing_progress=40)
+        render_thumbnails(src, base_dir)
+        qs.update(processing_progress=80)
+        text = extract_text(src)
+    except (MediaToolError, OSError) as e:
+        qs.update(processing_state="FAILED", processing_error=str(e)[:2000])
+        return
+    qs.update(
+        search_vector=SearchVector(Value(text)),
+        processing_state="DONE", processing_progress=100, processing_error="",
+        renditions=detect_renditions(asset.storage_key, asset.type),
+    )
+
+
+@shared_task(acks_late=True)
+def flush_seat_writes(limit=5000):
+    """Persist the SeatReservation upserts buffered by api.admission in bulk."""
+    from .admission import FLUSH_GUARD_KEY, _conn, pop_writes
+    _conn().delete(FLUSH_GUARD_KEY)  # writes from now on schedule the next flush
+    while True:
+        writes = pop_writes(limit)
+        latest = {(w["session_id"], w["user_id"]): w for w in writes}  # last write wins
+        rows, orgless = [], []
+        for w in latest.values():
+            seat = SeatReservation(
+                org_id=w["org_id"], session_id=w["session_id"], user_id=w["user_id"], state=w["state"],
+                expires_at=datetime.fromtimestamp(w["expires_at"], tz=dt_timezone.utc) if w["expires_at"] else None,
+            )
+            (rows if seat.org_id else orgless).append(seat)
+        if rows:
+            SeatReservation.objects.bulk_create(
+                rows, batch_size=1000, update_conflicts=True,
+                unique_fields=["org", "session", "user"], update_fields=["state", "expires_at"],
+            )
+        for seat in orgless:  # NULL org never conflicts in the unique index → upsert by hand
+            SeatReservation.objects.update_or_create(
+                org=None, session_id=seat.session_id, user_id=seat.user_id,
+                defaults={"state": seat.state, "expires_at": seat.expires_at},
+            )
+        if len(writes) < limit:
+            return
+
+
+@shared_task
+def release_expired_seats(chunk=1000):
+    """
+    Celery beat: expired PENDING seats → RELEASED in chunked UPDATEs (index
+    seat_state_exp_idx), then free them in the admission zsets and tell the rooms.
+    Heartbeats only slide the hold in Redis, so a row whose seat is still held
+    there just takes over the Redis expiry instead.
+    """
+    from .admission import drop_expired, held_until
+    from .presence import broadcast_seats
+    now = timezone.now()
+    expired = SeatReservation.objects.filter(state="PENDING", expires_at__lt=now)
+    freed = Counter()
+    while True:
+        rows = list(expired.order_by().only("id", "session_id", "user_id", "expires_at")[:chunk])
+        if not rows:
+            break
+        held, gone = [], []
+        for seat, until in zip(rows, held_until([(s.session_id, s.user_id) for s in rows])):
+            if until is not None and until > now.timestamp():
+                seat.expires_at = datetime.fromtimestamp(until, tz=dt_timezone.utc)
+                held.append(seat)
+            else:
+                gone.append(seat)
+        SeatReservation.objects.bulk_update(held, ["expires_at"], batch_size=chunk)
+        # re-check in the UPDATE: a buffered re-join may have extended the seat meanwhile
+        expired.filter(id__in=[s.pk for s in gone]).update(state="RELEASED")
+        freed.update(s.session_id for s in gone)
+        if len(rows) < chunk:
+            break
+    capacity = dict(LiveSession.objects.filter(pk__in=freed).values_list("id", "max_participants"))
+    for sid, n in freed.items():
+        broadcast_seats(sid, capacity.get(sid, 0), drop_expired(sid), freed=n)
+    return sum(freed.values())
+
+
+def _release_seats(pairs):
+    """Seats of members gone silent [(session_id, user_id)]: rows → RELEASED, Redis seats freed, rooms told."""
+    from .admission import release_many
+    from .presence import broadcast_seats
+    if not pairs:
+        return
+    SeatReservation.objects.filter(
+        reduce(or_, (Q(session_id=sid, user_id=uid) for sid, uid in pairs)), state="PENDING",
+    ).update(state="RELEASED")
+    freed = release_many(pairs)
+    capacity = dict(LiveSession.objects.filter(pk__in=freed).values_list("id", "max_participants"))
+    for sid, (n, taken) in freed.items():
+        broadcast_seats(sid, capacity.get(sid, 0), taken, freed=n)
+
+
+@shared_task
+def flush_attendance(batch=1000):
+    """
+    Celery beat: api.heartbeats last-seen → Attendance, one bulk UPDATE per batch.
+    Open segments of live members run up to the last heartbeat (total_seconds
+    follows); members silent for longer than HEARTBEAT_TIMEOUT_SEC have their
+    segment closed at the last heartbeat and their seat released. Join counts
+    as the first heartbeat (heartbeats.start), so never pinging = silent.
+    """
+    from . import heartbeats
+    from .utils_attendance import advance
+    cutoff = int(time.time()) - settings.HEARTBEAT_TIMEOUT_SEC
+    entries = heartbeats.snapshot()
+    closed_total = 0
+    for i in range(0, len(entries), batch):
+        last = {heartbeats.parse(m): (m, int(ts)) for m, ts in entries[i:i + batch]}
+        done, silent = [], []
+        with transaction.atomic():
+            atts = {
+                att.pk: att for att in Attendance.objects.select_for_update().filter(
+                    session_id__in={sid for sid, _ in last}, user_id__in={uid for _, uid in last},
+                    left_at__isnull=True,
+                ).only("id", "session_id", "user_id", "left_at", "total_seconds")
+                if (att.session_id, att.user_id) in last
+            }
+            segs = list(AttendanceSegment.objects.filter(attendance_id__in=atts, ended_at__isnull=True))
+            for seg in segs:
+                att = atts[seg.attendance_id]
+                ts = last[(att.session_id, att.user_id)][1]
+                advance(att, seg, datetime.fromtimestamp(ts, tz=dt_timezone.utc), close=ts < cutoff)
+            for att in atts.values():
+                m, ts = last[(att.session_id, att.user_id)]
+                if ts < cutoff:
+                    att.left_at = att.left_at or datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+                    done.append((m, ts))
+                    silent.append(m)
+            AttendanceSegment.objects.bulk_update(segs, ["ended_at", "seconds"], batch_size=batch)
+            Attendance.objects.bulk_update(list(atts.values()), ["left_at", "total_seconds"], batch_size=batch)
+        # already closed in the DB (explicit leave raced the heartbeat) → forget as well
+        open_pairs = {(att.session_id, att.user_id) for att in atts.values()}
+        done += [v for k, v in last.items() if k not in open_pairs]
+        dropped = set(heartbeats.forget(done))
+        _release_seats([heartbeats.parse(m) for m in silent if m in dropped])
+        closed_total += len(done)
+    return closed_total
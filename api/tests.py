@@ -1,3 +1,999 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from datetime import timedelta
+from urllib.parse import urlencode
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIRequest
+from django.core.management import call_command
+from django.http import FileResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.views import APIView
+
+from orgs.models import Catalog, Level, Org, OrgMembership, Program
+from . import admission, heartbeats
+from .agora_utils import issue_rtc_token
+from .consumers import SessionPresenceConsumer, may_watch
+from .media_ffmpeg import MediaToolError, ffprobe, run_ffmpeg
+from .media_pdf import linearize
+from .models import Attendance, AttendanceSegment, LiveSession, SeatReservation
+from .models_academics import AssetBlob, Course, Enrollment, Lesson, LessonAsset, Module
+from .utils_async import QueryTokenAuthMiddleware, WebsocketOriginValidator
+from .utils_blobs import attach_existing, blob_key
+from .utils_range import aserve_file_range, serve_file_range
+from .utils_renditions import detect_renditions, pick_play_path
+from .utils_hls import invalidate
+from .utils_sign import PLAYLIST_SIGNER, SIGNER, secure_link_token, secure_media_url
+from .tasks import (
+    build_video_previews, flush_attendance, probe_asset, process_pdf, release_expired_seats, transcode_asset_hls,
+)
+from .utils_attendance import open_segment
+from .upload_handlers import StagedUploadedFile, StreamingAssetUploadHandler
+from .views_content import AssetUpload, _build_media_path, finish_local_upload, zip_response
+
+
+def make_lesson(org=None, title="L1"):
+    org = org or Org.objects.create(name="Org")
+    catalog = Catalog.objects.create(org=org, name=f"cat-{org.pk}")
+    level = Level.objects.create(program=Program.objects.create(catalog=catalog, title="P"), label="Y1")
+    course = Course.objects.create(org=org, level=level, title="C")
+    module = Module.objects.create(org=org, course=course, title="M")
+    return Lesson.objects.create(org=org, module=module, title=title)
+
+
+def make_user(email, **kw):
+    return get_user_model().objects.create_user(email=email, password="pw", **kw)
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+
+def _asgi_request(path="/", headers=()):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": list(headers)}
+    return ASGIRequest(scope, io.BytesIO())
+
+
+def _zip_entries():
+    chunks = lambda: iter([b"x" * 1000, b"y" * 1000])  # noqa: E731
+    return [("a.txt", 2000, zipfile.ZIP_DEFLATED, (2024, 1, 1, 0, 0, 0), chunks)]
+
+
+async def _collect(aiter):
+    return b"".join([part async for part in aiter])
+
+
+class ZipResponseTests(SimpleTestCase):
+    def test_asgi_gets_async_body(self):
+        resp = zip_response(_asgi_request(), _zip_entries(), "a.zip")
+        self.assertTrue(resp.is_async)
+        body = asyncio.run(_collect(resp.streaming_content))
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(body)).read("a.txt"), b"x" * 1000 + b"y" * 1000)
+
+    def test_wsgi_keeps_sync_body(self):
+        resp = zip_response(RequestFactory().get("/"), _zip_entries(), "a.zip")
+        self.assertFalse(resp.is_async)
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content))).namelist(), ["a.txt"])
+
+
+class ServeFileRangeTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(bytes(range(256)) * 4)
+        self.addCleanup(os.remove, self.path)
+
+    def test_wsgi_keeps_file_response(self):
+        resp = serve_file_range(RequestFactory().get("/", HTTP_RANGE="bytes=10-19"), self.path)
+        self.assertIsInstance(resp, FileResponse)
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(b"".join(resp.streaming_content), bytes(range(10, 20)))
+        resp.close()
+
+    def test_asgi_streams_async_blocks(self):
+        resp = serve_file_range(_asgi_request(headers=[(b"range", b"bytes=10-19")]), self.path)
+        self.assertNotIsInstance(resp, FileResponse)
+        self.assertTrue(resp.is_async)
+        self.assertEqual(asyncio.run(_collect(resp.streaming_content)), bytes(range(10, 20)))
+
+    def test_if_range_date_must_match_last_modified(self):
+        last_modified = http_date(os.stat(self.path).st_mtime)
+        later = http_date(os.stat(self.path).st_mtime + 3600)
+        for cond, status in ((last_modified, 206), (later, 200)):
+            resp = serve_file_range(RequestFactory().get("/", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=cond), self.path)
+            self.assertEqual(resp.status_code, status)
+            resp.close()
+
+    def test_range_on_empty_file_is_416(self):
+        open(self.path, "wb").close()
+        for rng in ("bytes=-5", "bytes=0-"):
+            resp = serve_file_range(RequestFactory().get("/", HTTP_RANGE=rng), self.path)
+            self.assertEqual((resp.status_code, resp["Content-Range"]), (416, "bytes */0"))
+
+    def test_async_variant_opens_the_file_off_the_loop(self):
+        async def run():
+            loop_thread = threading.get_ident()
+            real_open = open
+            seen = []
+
+            def spy(*args, **kwargs):
+                seen.append(threading.get_ident())
+                return real_open(*args, **kwargs)
+            with mock.patch("builtins.open", spy):
+                resp = await aserve_file_range(_asgi_request(), self.path)
+            body = await _collect(resp.streaming_content)
+            return loop_thread, seen, body
+        loop_thread, seen, body = asyncio.run(run())
+        self.assertEqual(len(body), 1024)
+        self.assertNotIn(loop_thread, seen)
+
+
+class AssetZipSourceTests(MediaRootMixin, TestCase):
+    def test_file_only_asset_is_in_the_archive(self):
+        lesson = make_lesson()
+        asset = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="PDF", ready=True, is_preview=True)
+        asset.file.save("notes.pdf", ContentFile(b"%PDF-1.4 viewset upload"))  # bytes at `file` only
+        resp = self.client.get(f"/api/lessons/{lesson.pk}/download.zip")
+        self.assertEqual(resp.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content)))
+        self.assertEqual([archive.read(n) for n in archive.namelist()], [b"%PDF-1.4 viewset upload"])
+
+
+class GcMediaPlaceholderTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson = make_lesson()
+
+    def _age(self, asset, hours=48):
+        LessonAsset.objects.filter(pk=asset.pk).update(created_at=timezone.now() - timedelta(hours=hours))
+
+    def test_only_abandoned_init_placeholders_are_deleted(self):
+        placeholder = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF")
+        uploaded = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="VIDEO",
+                                              processing_state="FAILED")
+        uploaded.file.save("talk.mp4", ContentFile(b"video bytes"))
+        for a in (placeholder, uploaded):
+            self._age(a)
+
+        call_command("gc_media", stdout=io.StringIO())
+
+        self.assertFalse(LessonAsset.objects.filter(pk=placeholder.pk).exists())
+        self.assertTrue(LessonAsset.objects.filter(pk=uploaded.pk).exists())
+
+    def test_placeholder_with_bytes_at_storage_key_survives(self):
+        asset = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF")
+        path = os.path.join(self.media_root, asset.storage_key)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4")
+        self._age(asset)
+
+        call_command("gc_media", stdout=io.StringIO())
+
+        self.assertTrue(LessonAsset.objects.filter(pk=asset.pk).exists())
+
+
+class GcMediaChunkTests(MediaRootMixin, TestCase):
+    def _touch(self, rel):
+        path = os.path.join(self.media_root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x")
+        return path
+
+    def test_referenced_keys_are_loaded_per_lesson_dir(self):
+        from .management.commands.gc_media import _chunks
+        lesson = make_lesson()
+        keep = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="VIDEO",
+                                          storage_key="org/1/course/2/lesson/3/asset/4/source")
+        odd = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="VIDEO", storage_key="org/1/legacy/source")
+        kept = [self._touch(keep.storage_key), self._touch("org/1/course/2/lesson/3/asset/4/hls/index.m3u8"),
+                self._touch(odd.storage_key), self._touch("org/1/legacy/hls/index.m3u8")]
+        orphans = [self._touch("org/1/course/2/lesson/9/asset/5/source"), self._touch("org/1/stray.bin")]
+
+        whole = [prefix for prefix, w in _chunks(self.media_root) if w]
+        self.assertEqual(whole, ["org/1/course/2/lesson/3/", "org/1/course/2/lesson/9/"])
+        call_command("gc_media", "--min-age-hours=0", "--placeholder-hours=0", stdout=io.StringIO())
+
+        self.assertTrue(all(os.path.exists(p) for p in kept))
+        self.assertFalse(any(os.path.exists(p) for p in orphans))
+
+
+@override_settings(ASSET_CAS_ENABLED=False)
+class UploadSizeTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson = make_lesson()
+        self.org = self.lesson.org
+
+    def _upload(self, data: bytes, declared=0):
+        asset = LessonAsset.objects.create(org=self.org, lesson=self.lesson, type="PDF", declared_size=declared)
+        f = StagedUploadedFile.open_for(_build_media_path(asset.storage_key))
+        f.write(data)
+        f.finalize(len(data), "0" * 64)
+        try:
+            return asset, finish_local_upload(asset, f)
+        finally:
+            f.close()
+
+    def test_larger_than_declared_is_rejected(self):
+        asset, (code, _) = self._upload(b"x" * 20, declared=10)
+        self.assertEqual(code, 413)
+        asset.refresh_from_db()
+        self.assertFalse(asset.ready)
+        self.assertEqual(os.listdir(os.path.dirname(_build_media_path(asset.storage_key))), [])
+
+    def test_quota_is_checked_against_received_bytes(self):
+        Org.objects.filter(pk=self.org.pk).update(storage_quota_bytes=100, storage_used_bytes=90)
+        self.assertEqual(self._upload(b"x" * 20)[1][0], 413)
+        asset, (code, _) = self._upload(b"x" * 10, declared=50)
+        self.assertEqual(code, 200)
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.storage_used_bytes, 100)
+
+    def test_probe_charges_size_difference(self):
+        asset = LessonAsset.objects.create(org=self.org, lesson=self.lesson, type="PDF", size_bytes=5)
+        Org.objects.filter(pk=self.org.pk).update(storage_used_bytes=5)
+        path = _build_media_path(asset.storage_key)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 " + b"x" * 11)
+        probe_asset(asset.pk)
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.storage_used_bytes, 20)
+
+
+class VerifyMediaTests(MediaRootMixin, TestCase):
+    def test_file_only_assets_are_hashed(self):
+        lesson = make_lesson()
+        asset = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="PDF", ready=True)
+        asset.file.save("notes.pdf", ContentFile(b"%PDF-1.4"))
+        LessonAsset.objects.filter(pk=asset.pk).update(storage_key="")  # viewset upload: bytes at `file` only
+        call_command("verify_media", "--restart", "--workers=1", stdout=io.StringIO())
+        asset.refresh_from_db()
+        self.assertEqual((asset.integrity_state, len(asset.sha256)), ("OK", 64))
+
+    def test_shared_blob_is_hashed_once_and_unready_assets_skipped(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from .management.commands import verify_media
+        lesson = make_lesson()
+        sha = hashlib.sha256(b"shared").hexdigest()
+        blob = AssetBlob.objects.create(sha256=sha, storage_key=blob_key(sha), size_bytes=6, ref_count=3)
+        os.makedirs(os.path.dirname(_build_media_path(blob.storage_key)))
+        with open(_build_media_path(blob.storage_key), "wb") as f:
+            f.write(b"shared")
+        assets = [LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="PDF", blob=blob, sha256=sha,
+                                             storage_key=blob.storage_key, ready=True) for _ in range(3)]
+        pending = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="PDF", storage_key="org/1/in-flight")
+        with mock.patch.object(verify_media, "ProcessPoolExecutor", ThreadPoolExecutor), \
+                mock.patch.object(verify_media, "_hash", wraps=verify_media._hash) as hashed:
+            call_command("verify_media", "--restart", "--workers=1", "--batch=2", stdout=io.StringIO())
+        self.assertEqual(hashed.call_count, 1)
+        self.assertEqual({a.integrity_state for a in LessonAsset.objects.filter(pk__in=[a.pk for a in assets])}, {"OK"})
+        pending.refresh_from_db()
+        self.assertIsNone(pending.checksum_verified_at)
+
+    def test_unreadable_path_counts_as_missing(self):
+        from .management.commands.verify_media import _hash
+        path = os.path.join(self.media_root, "plain-file")
+        open(path, "wb").close()
+        self.assertEqual(_hash((1, os.path.join(path, "source"))), (1, None))  # NotADirectoryError
+
+
+class ViewsetUploadPipelineTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson = make_lesson()
+
+    def test_probe_backfill_reads_file_and_skips_bucket_assets(self):
+        asset = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF")
+        asset.file.save("notes.pdf", ContentFile(b"%PDF-1.4 " + b"x" * 91))
+        LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF", storage_backend="s3")
+        out = io.StringIO()
+        call_command("probe_assets", "--workers=1", stdout=out)
+        self.assertIn("probed 1 asset(s), 0 failed", out.getvalue())
+        asset.refresh_from_db()
+        self.assertEqual(asset.size_bytes, 100)
+        self.assertIsNotNone(asset.probed_at)
+
+    def test_viewset_upload_gets_own_dir_and_is_processed(self):
+        user = make_user("teacher@example.com")
+        OrgMembership.objects.create(org=self.lesson.org, user=user, role="TEACHER")
+        client = APIClient(HTTP_X_ORG_ID=str(self.lesson.org.pk))
+        client.force_authenticate(user)
+        with mock.patch("api.tasks.process_pdf.delay") as pdf, mock.patch("api.tasks.probe_asset.delay") as probe, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            resp = client.post("/api/assets/", {
+                "lesson": self.lesson.pk, "type": "PDF", "storage_key": "org/999/elsewhere",
+                "file": SimpleUploadedFile("a.pdf", b"%PDF-1.4"),
+            }, format="multipart")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        asset = LessonAsset.objects.get(pk=resp.json()["id"])
+        self.assertEqual(asset.storage_key, asset.file.name)  # client-sent key ignored
+        self.assertEqual(len(callbacks), 2)
+        pdf.assert_called_once_with(asset.pk)
+        probe.assert_called_once_with(asset.pk)
+        other = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF")
+        other.file.save("a.pdf", ContentFile(b"x"))
+        self.assertNotEqual(os.path.dirname(other.file.name), os.path.dirname(asset.file.name))
+
+    def test_viewset_upload_over_quota_is_413(self):
+        Org.objects.filter(pk=self.lesson.org.pk).update(storage_quota_bytes=4)
+        user = make_user("teacher@example.com")
+        OrgMembership.objects.create(org=self.lesson.org, user=user, role="TEACHER")
+        client = APIClient(HTTP_X_ORG_ID=str(self.lesson.org.pk))
+        client.force_authenticate(user)
+        resp = client.post("/api/assets/", {
+            "lesson": self.lesson.pk, "type": "PDF", "file": SimpleUploadedFile("a.pdf", b"%PDF-1.4"),
+        }, format="multipart")
+        self.assertEqual((resp.status_code, resp.json()["quota_bytes"]), (413, 4))
+        self.assertFalse(LessonAsset.objects.exists())
+
+
+class MediaToolProcessTests(SimpleTestCase):
+    def _tool(self, body):
+        fd, path = tempfile.mkstemp(suffix=".sh")
+        with os.fdopen(fd, "w") as f:
+            f.write("#!/bin/sh\n" + body + "\n")
+        os.chmod(path, 0o755)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_chatty_stderr_does_not_deadlock_ffmpeg(self):
+        # far more than a pipe buffer on stderr before anything on stdout
+        tool = self._tool("head -c 1000000 /dev/zero | tr '\\0' x >&2; echo out_time_us=1; exit 1")
+        with override_settings(FFMPEG_BIN=tool, FFMPEG_TIMEOUT_SEC=30):
+            with self.assertRaises(MediaToolError) as ctx:
+                run_ffmpeg([])
+        self.assertTrue(str(ctx.exception).endswith("x" * 500))
+
+    def test_hung_tools_are_killed(self):
+        tool = self._tool("exec sleep 30")  # no grandchild holding the pipes open
+        with override_settings(FFMPEG_BIN=tool, FFPROBE_BIN=tool, FFMPEG_TIMEOUT_SEC=1, FFPROBE_TIMEOUT_SEC=1,
+                               PDF_TOOL_TIMEOUT_SEC=1, QPDF_BIN=tool):
+            for call in (lambda: run_ffmpeg([]), lambda: ffprobe("x"), lambda: linearize("x", tempfile.gettempdir())):
+                started = time.monotonic()
+                with self.assertRaisesRegex(MediaToolError, "timed out"):
+                    call()
+                self.assertLess(time.monotonic() - started, 10)
+
+
+class ProcessPdfTests(MediaRootMixin, TestCase):
+    @mock.patch("api.media_pdf.render_thumbnails")
+    @mock.patch("api.media_pdf.linearize")
+    def test_unreadable_pdf_fails_instead_of_hanging_in_running(self, *_):
+        lesson = make_lesson()
+        asset = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="PDF")
+        path = _build_media_path(asset.storage_key)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4 truncated")
+        process_pdf(asset.pk)
+        asset.refresh_from_db()
+        self.assertEqual(asset.processing_state, "FAILED")
+        self.assertIn("unreadable PDF", asset.processing_error)
+
+
+class VideoReprocessTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson = make_lesson()
+
+    def _video(self, key, **kw):
+        asset = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="VIDEO", storage_key=key, **kw)
+        base = os.path.dirname(_build_media_path(key))
+        os.makedirs(os.path.join(base, "hls"), exist_ok=True)
+        for name in ("source", "hls/index.m3u8"):
+            with open(os.path.join(base, name), "w") as f:
+                f.write("old")
+        return asset, base
+
+    @mock.patch("api.media_hls.build_hls")
+    def test_reupload_drops_stale_ladder_and_rebuilds(self, build):
+        asset, base = self._video("org/1/lesson/1/asset/1/source")
+        transcode_asset_hls(asset.pk)
+        build.assert_called_once()
+        self.assertFalse(os.path.exists(os.path.join(base, "hls")))  # old ladder is gone, not reused
+        asset.refresh_from_db()
+        self.assertEqual(asset.processing_state, "DONE")
+
+    @mock.patch("api.media_hls.build_hls")
+    def test_processed_shared_blob_is_reused(self, build):
+        sha = "cd" * 32
+        blob = AssetBlob.objects.create(sha256=sha, storage_key=blob_key(sha), size_bytes=3, ref_count=2)
+        self._video(blob.storage_key, blob=blob, processing_state="DONE")
+        asset = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="VIDEO",
+                                           storage_key=blob.storage_key, blob=blob)
+        transcode_asset_hls(asset.pk)
+        build.assert_not_called()
+        asset.refresh_from_db()
+        self.assertEqual(asset.processing_state, "DONE")
+
+
+    @mock.patch("api.media_preview.build_sprites")
+    @mock.patch("api.media_preview.extract_poster", side_effect=OSError("boom"))
+    @mock.patch("api.media_ffmpeg.ffprobe", return_value={"duration": 60.0, "width": 640, "height": 360})
+    def test_reupload_previews_do_not_keep_the_old_poster(self, _probe, poster, sprites):
+        asset, base = self._video("org/1/lesson/1/asset/2/source")
+        os.makedirs(os.path.join(base, "sprites"))
+        for name in ("poster.jpg", "sprites/index.vtt"):
+            with open(os.path.join(base, name), "w") as f:
+                f.write("old")
+        build_video_previews(asset.pk)
+        poster.assert_called_once()
+        self.assertFalse(os.path.exists(os.path.join(base, "poster.jpg")))
+        self.assertFalse(os.path.exists(os.path.join(base, "sprites")))
+        asset.refresh_from_db()
+        self.assertNotIn("poster", asset.renditions)
+
+
+@override_settings(ASSET_CAS_ENABLED=False)
+class AssetUploadScopeTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.lesson = make_lesson()
+        self.user = make_user("teacher@example.com")
+        OrgMembership.objects.create(org=self.lesson.org, user=self.user, role="TEACHER")
+
+    def _client(self, org):
+        client = APIClient(HTTP_X_ORG_ID=str(org.pk))
+        client.force_authenticate(self.user)
+        return client
+
+    def _post(self, asset, org=None):
+        return self._client(org or self.lesson.org).post(
+            f"/api/assets/{asset.pk}/upload/", {"file": SimpleUploadedFile("a.pdf", b"%PDF-1.4")}, format="multipart",
+        )
+
+    def _streams_into(self, asset):
+        request = RequestFactory().post(f"/api/assets/{asset.pk}/upload/")
+        request.org = self.lesson.org
+        AssetUpload().initialize_request(request, pk=asset.pk)
+        return any(isinstance(h, StreamingAssetUploadHandler) for h in request.upload_handlers)
+
+    def test_other_orgs_asset_gets_no_staged_bytes(self):
+        other = make_lesson(org=Org.objects.create(name="Other"), title="B")
+        asset = LessonAsset.objects.create(org=other.org, lesson=other, type="PDF")
+        self.assertFalse(self._streams_into(asset))
+        self.assertEqual(self._post(asset).status_code, 404)
+        own = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF")
+        self.assertTrue(self._streams_into(own))
+
+    def test_bucket_assets_are_refused(self):
+        asset = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF", storage_backend="s3")
+        self.assertEqual(self._post(asset).status_code, 400)
+
+    def test_django_uploaded_file_is_staged_and_kept(self):
+        asset = LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF")
+        with mock.patch.object(AssetUpload, "initialize_request", APIView.initialize_request):
+            resp = self._post(asset)
+        self.assertEqual(resp.status_code, 200)
+        with open(_build_media_path(asset.storage_key), "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1.4")
+
+
+class MultipartS3ErrorTests(TestCase):
+    def setUp(self):
+        lesson = make_lesson()
+        self.asset = LessonAsset.objects.create(org=lesson.org, lesson=lesson, type="VIDEO", storage_backend="s3")
+        user = make_user("uploader@example.com")
+        OrgMembership.objects.create(org=lesson.org, user=user, role="TEACHER")
+        self.client = APIClient(HTTP_X_ORG_ID=str(lesson.org.pk))
+        self.client.force_authenticate(user)
+
+    def _s3(self, method, code):
+        from botocore.exceptions import ClientError
+        storage = mock.Mock()
+        getattr(storage, method).side_effect = ClientError({"Error": {"Code": code, "Message": code}}, method)
+        return mock.patch("api.views_content.s3_storage", return_value=storage)
+
+    def test_complete_with_unknown_upload_is_404_and_asset_stays_unready(self):
+        with self._s3("complete_multipart", "NoSuchUpload"):
+            resp = self.client.post(f"/api/assets/{self.asset.pk}/multipart/complete/",
+                                    {"upload_id": "u1", "parts": [{"PartNumber": 1, "ETag": "e"}]}, format="json")
+        self.assertEqual((resp.status_code, resp.json()["code"]), (404, "NoSuchUpload"))
+        self.asset.refresh_from_db()
+        self.assertFalse(self.asset.ready)
+
+    def test_bad_parts_is_400(self):
+        with self._s3("complete_multipart", "InvalidPart"):
+            resp = self.client.post(f"/api/assets/{self.asset.pk}/multipart/complete/",
+                                    {"upload_id": "u1", "parts": [{"PartNumber": 1, "ETag": "e"}]}, format="json")
+        self.assertEqual((resp.status_code, resp.json()["code"]), (400, "InvalidPart"))
+
+    def test_abort_unknown_upload_is_404(self):
+        with self._s3("abort_multipart", "NoSuchUpload"):
+            resp = self.client.delete(f"/api/assets/{self.asset.pk}/multipart/", {"upload_id": "u1"}, format="json")
+        self.assertEqual(resp.status_code, 404)
+
+    def test_complete_over_quota_deletes_object_and_is_413(self):
+        Org.objects.filter(pk=self.asset.org_id).update(storage_quota_bytes=1000)
+        storage = mock.Mock()
+        storage.complete_multipart.return_value = 5000  # client declared less than it sent
+        with mock.patch("api.views_content.s3_storage", return_value=storage):
+            resp = self.client.post(f"/api/assets/{self.asset.pk}/multipart/complete/",
+                                    {"upload_id": "u1", "parts": [{"PartNumber": 1, "ETag": "e"}]}, format="json")
+        self.assertEqual((resp.status_code, resp.json()["quota_bytes"]), (413, 1000))
+        storage.delete.assert_called_once_with(self.asset.storage_key)
+        self.asset.refresh_from_db()
+        self.assertEqual((self.asset.ready, self.asset.size_bytes), (False, 0))
+        self.assertEqual(Org.objects.get(pk=self.asset.org_id).storage_used_bytes, 0)
+
+
+class CasDedupScopeTests(TestCase):
+    sha = "ab" * 32
+
+    def setUp(self):
+        self.lesson_a = make_lesson(title="A")
+        blob = AssetBlob.objects.create(sha256=self.sha, storage_key=blob_key(self.sha), size_bytes=10, ref_count=1)
+        LessonAsset.objects.create(org=self.lesson_a.org, lesson=self.lesson_a, type="PDF", blob=blob,
+                                   sha256=self.sha, storage_key=blob.storage_key, size_bytes=10, ready=True)
+
+    def test_hash_alone_does_not_link_another_orgs_blob(self):
+        lesson_b = make_lesson(org=Org.objects.create(name="Other"), title="B")
+        asset = LessonAsset.objects.create(org=lesson_b.org, lesson=lesson_b, type="PDF")
+        self.assertFalse(attach_existing(asset, self.sha))
+        asset.refresh_from_db()
+        self.assertFalse(asset.ready)
+        self.assertIsNone(asset.blob_id)
+
+    def test_same_org_hash_links_existing_blob(self):
+        asset = LessonAsset.objects.create(org=self.lesson_a.org, lesson=self.lesson_a, type="PDF")
+        self.assertTrue(attach_existing(asset, self.sha))
+        self.assertEqual(AssetBlob.objects.get(sha256=self.sha).ref_count, 2)
+
+
+class _AcceptConsumer(AsyncWebsocketConsumer):
+    async def connect(self):
+        await self.accept()
+
+
+@override_settings(ALLOWED_HOSTS=["lms.ai1.com.mm"], CORS_ALLOW_ALL_ORIGINS=False,
+                   CORS_ALLOWED_ORIGINS=["https://lms.myanmarlink.online"])
+class WebsocketOriginTests(TestCase):
+    def setUp(self):
+        # the session path's database_sync_to_async would close the test transaction's connection
+        patcher = mock.patch("channels.db.close_old_connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _connect(self, origin=None, token=""):
+        async def run():
+            app = QueryTokenAuthMiddleware(WebsocketOriginValidator(_AcceptConsumer.as_asgi()))
+            headers = [(b"origin", origin.encode())] if origin else []
+            comm = WebsocketCommunicator(app, f"/ws/x/?token={token}", headers=headers)
+            connected, _ = await comm.connect()
+            await comm.disconnect()
+            return connected
+        return async_to_sync(run)()
+
+    def test_cors_frontend_and_own_host_are_accepted(self):
+        self.assertTrue(self._connect("https://lms.myanmarlink.online"))
+        self.assertTrue(self._connect("https://lms.ai1.com.mm"))
+        self.assertFalse(self._connect("https://evil.example"))
+
+    def test_missing_origin_needs_a_valid_query_token(self):
+        token = str(AccessToken.for_user(make_user("app@example.com")))
+        self.assertTrue(self._connect(token=token))
+        self.assertFalse(self._connect())
+        self.assertFalse(self._connect(token="not-a-jwt"))
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class PresenceAccessTests(TestCase):
+    def setUp(self):
+        self.lesson = make_lesson()
+        self.org = self.lesson.org
+        self.owner = make_user("owner@example.com")
+        self.sess = LiveSession.objects.create(org=self.org, title="S", channel_name="s-1", owner=self.owner)
+        self.lesson.live_session = self.sess
+        self.lesson.save(update_fields=["live_session"])
+
+    def _connect(self, user):
+        async def run():
+            comm = WebsocketCommunicator(
+                SessionPresenceConsumer.as_asgi(), f"/ws/sessions/{self.sess.pk}/presence/",
+            )
+            comm.scope["url_route"] = {"kwargs": {"session_id": str(self.sess.pk)}}
+            comm.scope["user"] = user
+            return await comm.connect()
+        return async_to_sync(run)()
+
+    def _member(self, email):
+        user = make_user(email)
+        OrgMembership.objects.create(org=self.org, user=user, role="STUDENT")
+        return user
+
+    def test_outsiders_are_refused(self):
+        self.assertEqual(self._connect(make_user("stranger@example.com")), (False, 4403))
+        self.assertEqual(self._connect(self._member("bystander@example.com")), (False, 4403))
+
+    def test_other_org_student_with_attendance_is_refused(self):
+        user = make_user("elsewhere@example.com")
+        OrgMembership.objects.create(org=Org.objects.create(name="Other"), user=user, role="STUDENT")
+        Attendance.objects.create(org=self.org, session=self.sess, user=user)
+        self.assertEqual(self._connect(user), (False, 4403))
+
+    def test_owner_enrolled_or_attending_members_may_watch(self):
+        enrolled = self._member("enrolled@example.com")
+        Enrollment.objects.create(org=self.org, course=self.lesson.module.course, user=enrolled)
+        attending = self._member("attending@example.com")
+        Attendance.objects.create(org=self.org, session=self.sess, user=attending)
+        self.assertTrue(may_watch(enrolled, self.sess))
+        self.assertTrue(may_watch(attending, self.sess))
+        OrgMembership.objects.create(org=self.org, user=self.owner, role="TEACHER")
+        self.assertTrue(may_watch(self.owner, self.sess))
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        self.lesson = make_lesson()
+        self.owner = make_user("host@example.com")
+        self.sess = LiveSession.objects.create(org=self.lesson.org, title="S", channel_name="s-hold",
+                                               owner=self.owner, max_participants=2)
+        self.redis = admission._conn()
+        self.redis.delete(admission.seats_key(self.sess.pk), heartbeats.SEEN_KEY)
+        self.addCleanup(self.redis.delete, admission.seats_key(self.sess.pk), heartbeats.SEEN_KEY)
+
+    def _score(self, user):
+        return self.redis.zscore(admission.seats_key(self.sess.pk), user.pk)
+
+    def test_seat_is_a_short_hold_that_heartbeats_slide(self):
+        user = make_user("student@example.com")
+        admitted, _, expires = admission.admit(self.sess, user.pk)
+        self.assertTrue(admitted)
+        # an hour-long class → the hold is still SEAT_HOLD_SEC, not the session end
+        self.assertLessEqual(expires, time.time() + settings.SEAT_HOLD_SEC + 1)
+        self.redis.zadd(admission.seats_key(self.sess.pk), {user.pk: int(time.time()) + 5})
+        heartbeats.start(self.sess.pk, user.pk)
+        self.assertTrue(heartbeats.beat(self.sess.pk, user.pk))
+        self.assertGreater(self._score(user), time.time() + settings.SEAT_HOLD_SEC - 5)
+
+    def test_heartbeat_does_not_readmit_a_released_seat(self):
+        user = make_user("student@example.com")
+        admission.admit(self.sess, user.pk)
+        heartbeats.start(self.sess.pk, user.pk)
+        admission.release(self.sess.pk, user.pk)
+        heartbeats.beat(self.sess.pk, user.pk)
+        self.assertIsNone(self._score(user))
+
+    def test_sweeper_frees_lapsed_holds_mid_class(self):
+        gone, live = make_user("gone@example.com"), make_user("live@example.com")
+        for user in (gone, live):
+            admitted, _, expires = admission.admit(self.sess, user.pk)
+            self.assertTrue(admitted)
+            SeatReservation.objects.create(org=self.sess.org, session=self.sess, user=user, state="PENDING",
+                                           expires_at=timezone.now() + timedelta(seconds=expires - time.time()))
+        self.assertFalse(admission.admit(self.sess, make_user("third@example.com").pk)[0])  # room full
+        # SEAT_HOLD_SEC later, while the class is still on: `live` kept heartbeating, `gone` did not
+        key = admission.seats_key(self.sess.pk)
+        self.redis.zadd(key, {gone.pk: int(time.time()) - 1, live.pk: int(time.time()) + 60})
+        SeatReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(release_expired_seats(), 1)
+
+        seats = {s.user_id: s for s in SeatReservation.objects.all()}
+        self.assertEqual(seats[gone.pk].state, "RELEASED")
+        self.assertEqual(seats[live.pk].state, "PENDING")
+        self.assertGreater(seats[live.pk].expires_at, timezone.now())
+        self.assertTrue(admission.admit(self.sess, make_user("fourth@example.com").pk)[0])
+
+    def test_flush_releases_seats_of_silent_members(self):
+        silent, live = make_user("silent@example.com"), make_user("live@example.com")
+        joined = timezone.now() - timedelta(minutes=5)
+        for user in (silent, live):  # what LiveSessionViewSet.join does
+            _, _, expires = admission.admit(self.sess, user.pk)
+            SeatReservation.objects.create(org=self.sess.org, session=self.sess, user=user, state="PENDING",
+                                           expires_at=timezone.now() + timedelta(seconds=expires - time.time()))
+            open_segment(Attendance.objects.create(org=self.sess.org, session=self.sess, user=user,
+                                                   joined_at=joined), joined)
+            heartbeats.start(self.sess.pk, user.pk)
+        # `silent` never pinged after joining: join was its only heartbeat
+        stale = int(time.time()) - settings.HEARTBEAT_TIMEOUT_SEC - 10
+        self.redis.zadd(heartbeats.SEEN_KEY, {f"{self.sess.pk}:{silent.pk}": stale})
+
+        flush_attendance()
+
+        self.assertIsNotNone(Attendance.objects.get(user=silent).left_at)
+        self.assertIsNone(Attendance.objects.get(user=live).left_at)
+        self.assertEqual(SeatReservation.objects.get(user=silent).state, "RELEASED")
+        self.assertEqual(SeatReservation.objects.get(user=live).state, "PENDING")
+        self.assertIsNone(self._score(silent))
+        self.assertIsNotNone(self._score(live))
+
+
+class AnalyticsReportTests(TestCase):
+    def setUp(self):
+        self.lesson = make_lesson()
+        self.course = self.lesson.module.course
+        self.owner = make_user("host@example.com")
+        self.start = timezone.now() - timedelta(hours=3)
+        self.sess = self._session("s-1", self.lesson, self.start)
+        self.a, self.b, self.c, self.d = (make_user(f"{n}@example.com") for n in "abcd")
+        for user in (self.a, self.b, self.d):
+            Enrollment.objects.create(org=self.lesson.org, course=self.course, user=user)
+        late = self.start + timedelta(seconds=settings.LATE_JOIN_GRACE_SEC + 60)
+        for user, seconds, joined in ((self.a, 600, self.start), (self.b, 300, late),
+                                      (self.c, 900, self.start), (self.owner, 3600, self.start)):
+            self._attend(self.sess, user, seconds, joined)
+
+    def _session(self, channel, lesson, start):
+        sess = LiveSession.objects.create(org=lesson.org, title=channel, channel_name=channel,
+                                          owner=self.owner, start_time=start)
+        lesson.live_session = sess
+        lesson.save(update_fields=["live_session"])
+        return sess
+
+    def _attend(self, sess, user, seconds, joined=None):
+        Attendance.objects.create(org=sess.org, session=sess, user=user, total_seconds=seconds,
+                                  joined_at=joined or sess.start_time)
+
+    def test_session_report_ranks_attendees_and_skips_the_host(self):
+        from .views_analytics import session_report
+        report = session_report(self.sess)
+        self.assertEqual((report["enrolled"], report["attendees"], report["enrolled_present"]), (3, 3, 2))
+        self.assertEqual((report["present_pct"], report["late_joiners"]), (66.7, 1))
+        rows = [(r["email"], r["rank"], r["percentile"], r["enrolled"], r["late"]) for r in report["rows"]]
+        self.assertEqual(rows, [
+            ("c@example.com", 1, 100.0, False, False),
+            ("a@example.com", 2, 50.0, True, False),
+            ("b@example.com", 3, 0.0, True, True),
+        ])
+
+    def test_course_report_trends_and_ranks_enrolled_students(self):
+        from .views_analytics import course_report
+        lesson2 = Lesson.objects.create(org=self.lesson.org, module=self.lesson.module, title="L2")
+        sess2 = self._session("s-2", lesson2, self.start + timedelta(hours=1))
+        self._attend(sess2, self.a, 1200)
+        report = course_report(self.course)
+        self.assertEqual((report["enrolled"], report["never_attended"]), (3, 1))
+        self.assertEqual([(s["id"], s["enrolled_present"], s["present_change"]) for s in report["sessions"]],
+                         [(self.sess.pk, 2, None), (sess2.pk, 1, -1)])
+        students = [(s["email"], s["sessions_attended"], s["attendance_pct"], s["minutes"], s["rank"])
+                    for s in report["students"]]
+        self.assertEqual(students, [("a@example.com", 2, 100.0, 30.0, 1), ("b@example.com", 1, 50.0, 5.0, 2)])
+
+    def test_session_view_is_owner_only_and_caches_ended_sessions(self):
+        client = APIClient()
+        client.force_authenticate(self.a)
+        self.assertEqual(client.get(f"/api/live-sessions/{self.sess.pk}/analytics/").status_code, 403)
+        client.force_authenticate(self.owner)
+        cache.delete(f"analytics:session:{self.sess.pk}")
+        self.assertEqual(client.get(f"/api/live-sessions/{self.sess.pk}/analytics/").json()["attendees"], 3)
+        self._attend(self.sess, self.d, 60)  # session is over → the cached report is served
+        self.assertEqual(client.get(f"/api/live-sessions/{self.sess.pk}/analytics/").json()["attendees"], 3)
+        cache.delete(f"analytics:session:{self.sess.pk}")
+
+
+class AttendanceSegmentTests(TestCase):
+    def test_rejoin_adds_a_segment_instead_of_resetting(self):
+        from .utils_attendance import close_segments
+        lesson = make_lesson()
+        user = make_user("student@example.com")
+        sess = LiveSession.objects.create(org=lesson.org, title="S", channel_name="seg-1", owner=make_user("h@example.com"))
+        t0 = timezone.now() - timedelta(hours=1)
+        att = Attendance.objects.create(org=lesson.org, session=sess, user=user, joined_at=t0)
+        for start, end in ((0, 10), (20, 25)):
+            open_segment(att, t0 + timedelta(minutes=start))
+            open_segment(att, t0 + timedelta(minutes=start + 1))  # second tab: same interval
+            close_segments(Attendance.objects.filter(pk=att.pk), t0 + timedelta(minutes=end))
+        att.refresh_from_db()
+        self.assertEqual((att.total_seconds, att.segments.count()), (15 * 60, 2))
+        self.assertEqual((att.joined_at, att.left_at), (t0, t0 + timedelta(minutes=25)))
+
+
+@override_settings(MEDIA_LINK_SECRET="test-secret", MEDIA_LINK_TTL_SEC=3600, MEDIA_LINK_BUCKET_SEC=300)
+class SecureLinkTests(SimpleTestCase):
+    def _url(self, now, scope="/org/1/asset/2/", name="hls/index.m3u8"):
+        with mock.patch("api.utils_sign.time.time", return_value=now):
+            return secure_media_url(scope, name)
+
+    def test_token_is_nginx_secure_link_md5_over_expiry_and_dir(self):
+        url, expires = self._url(1000)
+        raw = hashlib.md5(f"{expires}/org/1/asset/2 test-secret".encode()).digest()
+        token = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+        self.assertEqual(url, f"/secure-media/{token}/{expires}/org/1/asset/2/-/hls/index.m3u8")
+
+    def test_expiry_rounds_up_to_the_bucket(self):
+        url, expires = self._url(1000)
+        self.assertEqual(expires, 4800)  # 1000 + 3600 → next multiple of 300
+        self.assertEqual(self._url(1199), (url, expires))  # same bucket → same URL (cache hits)
+        self.assertEqual(self._url(1201)[1], 5100)
+        self.assertNotEqual(secure_link_token("org/1/asset/3", expires), secure_link_token("org/1/asset/2", expires))
+
+
+class HlsPlaylistTests(MediaRootMixin, TestCase):
+    hls_rel = "org/1/lesson/1/asset/7/hls"
+
+    def setUp(self):
+        super().setUp()
+        invalidate(self.hls_rel)
+        self.addCleanup(invalidate, self.hls_rel)
+        self._write("index.m3u8", "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000\n360p/index.m3u8\n")
+        self._write("360p/index.m3u8", "#EXTM3U\n#EXT-X-MAP:URI=\"init.mp4\"\n#EXTINF:6.0,\nseg_00000.ts\n"
+                                       "#EXTINF:6.0,\nhttps://cdn.example/ad.ts\n#EXTINF:6.0,\n../../../../secret\n")
+        self.token = PLAYLIST_SIGNER.sign(f"7:{self.hls_rel}")
+
+    def _write(self, name, text):
+        path = os.path.join(self.media_root, self.hls_rel, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def _get(self, name, pk=7, token=None):
+        return self.client.get(f"/api/assets/{pk}/hls/{name}", {"token": token or self.token})
+
+    def test_variants_point_back_here_and_segments_get_media_tokens(self):
+        query = urlencode({"token": self.token})
+        master = self._get("index.m3u8").content.decode()
+        self.assertIn(f"/api/assets/7/hls/360p/index.m3u8?{query}\n", master)
+
+        lines = self._get("360p/index.m3u8").content.decode().splitlines()
+        signed = [SIGNER.unsign(line.split("token=")[1].split('"')[0]) for line in lines if "/protected/media" in line]
+        self.assertEqual(signed, [f"{self.hls_rel}/360p/init.mp4", f"{self.hls_rel}/360p/seg_00000.ts"])
+        self.assertIn("https://cdn.example/ad.ts", lines)  # absolute and escaping URIs are left unsigned
+        self.assertIn("../../../../secret", lines)
+
+    def test_token_is_bound_to_the_asset(self):
+        self.assertEqual(self._get("index.m3u8", pk=8).status_code, 403)
+        self.assertEqual(self._get("index.m3u8", token="forged").status_code, 403)
+
+    def test_cached_template_is_dropped_by_invalidate(self):
+        self._get("index.m3u8")
+        self._write("index.m3u8", "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1400000\n720p/index.m3u8\n")
+        self.assertIn("360p/index.m3u8", self._get("index.m3u8").content.decode())  # served from the cache
+        invalidate(self.hls_rel)
+        self.assertIn("720p/index.m3u8", self._get("index.m3u8").content.decode())
+
+
+class AssetPlayBatchTests(TestCase):
+    def setUp(self):
+        self.lesson = make_lesson()
+        self.course = self.lesson.module.course
+        new = lambda **kw: LessonAsset.objects.create(org=self.lesson.org, lesson=self.lesson, type="PDF", **kw)  # noqa: E731
+        self.preview = new(ready=True, is_preview=True)
+        self.paid = new(ready=True)
+        new(ready=True, published=False)
+        new(ready=False)  # upload still in flight
+        self.student = make_user("student@example.com")
+
+    def _get(self, url, user=None):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        with self.assertNumQueries(2 if user else 1):
+            resp = client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return {a["id"]: a for a in resp.json()["assets"]}
+
+    def test_only_preview_assets_are_unlocked_without_enrollment(self):
+        for user in (None, self.student):
+            assets = self._get(f"/api/lessons/{self.lesson.pk}/play-urls/", user)
+            self.assertEqual(list(assets), [self.preview.pk, self.paid.pk])
+            self.assertFalse(assets[self.preview.pk]["locked"])
+            self.assertIn("url", assets[self.preview.pk])
+            self.assertTrue(assets[self.paid.pk]["locked"])
+            self.assertNotIn("url", assets[self.paid.pk])
+
+    def test_enrollment_unlocks_the_whole_course(self):
+        Enrollment.objects.create(org=self.lesson.org, course=self.course, user=self.student)
+        other = make_lesson(title="Other course")
+        LessonAsset.objects.create(org=other.org, lesson=other, type="PDF", ready=True)
+        assets = self._get(f"/api/courses/{self.course.pk}/play-urls/", self.student)
+        self.assertEqual(list(assets), [self.preview.pk, self.paid.pk])
+        self.assertFalse(any(a["locked"] for a in assets.values()))
+        self.assertTrue(all(a["url"].startswith("/protected/media?token=") for a in assets.values()))
+
+
+class OccupancySweepTests(TestCase):
+    def test_sweep_counts_back_to_back_segments_once(self):
+        import numpy as np
+        from .occupancy import sweep
+        # a: 0-60s, b: 30-90s, c: 60-120s → c takes a's place at t=60, never 3 at once
+        t0, peak, peak_at, seconds, curve = sweep(np.array([0.0, 30.0, 60.0]), np.array([60.0, 90.0, 120.0]), 0.0)
+        self.assertEqual((t0, peak, peak_at, seconds), (0.0, 2, 30.0, 180))
+        self.assertEqual(curve.tolist(), [2, 2, 0])
+
+    def test_batch_from_segments_to_payload(self):
+        from .occupancy import compute_batch, load_batch, payload, to_row
+        lesson = make_lesson()
+        start = timezone.now().replace(microsecond=0) - timedelta(hours=2)  # exact through epoch floats
+        sess = LiveSession.objects.create(org=lesson.org, title="S", channel_name="occ-1", owner=make_user("h@example.com"),
+                                          start_time=start, duration_minutes=60)
+        empty = LiveSession.objects.create(org=lesson.org, title="E", channel_name="occ-2", owner=sess.owner)
+        for email, begin, end in (("a@example.com", 0, 30), ("b@example.com", 10, None)):  # b never left
+            user = make_user(email)
+            att = Attendance.objects.create(org=lesson.org, session=sess, user=user, joined_at=start)
+            AttendanceSegment.objects.create(
+                attendance=att, session=sess, user=user, started_at=start + timedelta(minutes=begin),
+                ended_at=start + timedelta(minutes=end) if end is not None else None,
+            )
+        results = {r[0]: r for r in compute_batch(load_batch([sess, empty]))}
+
+        data = payload(to_row(results[sess.pk]))
+        self.assertEqual((data["peak"], data["participant_minutes"]), (2, 80.0))  # b runs to the scheduled end
+        self.assertEqual(data["peak_at"], start + timedelta(minutes=10))
+        self.assertEqual(len(data["curve"]), 61)
+        self.assertEqual((data["curve"][0], data["curve"][10], data["curve"][45]), (1, 2, 1))
+        self.assertEqual(payload(to_row(results[empty.pk]))["curve"], [])
+
+
+@override_settings(AGORA_APP_ID="app", AGORA_APP_CERT="cert", AGORA_TOKEN_REUSE_FRACTION=0.5)
+class AgoraTokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.channel = f"ch-{uuid.uuid4().hex}"  # the Redis cache outlives test runs
+        builder = mock.Mock()
+        builder.buildTokenWithUid.side_effect = lambda *args: f"token-{builder.buildTokenWithUid.call_count}"
+        patcher = mock.patch("api.agora_utils.RtcTokenBuilder", builder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.builder = builder
+
+    def test_token_is_reused_within_the_reuse_window(self):
+        first = issue_rtc_token(self.channel, 5, ttl=600)
+        self.assertEqual(issue_rtc_token(self.channel, "5", ttl=600), first)  # same numeric uid
+        self.assertEqual(self.builder.buildTokenWithUid.call_count, 1)
+        self.assertNotEqual(issue_rtc_token(self.channel, 5, role="subscriber", ttl=600), first)
+        self.assertNotEqual(issue_rtc_token(self.channel, 6, ttl=600), first)
+
+    def test_other_ttl_replaces_the_cached_token(self):
+        first = issue_rtc_token(self.channel, 5, ttl=600)
+        second = issue_rtc_token(self.channel, 5, ttl=1200)
+        self.assertNotEqual(second, first)
+        self.assertEqual(issue_rtc_token(self.channel, 5, ttl=1200), second)
+
+    @override_settings(AGORA_TOKEN_REUSE_FRACTION=0)
+    def test_zero_fraction_signs_every_time(self):
+        issue_rtc_token(self.channel, 5, ttl=600)
+        issue_rtc_token(self.channel, 5, ttl=600)
+        self.assertEqual(self.builder.buildTokenWithUid.call_count, 2)
+
+
+class RenditionRecordTests(MediaRootMixin, SimpleTestCase):
+    def _touch(self, rel):
+        path = os.path.join(self.media_root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "wb").close()
+
+    def test_detect_records_pipeline_outputs_and_play_path_reads_only_the_record(self):
+        key = "org/1/lesson/1/asset/2/source"
+        for rel in ("source", "hls/index.m3u8", "poster.jpg", "linear.pdf", "thumbs/page-1.jpg", "thumbs/page-2.jpg"):
+            self._touch(f"org/1/lesson/1/asset/2/{rel}")
+        video = detect_renditions(key, "VIDEO")
+        pdf = detect_renditions(key, "PDF")
+        self.assertEqual(video, {"source": "source", "hls": "hls/index.m3u8", "poster": "poster.jpg"})
+        self.assertEqual(pdf, {"source": "source", "linear_pdf": "linear.pdf", "thumbs": 2})
+
+        shutil.rmtree(self.media_root)  # the play path must not look at the volume
+        base = "org/1/lesson/1/asset/2"
+        play = lambda t, r: pick_play_path(LessonAsset(type=t, storage_key=key, renditions=r))  # noqa: E731
+        self.assertEqual(play("VIDEO", video), (f"{base}/hls/index.m3u8", f"{base}/hls"))
+        self.assertEqual(play("PDF", pdf), (f"{base}/linear.pdf", base))
+        self.assertEqual(play("VIDEO", {}), (key, base))  # not transcoded (yet) → the source
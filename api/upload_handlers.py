@@ -0,0 +1,103 @@
+# api/upload_handlers.py
+import hashlib
+import os
+import uuid
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class StagedUploadedFile(UploadedFile):
+    """
+    File streamed into `<dest>.<uuid>.part` beside its final path.
+    commit() renames it into place; close() without commit removes the part file.
+    """
+
+    def __init__(self, file, dest_path, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.dest_path = dest_path
+        self.sha256 = ""
+        self.committed = False
+
+    @classmethod
+    def open_for(cls, dest_path, name="source", content_type="application/octet-stream"):
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        part = f"{dest_path}.{uuid.uuid4().hex}.part"
+        return cls(open(part, "wb"), dest_path, name, content_type, 0, None)
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def finalize(self, size, sha256):
+        """Bytes are complete: make them durable before anyone renames/links them."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.size = size
+        self.sha256 = sha256
+
+    def commit(self, dest_path=None):
+        """Atomically move the staged bytes to dest_path (same directory → same filesystem)."""
+        dest_path = dest_path or self.dest_path
+        part = self.temporary_file_path()
+        if not self.file.closed:
+            self.file.close()
+        os.replace(part, dest_path)
+        self.committed = True
+        return dest_path
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        if not self.committed:
+            try:
+                os.remove(self.temporary_file_path())
+            except FileNotFoundError:
+                pass
+
+
+class StreamingAssetUploadHandler(FileUploadHandler):
+    """
+    Stream the multipart `file` field straight into the asset's directory
+    (no /tmp spool, no second copy) while computing size + SHA-256.
+
+    Must be installed before anything reads request.POST/FILES, see
+    views_content.AssetUpload.initialize_request.
+    """
+    chunk_size = 1024 * 1024  # 1 MiB, multiple of 4 as Django requires
+    field_name = "file"
+
+    def __init__(self, request=None, dest_path=""):
+        super().__init__(request)
+        self.dest_path = dest_path
+        self.file = None
+        self.active = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        # only the first `file` field is staged; anything else is dropped
+        if field_name != self.field_name or self.file is not None:
+            self.active = False
+            return
+        self.active = True
+        self.digest = hashlib.sha256()
+        self.file = StagedUploadedFile.open_for(self.dest_path, self.file_name, self.content_type)
+        self.file.charset = self.charset
+        self.file.content_type_extra = self.content_type_extra
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        self.file.write(raw_data)  # type: ignore
+        self.digest.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        self.file.finalize(file_size, self.digest.hexdigest())  # type: ignore
+        return self.file
+
+    def upload_interrupted(self):
+        if self.file is not None and not self.file.committed:
+            self.file.close()
@@ -8,7 +8,7 @@ from django.urls import NoReverseMatch
 # Import your views
 from accounts.views import MeView
 from .views_admin import admin_metrics
-from . import views_crud, views_sessions, views_agora
+from . import views_crud, views_sessions, views_agora, views_content, views_async, views_analytics
 
 # A custom router to add non-model endpoints to the API root view for discoverability
 class MyRouter(DefaultRouter):
@@ -73,6 +73,24 @@ urlpatterns = [
     path("admin/stats/", views_crud.AdminStatsView.as_view()),
     path("admin/metrics/", admin_metrics, name="admin-metrics"),
 
+    # Attendance reports (SQL aggregates; ended sessions cached)
+    path("live-sessions/<int:pk>/analytics/", views_analytics.SessionAnalyticsView.as_view(), name="session-analytics"),
+    path("courses/<int:pk>/analytics/", views_analytics.CourseAnalyticsView.as_view(), name="course-analytics"),
+    path("live-sessions/<int:pk>/occupancy/", views_analytics.SessionOccupancyView.as_view(), name="session-occupancy"),
+
+    # Asset upload / playback (MEDIA_ROOT + nginx X-Accel-Redirect)
+    path("lessons/<int:lesson_id>/assets/init/", views_async.AssetInitAsync.as_view(), name="asset-init"),
+    path("assets/<int:pk>/upload/", views_content.AssetUpload.as_view(), name="asset-upload"),
+    path("assets/<int:pk>/multipart/", views_content.AssetMultipartUpload.as_view(), name="asset-multipart"),
+    path("assets/<int:pk>/multipart/complete/", views_content.AssetMultipartComplete.as_view(), name="asset-multipart-complete"),
+    path("assets/<int:pk>/play/", views_async.AssetPlayAsync.as_view(), name="asset-play"),
+    path("lessons/<int:lesson_id>/play-urls/", views_content.AssetPlayBatch.as_view(), name="lesson-play-urls"),
+    path("courses/<int:course_id>/play-urls/", views_content.AssetPlayBatch.as_view(), name="course-play-urls"),
+    path("lessons/<int:lesson_id>/download.zip", views_content.AssetZip.as_view(), name="lesson-download-zip"),
+    path("modules/<int:module_id>/download.zip", views_content.AssetZip.as_view(), name="module-download-zip"),
+    path("assets/<int:pk>/hls/<path:name>", views_content.HlsPlaylist.as_view(), name="asset-hls"),
+    path("assets/<int:pk>/sprites.vtt", views_content.SpriteTrack.as_view(), name="asset-sprites"),
+
     # --- ADD THIS FOR WEB-BASED (REDIRECT) SOCIAL LOGIN ---
     # This provides URLs like /api/web-auth/google/login/ for the browser flow
     path("web-auth/", include('allauth.urls')),
@@ -0,0 +1,132 @@
+# api/utils_async.py
+"""
+DRF's authentication/permission steps for plain async views, the raw ASGI
+upload app and WebSockets (DRF itself is sync-only): Bearer JWT first, then
+the session. Plus the bits streaming responses need to stay streamed under ASGI.
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.auth import AuthMiddlewareStack
+from channels.security.websocket import OriginValidator, WebsocketDenier
+from corsheaders.conf import conf as cors_conf
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.middleware.csrf import CsrfViewMiddleware
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from orgs.models import OrgMembership
+
+_jwt = JWTAuthentication()
+
+
+def is_asgi(request) -> bool:
+    """Served by Django's ASGI handler? (DRF Request or plain HttpRequest)"""
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+async def iterate_in_thread(iterator):
+    """
+    Sync iterator → async iterator, every next() in a worker thread. Under ASGI
+    Django list()s a sync StreamingHttpResponse body before sending anything.
+    """
+    it = iter(iterator)
+    done = object()
+    try:
+        while (item := await asyncio.to_thread(next, it, done)) is not done:
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+
+async def user_from_bearer(header):
+    """`Authorization` header value → active user, or None."""
+    raw = _jwt.get_raw_token(header.encode("latin1") if isinstance(header, str) else header)
+    if raw is None:
+        return None
+    try:
+        # may consult the token blacklist → keep it off the event loop
+        token = await sync_to_async(_jwt.get_validated_token)(raw)
+    except (InvalidToken, TokenError):
+        return None
+    user = await get_user_model().objects.filter(
+        **{jwt_settings.USER_ID_FIELD: token.get(jwt_settings.USER_ID_CLAIM)}
+    ).afirst()
+    return user if user is not None and user.is_active else None
+
+
+def _csrf_ok(request) -> bool:
+    # same check DRF's SessionAuthentication runs (views are csrf_exempt)
+    check = CsrfViewMiddleware(lambda r: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {}) is None
+
+
+async def aauthenticate(request):
+    header = request.headers.get("Authorization")
+    if header:
+        return await user_from_bearer(header)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    if request.method not in SAFE_METHODS and not _csrf_ok(request):
+        return None
+    return user
+
+
+async def ais_org_member(user, org) -> bool:
+    return bool(user and org and await OrgMembership.objects.filter(org=org, user=user).aexists())
+
+
+def _query_token(scope) -> str:
+    return parse_qs(scope.get("query_string", b"").decode()).get("token", [""])[0]
+
+
+class QueryTokenAuthMiddleware:
+    """
+    Channels: browsers can't set headers on a WebSocket, so `?token=<access JWT>`
+    authenticates; without it the session cookie (AuthMiddlewareStack) does.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.session_app = AuthMiddlewareStack(app)
+
+    async def __call__(self, scope, receive, send):
+        token = _query_token(scope)
+        if not token:
+            return await self.session_app(scope, receive, send)
+        user = await user_from_bearer(f"Bearer {token}")
+        return await self.app(dict(scope, user=user or AnonymousUser()), receive, send)
+
+
+class WebsocketOriginValidator(OriginValidator):
+    """
+    AllowedHostsOriginValidator plus the frontends CORS already trusts
+    (CORS_ALLOWED_ORIGINS, which may live on other hosts). No Origin header
+    means a native client, not a browser page: accepted only when `?token=`
+    authenticated it. Sits inside QueryTokenAuthMiddleware to see that user.
+    """
+
+    def __init__(self, application):
+        hosts = settings.ALLOWED_HOSTS
+        if settings.DEBUG and not hosts:
+            hosts = ["localhost", "127.0.0.1", "[::1]"]
+        allowed = ["*"] if cors_conf.CORS_ALLOW_ALL_ORIGINS else [*hosts, *cors_conf.CORS_ALLOWED_ORIGINS]
+        super().__init__(application, allowed)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket" and not any(name == b"origin" for name, _ in scope.get("headers", [])):
+            user = scope.get("user")
+            if _query_token(scope) and user is not None and user.is_authenticated:
+                return await self.application(scope, receive, send)
+            return await WebsocketDenier()(scope, receive, send)
+        return await super().__call__(scope, receive, send)
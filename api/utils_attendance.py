@@ -0,0 +1,68 @@
+# api/utils_attendance.py
+"""
+Attendance as a list of AttendanceSegment intervals. Attendance.total_seconds
+always equals SUM(segments.seconds): every change to a segment's seconds moves
+the total by the same delta, under the attendance row lock, so a student who
+reconnects ten times keeps every minute.
+"""
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Attendance, AttendanceSegment
+
+
+def _seconds(start, end) -> int:
+    return max(0, int((end - start).total_seconds()))
+
+
+def open_segment(att, now):
+    """Join: start an interval unless one is still open (second tab, reload without leave)."""
+    with transaction.atomic():
+        att = Attendance.objects.select_for_update().get(pk=att.pk)
+        if not att.segments.filter(ended_at__isnull=True).exists():
+            AttendanceSegment.objects.create(
+                attendance=att, session_id=att.session_id, user_id=att.user_id, started_at=now,
+            )
+        if att.left_at is not None:
+            att.left_at = None
+            att.save(update_fields=["left_at"])
+    return att
+
+
+def advance(att, seg, seen_at, close: bool):
+    """
+    Move an open segment up to `seen_at` (and end it when `close`); the caller
+    holds the attendance row lock and saves both rows (bulk in flush_attendance).
+    """
+    seconds = _seconds(seg.started_at, seen_at)
+    att.total_seconds += seconds - seg.seconds
+    seg.seconds = seconds
+    if close:
+        seg.ended_at = att.left_at = seen_at
+
+
+def close_segments(queryset, at) -> int:
+    """Leave / admin: end the open segments of the given attendances at `at`."""
+    with transaction.atomic():
+        atts = {a.pk: a for a in queryset.select_for_update(of=("self",)).filter(left_at__isnull=True)}
+        segs = list(AttendanceSegment.objects.filter(attendance_id__in=atts, ended_at__isnull=True))
+        for seg in segs:
+            advance(atts[seg.attendance_id], seg, at, close=True)
+        for att in atts.values():
+            att.left_at = at  # also rows whose segment went missing
+        AttendanceSegment.objects.bulk_update(segs, ["ended_at", "seconds"])
+        Attendance.objects.bulk_update(list(atts.values()), ["left_at", "total_seconds"])
+    return len(atts)
+
+
+def recompute_totals(queryset) -> int:
+    """Repair: total_seconds = SUM(segments.seconds)."""
+    atts = list(queryset.only("id", "total_seconds"))
+    totals = dict(
+        AttendanceSegment.objects.filter(attendance_id__in=[a.pk for a in atts])
+        .values("attendance_id").annotate(s=Sum("seconds")).values_list("attendance_id", "s")
+    )
+    for att in atts:
+        att.total_seconds = totals.get(att.pk) or 0
+    Attendance.objects.bulk_update(atts, ["total_seconds"], batch_size=1000)
+    return len(atts)
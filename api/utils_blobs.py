@@ -0,0 +1,103 @@
+# api/utils_blobs.py
+"""
+Optional content-addressed layout (settings.ASSET_CAS_ENABLED).
+
+MEDIA_ROOT/cas/<aa>/<bb>/<sha256>/source   ← bytes, stored once
+MEDIA_ROOT/cas/<aa>/<bb>/<sha256>/hls/...  ← derived outputs, shared too
+
+LessonAsset.storage_key points at the blob's `source`, AssetBlob.ref_count
+tracks how many assets use it; the last release deletes the directory.
+Hash-only dedup (no upload) stays inside one org; see attach_existing.
+"""
+import os
+import shutil
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models_academics import AssetBlob, LessonAsset
+from .utils_quota import charge_storage
+
+
+def cas_enabled() -> bool:
+    return bool(getattr(settings, "ASSET_CAS_ENABLED", False))
+
+
+def blob_key(sha256: str) -> str:
+    return f"cas/{sha256[:2]}/{sha256[2:4]}/{sha256}/source"
+
+
+def _abs(rel: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, rel)
+
+
+def attach_existing(asset: LessonAsset, sha256: str) -> bool:
+    """
+    Hash-check shortcut used by AssetInitAsync: if the blob is already stored,
+    point the asset at it and mark ready without transferring any bytes.
+
+    A digest is not proof of possession, so the shortcut only covers blobs the
+    asset's own org already uses; across orgs the bytes must be uploaded
+    (attach_upload hashes them, and still stores them only once).
+    """
+    sha256 = (sha256 or "").lower()
+    with transaction.atomic():
+        blob = AssetBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None or not blob.assets.filter(org_id=asset.org_id).exclude(pk=asset.pk).exists():  # type: ignore
+            return False
+        _link(asset, blob)
+    return True
+
+
+def attach_upload(asset: LessonAsset, staged) -> AssetBlob:
+    """
+    Attach a StagedUploadedFile to its blob. A new blob takes ownership of the
+    staged bytes (atomic rename); a duplicate simply discards them.
+    """
+    with transaction.atomic():
+        blob, created = AssetBlob.objects.select_for_update().get_or_create(
+            sha256=staged.sha256,
+            defaults={"storage_key": blob_key(staged.sha256), "size_bytes": staged.size},
+        )
+        if created or not os.path.exists(_abs(blob.storage_key)):
+            os.makedirs(os.path.dirname(_abs(blob.storage_key)), exist_ok=True)
+            staged.commit(_abs(blob.storage_key))
+        else:
+            staged.close()  # duplicate → drop the part file
+        _link(asset, blob)
+    return blob
+
+
+def _link(asset: LessonAsset, blob: AssetBlob):
+    old_blob_id = asset.blob_id  # type: ignore
+    if old_blob_id == blob.pk:
+        return
+    AssetBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+    charge_storage(asset.org_id, blob.size_bytes - asset.size_bytes)  # type: ignore
+    asset.blob = blob
+    asset.sha256 = blob.sha256
+    asset.storage_key = blob.storage_key
+    asset.size_bytes = blob.size_bytes
+    asset.ready = True
+    asset.renditions = {"source": os.path.basename(blob.storage_key)}
+    asset.save(update_fields=["blob", "sha256", "storage_key", "size_bytes", "ready", "renditions"])
+    if old_blob_id:  # re-upload with different content
+        release_blob(old_blob_id)
+
+
+def release_blob(blob_id):
+    """Drop one reference; the last one removes row + files after commit."""
+    with transaction.atomic():
+        blob = AssetBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            AssetBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+            return
+        if blob.assets.exists():  # type: ignore # counter drifted → resync from rows
+            AssetBlob.objects.filter(pk=blob.pk).update(ref_count=blob.assets.count())  # type: ignore
+            return
+        blob_dir = os.path.dirname(_abs(blob.storage_key))
+        blob.delete()
+        transaction.on_commit(lambda: shutil.rmtree(blob_dir, ignore_errors=True))
@@ -0,0 +1,68 @@
+# api/utils_hls.py
+"""
+Playlist templates for HlsPlaylist: an .m3u8 is parsed once into
+[literal, uri, literal, uri, ..., literal] and cached, so serving it with
+per-request signed URLs is just a join over the parts.
+"""
+import posixpath
+import re
+
+from django.core.cache import cache
+
+_URI_ATTR = re.compile(r'(URI=")([^"]+)(")')
+CACHE_TTL = 24 * 3600
+
+
+def parse_playlist(text: str) -> list:
+    parts, lit = [], ""
+    for line in text.splitlines():
+        s = line.strip()
+        if s and not s.startswith("#"):
+            parts += [lit, s]
+            lit = "\n"
+            continue
+        # tags that carry a URI attribute (EXT-X-KEY, EXT-X-MAP, EXT-X-MEDIA, ...)
+        pos = 0
+        for m in _URI_ATTR.finditer(line):
+            parts += [lit + line[pos:m.end(1)], m.group(2)]
+            lit, pos = "", m.start(3)
+        lit += line[pos:] + "\n"
+    parts.append(lit)
+    return parts
+
+
+def render_playlist(parts: list, sign_uri) -> str:
+    """Odd indices are URIs (relative to the playlist) → sign_uri(uri)."""
+    return "".join(sign_uri(p) if i % 2 else p for i, p in enumerate(parts))
+
+
+def resolve(playlist_name: str, uri: str):
+    """Relative URI → path inside the hls dir, or None if absolute / escaping."""
+    if "://" in uri or uri.startswith("/"):
+        return None
+    rel = posixpath.normpath(posixpath.join(posixpath.dirname(playlist_name), uri))
+    return None if rel.startswith("..") else rel
+
+
+def cache_key(hls_rel_dir: str, name: str) -> str:
+    return f"hls:tpl:{hls_rel_dir}:{name}"
+
+
+def load_template(hls_rel_dir: str, hls_abs_dir: str, name: str):
+    key = cache_key(hls_rel_dir, name)
+    parts = cache.get(key)
+    if parts is None:
+        try:
+            with open(posixpath.join(hls_abs_dir, name), encoding="utf-8") as f:
+                parts = parse_playlist(f.read())
+        except FileNotFoundError:
+            return None
+        cache.set(key, parts, CACHE_TTL)
+    return parts
+
+
+def invalidate(hls_rel_dir: str):
+    # django_redis only; other backends just wait for CACHE_TTL
+    delete_pattern = getattr(cache, "delete_pattern", None)
+    if delete_pattern:
+        delete_pattern(cache_key(hls_rel_dir, "*"))
@@ -0,0 +1,34 @@
+# api/utils_quota.py
+"""
+Per-org storage accounting. Org.storage_used_bytes mirrors
+SUM(LessonAsset.size_bytes) for the org and is moved with single
+F() updates wherever an asset's size changes, so concurrent uploads
+never lose an increment. CAS-deduplicated assets count in full for
+every org that uses them (logical usage, like the recompute).
+"""
+from django.db.models import F
+
+from orgs.models import Org
+
+
+def charge_storage(org_id, delta: int):
+    if org_id and delta:
+        Org.objects.filter(pk=org_id).update(storage_used_bytes=F("storage_used_bytes") + delta)
+
+
+def quota_allows(org, incoming: int) -> bool:
+    """
+    Checked at init against the declared size, then against the bytes actually
+    received (views_content.upload_rejection). Soft limit — concurrent uploads
+    may overshoot by one file.
+    """
+    quota = org.storage_quota_bytes
+    return not quota or org.storage_used_bytes + max(0, incoming) <= quota
+
+
+def quota_exceeded_payload(org) -> dict:
+    return {
+        "detail": "storage quota exceeded",
+        "used_bytes": org.storage_used_bytes,
+        "quota_bytes": org.storage_quota_bytes,
+    }
@@ -0,0 +1,141 @@
+# api/utils_range.py
+"""
+Range-aware file responses for deployments without nginx (MEDIA_SERVE_DIRECT).
+
+Under WSGI (gunicorn gthread/sync) the FileResponse goes through
+`wsgi.file_wrapper`, which gunicorn sends with os.sendfile from the current
+offset for exactly Content-Length bytes → zero-copy. ASGI has no sendfile
+channel in Django (a sync body would be read whole before sending), so
+requests served by the ASGI handler get bounded blocks read off the event loop.
+"""
+import asyncio
+import mimetypes
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from .utils_async import is_asgi
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+
+class _RangeFile:
+    """File view limited to `length` bytes from the current offset; keeps fileno() for sendfile."""
+
+    def __init__(self, f, length: int):
+        self._f = f
+        self._left = length
+
+    def read(self, size=-1):
+        if self._left <= 0:
+            return b""
+        size = self._left if size is None or size < 0 else min(size, self._left)
+        data = self._f.read(size)
+        self._left -= len(data)
+        return data
+
+    def fileno(self):
+        return self._f.fileno()
+
+    def seek(self, *args):
+        return self._f.seek(*args)
+
+    def tell(self):
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+
+def parse_range(header: str, size: int):
+    """
+    Single byte range → (start, end) inclusive; None = serve whole file;
+    "unsatisfiable" for a range outside the file. Multi-range is ignored (RFC allows).
+    """
+    m = _RANGE_RE.match((header or "").strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if size == 0:  # no byte of an empty file can be addressed
+        return "unsatisfiable"
+    first, last = m.group(1), m.group(2)
+    if not first:  # suffix: last N bytes
+        n = int(last)
+        if n == 0:
+            return "unsatisfiable"
+        return max(0, size - n), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+async def _aiter_range(f, length: int, block: int = 256 * 1024):
+    try:
+        while length > 0:
+            data = await asyncio.to_thread(f.read, min(block, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def _if_range_ok(request, etag: str, mtime: float) -> bool:
+    cond = request.headers.get("If-Range")
+    if not cond:
+        return True
+    if cond.startswith('"') or cond.startswith("W/"):
+        return cond == etag  # strong comparison only
+    ts = parse_http_date_safe(cond)
+    return ts is not None and int(mtime) == ts  # must be the Last-Modified we sent
+
+
+def serve_file_range(request, abs_path: str):
+    try:
+        f = open(abs_path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        return HttpResponse(status=404)
+    st = os.fstat(f.fileno())
+    size = st.st_size
+    etag = f'"{st.st_mtime_ns:x}-{size:x}"'
+    ctype = mimetypes.guess_type(abs_path)[0] or "application/octet-stream"
+
+    rng = None
+    if "Range" in request.headers and _if_range_ok(request, etag, st.st_mtime):
+        rng = parse_range(request.headers["Range"], size)
+    if rng == "unsatisfiable":
+        f.close()
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+        return resp
+
+    start, end = rng if rng else (0, size - 1)
+    length = max(0, end - start + 1)
+    if request.method == "HEAD":
+        f.close()
+        resp = HttpResponse(status=206 if rng else 200, content_type=ctype)
+    elif is_asgi(request):
+        f.seek(start)
+        resp = StreamingHttpResponse(_aiter_range(f, length), status=206 if rng else 200, content_type=ctype)
+    else:
+        f.seek(start)
+        resp = FileResponse(_RangeFile(f, length), status=206 if rng else 200, content_type=ctype)
+    resp["Content-Length"] = str(length)
+    if rng:
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+    resp["Accept-Ranges"] = "bytes"
+    resp["ETag"] = etag
+    resp["Last-Modified"] = http_date(st.st_mtime)
+    return resp
+
+
+async def aserve_file_range(request, abs_path: str):
+    """serve_file_range for async views: open()/fstat may block on a slow disk → off the loop."""
+    return await asyncio.to_thread(serve_file_range, request, abs_path)
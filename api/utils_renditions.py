@@ -0,0 +1,66 @@
+# api/utils_renditions.py
+"""
+LessonAsset.renditions is written by the media pipeline (and reconcile_renditions)
+so the play path never has to stat the media volume:
+
+{"source": "source", "hls": "hls/index.m3u8", "poster": "poster.jpg",
+ "sprites": "sprites/index.vtt", "linear_pdf": "linear.pdf", "thumbs": 12}
+(paths relative to the asset's storage dir)
+"""
+import os
+
+from django.conf import settings
+
+VIDEO_TYPES = ("VIDEO", "RECORDING")
+# pipeline outputs beside the source; anything else in an asset dir is not ours
+DERIVED_ROOTS = ("hls", "thumbs", "linear.pdf", "poster.jpg", "sprites")
+
+
+def source_key(asset) -> str:
+    """Source bytes, relative to MEDIA_ROOT: viewset uploads keep them at `file`
+    (save() still fills storage_key), init/CAS uploads at storage_key."""
+    return (asset.file.name if asset.file else "") or asset.storage_key
+
+
+def storage_dir(storage_key: str) -> str:
+    return storage_key.rsplit("/", 1)[0]
+
+
+def detect_renditions(storage_key: str, asset_type: str) -> dict:
+    """Filesystem scan — pipeline / reconcile only, never per request."""
+    base_rel = storage_dir(storage_key)
+    abs_dir = os.path.join(settings.MEDIA_ROOT, base_rel)
+    found = {}
+    src_name = storage_key.rsplit("/", 1)[-1]
+    if os.path.isfile(os.path.join(abs_dir, src_name)):
+        found["source"] = src_name
+    if asset_type in VIDEO_TYPES:
+        if os.path.isfile(os.path.join(abs_dir, "hls", "index.m3u8")):
+            found["hls"] = "hls/index.m3u8"
+        if os.path.isfile(os.path.join(abs_dir, "poster.jpg")):
+            found["poster"] = "poster.jpg"
+        if os.path.isfile(os.path.join(abs_dir, "sprites", "index.vtt")):
+            found["sprites"] = "sprites/index.vtt"
+    if asset_type == "PDF":
+        if os.path.isfile(os.path.join(abs_dir, "linear.pdf")):
+            found["linear_pdf"] = "linear.pdf"
+        thumbs = os.path.join(abs_dir, "thumbs")
+        if os.path.isdir(thumbs):
+            n = sum(1 for e in os.scandir(thumbs) if e.name.endswith(".jpg"))
+            if n:
+                found["thumbs"] = n
+    return found
+
+
+def pick_play_path(asset) -> tuple[str, str]:
+    """
+    (rel_path, scope_dir) to hand out for playback, decided from the record alone.
+    scope_dir is the directory a secure link should cover.
+    """
+    base_dir = storage_dir(asset.storage_key)
+    r = asset.renditions or {}
+    if asset.type in VIDEO_TYPES and r.get("hls"):
+        return f"{base_dir}/{r['hls']}", f"{base_dir}/hls"
+    if asset.type == "PDF" and r.get("linear_pdf"):
+        return f"{base_dir}/{r['linear_pdf']}", base_dir
+    return asset.storage_key, base_dir
@@ -1,6 +1,38 @@
+import base64, hashlib, time
+from urllib.parse import quote
+from django.conf import settings
 from django.core import signing
 SIGNER = signing.TimestampSigner(salt="asset-sign")
+PLAYLIST_SIGNER = signing.TimestampSigner(salt="hls-playlist")  # "<asset id>:<hls dir>"
 
 def sign_path(path:str, max_age_seconds:int=3600):
-    # caller keeps the signed value, ProtectedMedia will check TTL
+    # caller keeps the signed value, ProtectedMediaAsync will check TTL
     return SIGNER.sign(path)
+
+
+def secure_link_token(scope_dir: str, expires: int) -> str:
+    """
+    nginx `secure_link_md5 "$sl_expires/$sl_dir $media_link_secret"` →
+    base64url(md5(...)) without padding. nginx only supports MD5 here.
+    """
+    raw = f"{expires}/{scope_dir} {settings.MEDIA_LINK_SECRET}".encode()
+    return base64.urlsafe_b64encode(hashlib.md5(raw).digest()).decode().rstrip("=")
+
+
+def secure_media_url(scope_dir: str, rel_file: str, ttl: int | None = None) -> tuple[str, int]:
+    """
+    /secure-media/<token>/<expires>/<scope_dir>/-/<rel_file>
+
+    The signature covers the whole scope_dir, so relative URLs inside an HLS
+    playlist (variants, segments) resolve under the same signed prefix and
+    nginx serves them without calling Django.
+    Returns (url, expires_at).
+    """
+    ttl = ttl or settings.MEDIA_LINK_TTL_SEC
+    # round up to a bucket so repeated plays reuse one URL (browser/CDN cache hits)
+    bucket = max(1, int(getattr(settings, "MEDIA_LINK_BUCKET_SEC", 300)))
+    expires = -(-(int(time.time()) + ttl) // bucket) * bucket
+    scope_dir = scope_dir.strip("/")
+    token = secure_link_token(scope_dir, expires)
+    # nginx matches the decoded URI, so the token is over the raw path
+    return f"/secure-media/{token}/{expires}/{quote(scope_dir)}/-/{quote(rel_file.lstrip('/'))}", expires
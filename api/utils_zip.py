@@ -0,0 +1,50 @@
+# api/utils_zip.py
+"""
+ZIP archives produced while they are sent. zipfile writes to an unseekable
+sink using data descriptors (sizes/CRC after each entry), so nothing is
+staged on disk and memory is one read chunk plus its compressed output,
+whatever the total size.
+"""
+import zipfile
+
+
+class _ZipSink:
+    """Write-only target for ZipFile; whatever was written is drained by the generator."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_zip(entries):
+    """
+    entries: iterable of (arcname, size, compress_type, date_time, chunks) where
+    chunks() yields the file's bytes. Yields the archive in pieces.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for arcname, size, compress_type, date_time, chunks in entries:
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            info.compress_type = compress_type
+            info.file_size = size  # lets zipfile pick zip64 headers up front
+            with zf.open(info, "w") as dst:
+                for chunk in chunks():
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()  # central directory
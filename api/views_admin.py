@@ -26,4 +26,9 @@ def admin_metrics(request):
             .values("id","title","code","level__label","level__program__title")
         ),
     }
+    if org:
+        data["storage"] = {
+            "used_bytes": org.storage_used_bytes,
+            "quota_bytes": org.storage_quota_bytes,  # 0 = unlimited
+        }
     return Response(data)
@@ -2,8 +2,9 @@
 from rest_framework import permissions, views, status
 from rest_framework.response import Response
 from django.conf import settings
+from time import time
 from .serializers_agora import AgoraTokenRequestSer, AgoraTokenResponseSer
-from .agora_utils import build_rtc_token, build_rtm_token
+from .agora_utils import issue_rtc_token, issue_rtm_token
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -38,15 +39,18 @@ class AgoraTokenView(views.APIView):
         ttl = ser.validated_data.get("ttl") or settings.AGORA_TOKEN_TTL_SEC # type: ignore
 
         uid = str(request.user.id)  # you can switch to int if you enforce numeric
-        rtc = build_rtc_token(channel, uid, role=role, ttl=ttl)
-        rtm = build_rtm_token(uid, ttl=ttl)
+        # cached per (channel, uid, role): reconnects get the same token back
+        rtc, expire_at = issue_rtc_token(channel, uid, role=role, ttl=ttl)
+        rtm, rtm_expire_at = issue_rtm_token(uid, ttl=ttl)
+        expire_at = min(expire_at, rtm_expire_at)
 
         out = {
             "channel": channel,
             "uid": uid,
             "rtc_token": rtc,
             "rtm_token": rtm,
-            "expires_in": int(ttl),
+            "expires_in": max(0, expire_at - int(time())),
+            "expire_at": expire_at,
         }
         return Response(AgoraTokenResponseSer(out).data, status=status.HTTP_200_OK)
 
@@ -0,0 +1,212 @@
+# api/views_analytics.py
+"""
+Attendance reports for teachers, computed in Postgres: grouped aggregates over
+Attendance (one row per student and session, total_seconds kept by
+api.utils_attendance) with an EXISTS against Enrollment, plus window functions
+for ranks and session-to-session trends. The host's own attendance is left out.
+Session reports are cached once the session is over (nothing can change then).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, BooleanField, Count, Exists, ExpressionWrapper, F, OuterRef, Q, Sum, Window
+from django.db.models.functions import DenseRank, Lag, PercentRank, Rank
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Attendance, LiveSession, SessionOccupancy
+from .occupancy import payload as occupancy_payload
+from .models_academics import Course, Enrollment, Lesson
+from .views_sessions import _user_can_host
+
+
+def _minutes(seconds) -> float:
+    return round((seconds or 0) / 60, 1)
+
+
+def _pct(part, whole):
+    return round(100 * part / whole, 1) if whole else None
+
+
+def _session_ended(sess) -> bool:
+    # + time for the heartbeat flusher to close the last open segments
+    settle = settings.HEARTBEAT_TIMEOUT_SEC + settings.HEARTBEAT_FLUSH_SEC
+    end = sess.start_time + timedelta(minutes=sess.duration_minutes, seconds=settle)
+    return end <= timezone.now()
+
+
+def _attendance(session_filter, enrolled):
+    return (
+        Attendance.objects.filter(session_filter)
+        .exclude(user_id=F("session__owner_id"))
+        .annotate(enrolled=Exists(enrolled.filter(user_id=OuterRef("user_id"))))
+    )
+
+
+def _late(field="session__start_time"):
+    return Q(joined_at__gt=F(field) + timedelta(seconds=settings.LATE_JOIN_GRACE_SEC))
+
+
+def session_report(sess) -> dict:
+    course_ids = list(
+        Lesson.objects.filter(live_session=sess).values_list("module__course_id", flat=True).distinct()
+    )
+    enrolled = Enrollment.objects.filter(course_id__in=course_ids)
+    rows = _attendance(Q(session=sess), enrolled)
+    totals = rows.aggregate(
+        attendees=Count("user_id", distinct=True),
+        avg_seconds=Avg("total_seconds"),
+        enrolled_present=Count("user_id", filter=Q(enrolled=True), distinct=True),
+        late_joiners=Count("user_id", filter=_late(), distinct=True),
+    )
+    n_enrolled = enrolled.values("user_id").distinct().count()
+    attendees = rows.annotate(
+        segment_count=Count("segments"),
+        rank=Window(Rank(), order_by=F("total_seconds").desc()),
+        percentile=Window(PercentRank(), order_by=F("total_seconds").asc()),
+        late=ExpressionWrapper(_late(), output_field=BooleanField()),
+    ).values(
+        "user_id", "user__email", "user__first_name", "user__last_name",
+        "joined_at", "left_at", "total_seconds", "segment_count", "enrolled", "late", "rank", "percentile",
+    ).order_by("rank", "user_id")
+    return {
+        "session": sess.pk,
+        "title": sess.title,
+        "start_time": sess.start_time,
+        "course_ids": course_ids,
+        "enrolled": n_enrolled,
+        "attendees": totals["attendees"],
+        "enrolled_present": totals["enrolled_present"],
+        "present_pct": _pct(totals["enrolled_present"], n_enrolled),
+        "avg_minutes": _minutes(totals["avg_seconds"]),
+        "late_joiners": totals["late_joiners"],
+        "late_after_sec": settings.LATE_JOIN_GRACE_SEC,
+        "rows": [
+            {
+                "user_id": r["user_id"],
+                "name": f'{r["user__first_name"]} {r["user__last_name"]}'.strip() or r["user__email"],
+                "email": r["user__email"],
+                "joined_at": r["joined_at"],
+                "left_at": r["left_at"],
+                "minutes": _minutes(r["total_seconds"]),
+                "segments": r["segment_count"],
+                "enrolled": r["enrolled"],
+                "late": r["late"],
+                "rank": r["rank"],
+                "percentile": round(100 * (r["percentile"] or 0), 1),
+            }
+            for r in attendees
+        ],
+    }
+
+
+def course_report(course) -> dict:
+    sessions = list(
+        LiveSession.objects.filter(
+            pk__in=Lesson.objects.filter(module__course=course, live_session__isnull=False).values("live_session_id")
+        ).order_by("start_time").values("id", "title", "start_time")
+    )
+    enrolled = Enrollment.objects.filter(course=course)
+    n_enrolled = enrolled.count()
+    rows = _attendance(Q(session_id__in=[s["id"] for s in sessions]), enrolled)
+
+    per_session = {
+        r["session_id"]: r for r in rows.values("session_id").annotate(
+            attendees=Count("user_id", distinct=True),
+            avg_seconds=Avg("total_seconds"),
+            enrolled_present=Count("user_id", filter=Q(enrolled=True), distinct=True),
+            late_joiners=Count("user_id", filter=_late(), distinct=True),
+            start=F("session__start_time"),
+        ).annotate(
+            prev_present=Window(Lag("enrolled_present"), order_by=F("start").asc()),
+        ).order_by()
+    }
+    students = rows.filter(enrolled=True).values("user_id").annotate(
+        email=F("user__email"),
+        sessions_attended=Count("session_id", distinct=True),
+        seconds=Sum("total_seconds"),
+        late_count=Count("id", filter=_late()),
+    ).annotate(
+        rank=Window(DenseRank(), order_by=F("seconds").desc()),
+    ).order_by("rank", "user_id")
+
+    out_sessions = []
+    for s in sessions:
+        r = per_session.get(s["id"], {})
+        present = r.get("enrolled_present", 0)
+        out_sessions.append({
+            **s,
+            "attendees": r.get("attendees", 0),
+            "enrolled_present": present,
+            "present_pct": _pct(present, n_enrolled),
+            "present_change": None if r.get("prev_present") is None else present - r["prev_present"],
+            "avg_minutes": _minutes(r.get("avg_seconds")),
+            "late_joiners": r.get("late_joiners", 0),
+        })
+    out_students = [
+        {
+            "user_id": r["user_id"],
+            "email": r["email"],
+            "sessions_attended": r["sessions_attended"],
+            "attendance_pct": _pct(r["sessions_attended"], len(sessions)),
+            "minutes": _minutes(r["seconds"]),
+            "late_count": r["late_count"],
+            "rank": r["rank"],
+        }
+        for r in students
+    ]
+    return {
+        "course": course.pk,
+        "title": course.title,
+        "enrolled": n_enrolled,
+        "never_attended": n_enrolled - len(out_students),
+        "late_after_sec": settings.LATE_JOIN_GRACE_SEC,
+        "sessions": out_sessions,
+        "students": out_students,
+    }
+
+
+class SessionAnalyticsView(APIView):
+    """GET /api/live-sessions/<pk>/analytics/ — owner or host roles."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        sess = get_object_or_404(LiveSession.objects.select_related("org"), pk=pk)
+        if sess.owner_id != request.user.pk and not _user_can_host(request.user, org=sess.org):
+            return Response({"detail": "teachers only"}, status=status.HTTP_403_FORBIDDEN)
+        key = f"analytics:session:{sess.pk}"
+        data = cache.get(key)
+        if data is None:
+            data = session_report(sess)
+            if _session_ended(sess):
+                cache.set(key, data, settings.ANALYTICS_CACHE_SEC)
+        return Response(data)
+
+
+class CourseAnalyticsView(APIView):
+    """GET /api/courses/<pk>/analytics/ — course owner or host roles."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        course = get_object_or_404(Course.objects.select_related("org"), pk=pk)
+        if course.owner_id != request.user.pk and not _user_can_host(request.user, org=course.org):
+            return Response({"detail": "teachers only"}, status=status.HTTP_403_FORBIDDEN)
+        return Response(course_report(course))
+
+
+class SessionOccupancyView(APIView):
+    """GET /api/live-sessions/<pk>/occupancy/ — peak + per-minute curve from `manage.py compute_occupancy`."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        sess = get_object_or_404(LiveSession.objects.select_related("org"), pk=pk)
+        if sess.owner_id != request.user.pk and not _user_can_host(request.user, org=sess.org):
+            return Response({"detail": "teachers only"}, status=status.HTTP_403_FORBIDDEN)
+        occ = SessionOccupancy.objects.filter(session=sess).first()
+        if occ is None:
+            return Response({"detail": "not computed yet"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(occupancy_payload(occ))
@@ -0,0 +1,124 @@
+# api/views_async.py
+"""
+Async versions of the hot asset endpoints (served by the Uvicorn worker).
+Same payloads and rules as the DRF views in views_content; the ORM is
+awaited and only short sync sections (CAS linking, signing) leave the loop.
+The streamed upload body itself is handled below Django, see api.asgi_upload.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from orgs.permissions import IsOrgMember
+from .asset_storage import default_backend
+from .models_academics import Lesson, LessonAsset
+from .tasks import schedule_asset_processing
+from .utils_async import aauthenticate, ais_org_member
+from .utils_blobs import attach_existing, cas_enabled
+from .utils_quota import quota_allows, quota_exceeded_payload
+from .utils_range import aserve_file_range
+from .utils_sign import SIGNER
+from .views_content import _build_media_path, _declared_size, play_payload
+
+
+def _not_found():
+    return JsonResponse({"detail": "Not found."}, status=404)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAssetView(View):
+    """IsAuthenticated (+ IsOrgMember unless org_member=False), answered like DRF would."""
+    org_member = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aauthenticate(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        request.user = user
+        if self.org_member and not await ais_org_member(user, getattr(request, "org", None)):
+            return JsonResponse({"detail": IsOrgMember.message}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def data(request) -> dict:
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError:
+                return {}
+        return request.POST
+
+
+def _dedupe(asset, sha256) -> bool:
+    if not attach_existing(asset, sha256):
+        return False
+    schedule_asset_processing(asset)
+    return True
+
+
+class AssetInitAsync(AsyncAssetView):
+    """Create a placeholder LessonAsset, return upload path (relative)."""
+    async def post(self, request, lesson_id):
+        org = request.org
+        lesson = await Lesson.objects.select_related("module").filter(pk=lesson_id, org=org).afirst()
+        if lesson is None:
+            return _not_found()
+        data = self.data(request)
+        size = _declared_size(data)
+        if not quota_allows(org, size):
+            return JsonResponse(quota_exceeded_payload(org), status=413)
+        asset = await LessonAsset.objects.acreate(
+            org=org, lesson=lesson, type=data.get("type", "PDF"), storage_key="", ready=False,
+            storage_backend=default_backend(), declared_size=size,
+        )
+        rel_base = f"org/{org.id}/course/{lesson.module.course_id}/lesson/{lesson.id}/asset/{asset.id}" # type: ignore
+        # client will PUT the raw file to /api/assets/<id>/upload/ (or POST it as `file`)
+        asset.storage_key = f"{rel_base}/source"
+        await asset.asave(update_fields=["storage_key"])
+        if asset.storage_backend == "s3":
+            return JsonResponse({"asset_id": asset.id, "storage": "s3", "rel_base": rel_base}) # type: ignore
+        sha256 = data.get("sha256")
+        if sha256 and cas_enabled() and await sync_to_async(_dedupe)(asset, sha256):
+            return JsonResponse({"asset_id": asset.id, "ready": asset.ready, "deduplicated": True}) # type: ignore
+        return JsonResponse({"asset_id": asset.id, "upload_field": "source", "rel_base": rel_base}) # type: ignore
+
+
+class AssetPlayAsync(AsyncAssetView):
+    """Return signed URL; prefer HLS / linearized PDF when the pipeline recorded one."""
+    async def get(self, request, pk):
+        asset = await LessonAsset.objects.filter(pk=pk, org=request.org, ready=True).afirst()
+        if asset is None:
+            return _not_found()
+        return JsonResponse(play_payload(asset))  # record + signing only, no I/O
+
+
+class ProtectedMediaAsync(AsyncAssetView):
+    """Nginx X-Accel-Redirect; validates token & points to alias.
+    With MEDIA_SERVE_DIRECT (no nginx) the file is served here: sendfile under WSGI,
+    blocks read off the loop under ASGI (utils_range)."""
+    org_member = False
+
+    async def get(self, request):
+        token = request.GET.get("token")
+        if not token:
+            return HttpResponseForbidden("missing token")
+        try:
+            rel = SIGNER.unsign(token, max_age=3600)  # 1 hour
+        except signing.BadSignature:
+            return HttpResponseForbidden("invalid token")
+        if settings.MEDIA_SERVE_DIRECT:
+            return await aserve_file_range(request, _build_media_path(rel))
+        # internal redirect path must match nginx.conf `/_internal_media/`
+        resp = HttpResponse()
+        resp["X-Accel-Redirect"] = f"/_internal_media/{rel}"
+        resp["Accept-Ranges"] = "bytes"
+        return resp
+
+    async def head(self, request):
+        return await self.get(request)
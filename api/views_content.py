@@ -1,82 +1,442 @@
+import hashlib
+import math
 import os
+import re
+import time
+import zipfile
+from functools import partial
+from urllib.parse import quote, urlencode
 from django.conf import settings
-from django.http import HttpResponse, HttpResponseForbidden
+from django.core import signing
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.http import content_disposition_header
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from django.shortcuts import get_object_or_404
-from .models_academics import Lesson, LessonAsset
+from .models_academics import Enrollment, LessonAsset
+from orgs.models import Org
 from orgs.permissions import IsOrgMember
-from .utils_sign import SIGNER, sign_path
+from .utils_sign import PLAYLIST_SIGNER, sign_path, secure_media_url
+from .utils_hls import load_template, render_playlist, resolve
+from .utils_renditions import VIDEO_TYPES, pick_play_path, source_key, storage_dir
+from .utils_zip import stream_zip
+from .utils_async import is_asgi, iterate_in_thread
+from .asset_storage import ClientError, s3_storage
+from .upload_handlers import StagedUploadedFile, StreamingAssetUploadHandler
+from .utils_blobs import attach_upload, cas_enabled
+from .utils_quota import charge_storage, quota_allows, quota_exceeded_payload
+from .tasks import schedule_asset_processing
 
 def _build_media_path(*parts):
     safe = [str(p).replace("..","").lstrip("/") for p in parts]
     return os.path.join(settings.MEDIA_ROOT, *safe)
 
-class AssetInit(APIView):
-    """Create a placeholder LessonAsset, return upload path (relative)."""
-    permission_classes = [permissions.IsAuthenticated, IsOrgMember]
-    def post(self, request, lesson_id):
-        org = request.org
-        lesson = get_object_or_404(Lesson, pk=lesson_id, org=org)
-        a_type = request.data.get("type","PDF")
-        asset = LessonAsset.objects.create(
-            org=org, lesson=lesson, type=a_type, storage_key="", ready=False
-        )
-        rel_base = f"org/{org.id}/course/{lesson.module.course.id}/lesson/{lesson.id}/asset/{asset.id}" # type: ignore
-        # client will PUT file to /api/assets/<id>/upload/?name=source
-        asset.storage_key = f"{rel_base}/source"
-        asset.save(update_fields=["storage_key"])
-        return Response({"asset_id": asset.id, "upload_field": "source", "rel_base": rel_base}) # type: ignore
+def _declared_size(data) -> int:
+    try:
+        return max(0, int(data.get("size") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+def upload_rejection(org, asset, size: int):
+    """(status, payload) if `size` received bytes can't be kept: over the declared size or the quota."""
+    if asset.declared_size and size > asset.declared_size:
+        return 413, {"detail": "upload larger than declared size", "declared_size": asset.declared_size}
+    if org is not None and not quota_allows(org, size - asset.size_bytes):
+        return 413, quota_exceeded_payload(org)
+    return None
 
 class AssetUpload(APIView):
-    """Simple multipart upload into MEDIA_ROOT (no S3)."""
+    """
+    Multipart upload written straight into MEDIA_ROOT (no S3). Streamed as it
+    arrives only under WSGI: Django's ASGI handler spools the whole body first,
+    so there the handler just saves a second copy and PUT (api.asgi_upload) is
+    the one streaming path.
+    """
     permission_classes = [permissions.IsAuthenticated, IsOrgMember]
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Handlers must be swapped before auth/CSRF touches request.POST,
+        # otherwise Django already spooled the body with its default handlers.
+        # only the caller's own local assets get bytes staged beside them
+        storage_key = (
+            LessonAsset.objects.filter(pk=kwargs.get("pk"), org=getattr(request, "org", None), storage_backend="local")
+            .values_list("storage_key", flat=True).first()
+        )
+        if storage_key:
+            request.upload_handlers = [
+                StreamingAssetUploadHandler(request, _build_media_path(storage_key))
+            ]
+        return super().initialize_request(request, *args, **kwargs)
+
+    @staticmethod
+    def _bucket_asset():
+        return Response({"detail":"bucket-stored asset: use /multipart/"}, status=400)
+
     def post(self, request, pk):
         org = request.org
         asset = get_object_or_404(LessonAsset, pk=pk, org=org)
+        if asset.storage_backend != "local":
+            return self._bucket_asset()
         f = request.FILES.get("file")
         if not f:
             return Response({"detail":"file required"}, status=400)
-        abs_path = _build_media_path(asset.storage_key)
-        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-        with open(abs_path, "wb") as out:
-            for chunk in f.chunks():
-                out.write(chunk)
-        asset.size_bytes = f.size
-        asset.ready = True  # if you want HLS pipeline later, set False here and flip after processing
-        asset.save(update_fields=["size_bytes","ready"])
-        return Response({"ok": True, "asset_id": asset.id}) # type: ignore
-
-class AssetPlay(APIView):
-    """Return signed URL; prefer HLS if exists."""
+        if not isinstance(f, StagedUploadedFile):
+            # streaming handler wasn't installed → Django's own upload; stage a copy
+            f = _stage_copy(f, _build_media_path(asset.storage_key))
+        try:
+            code, data = finish_local_upload(asset, f)
+            return Response(data, status=code)
+        finally:
+            f.close()  # removes the part file unless it was committed / linked
+
+    def put(self, request, pk):
+        """
+        Raw body = the file. Under ASGI this never gets here (api.asgi_upload streams it
+        without Django); under WSGI the body is read straight from wsgi.input.
+        """
+        asset = get_object_or_404(LessonAsset, pk=pk, org=request.org)
+        if asset.storage_backend != "local":
+            return self._bucket_asset()
+        f = StagedUploadedFile.open_for(_build_media_path(asset.storage_key))
+        digest, size = hashlib.sha256(), 0
+        try:
+            while chunk := request._request.read(StreamingAssetUploadHandler.chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                if rejected := upload_rejection(request.org, asset, size):
+                    return Response(rejected[1], status=rejected[0])  # stop reading right away
+            if not size:
+                return Response({"detail":"file required"}, status=400)
+            f.finalize(size, digest.hexdigest())
+            code, data = finish_local_upload(asset, f)
+            return Response(data, status=code)
+        finally:
+            f.close()  # removes the part file unless it was committed / linked
+
+def _stage_copy(upload, dest_path) -> StagedUploadedFile:
+    """Any UploadedFile → StagedUploadedFile beside dest_path (size + SHA-256 computed on the way)."""
+    f = StagedUploadedFile.open_for(dest_path, upload.name or "source", upload.content_type)
+    digest, size = hashlib.sha256(), 0
+    try:
+        for chunk in upload.chunks(StreamingAssetUploadHandler.chunk_size):
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+        f.finalize(size, digest.hexdigest())
+    except BaseException:
+        f.close()
+        raise
+    finally:
+        upload.close()
+    return f
+
+def finish_local_upload(asset, f) -> tuple[int, dict]:
+    """
+    Staged bytes (StagedUploadedFile) → asset source; (status, payload), shared by the
+    multipart, raw and ASGI uploads. Declared size and quota are checked again against
+    the bytes actually received, with the org's usage read fresh.
+    """
+    rejected = upload_rejection(Org.objects.filter(pk=asset.org_id).first(), asset, f.size)
+    if rejected:
+        return rejected
+    if cas_enabled():
+        attach_upload(asset, f)  # new blob keeps the bytes, duplicate drops them
+        schedule_asset_processing(asset)
+        return 200, {"ok": True, "asset_id": asset.id, "sha256": f.sha256}
+    abs_path = _build_media_path(asset.storage_key)
+    f.commit(abs_path)  # atomic rename of the staged part file
+    charge_storage(asset.org_id, f.size - asset.size_bytes)
+    asset.size_bytes = f.size
+    asset.sha256 = f.sha256
+    asset.ready = True
+    asset.renditions = {"source": os.path.basename(abs_path)}
+    asset.save(update_fields=["size_bytes","sha256","ready","renditions"])
+    schedule_asset_processing(asset)  # VIDEO/RECORDING → ready flips after HLS
+    return 200, {"ok": True, "asset_id": asset.id, "sha256": f.sha256}
+
+def _s3_error(e) -> Response:
+    """botocore ClientError → 404 for an unknown upload/object, 400 otherwise; S3's code passed on."""
+    err = e.response.get("Error", {})
+    code = str(err.get("Code", ""))
+    missing = code in ("NoSuchUpload", "NoSuchKey", "NotFound", "404")
+    return Response({"detail": err.get("Message") or "storage request failed", "code": code},
+                    status=404 if missing else 400)
+
+class AssetMultipartUpload(APIView):
+    """
+    S3 backend: presigned multipart upload straight from the client.
+    POST   {"size": <bytes>, "content_type": ...} → upload_id + one presigned PUT per part
+    DELETE {"upload_id": ...}                      → abort
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOrgMember]
+    def post(self, request, pk):
+        asset = get_object_or_404(LessonAsset, pk=pk, org=request.org, storage_backend="s3")
+        size = _declared_size(request.data)
+        if size <= 0:
+            return Response({"detail":"size required"}, status=400)
+        if not quota_allows(request.org, size - asset.size_bytes):
+            return Response(quota_exceeded_payload(request.org), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        # S3 allows at most 10k parts; grow the part size for huge files
+        part_size = max(settings.ASSET_S3_PART_SIZE, math.ceil(size / 10_000))
+        part_count = math.ceil(size / part_size)
+        storage = s3_storage()
+        try:
+            upload_id = storage.create_multipart(
+                asset.storage_key, request.data.get("content_type") or "application/octet-stream"
+            )
+        except ClientError as e:
+            return _s3_error(e)
+        return Response({
+            "asset_id": asset.id, "upload_id": upload_id, # type: ignore
+            "part_size": part_size,
+            "urls": storage.presign_parts(asset.storage_key, upload_id, part_count),
+            "complete_url": f"/api/assets/{asset.id}/multipart/complete/", # type: ignore
+        })
+
+    def delete(self, request, pk):
+        asset = get_object_or_404(LessonAsset, pk=pk, org=request.org, storage_backend="s3")
+        upload_id = request.data.get("upload_id")
+        if not upload_id:
+            return Response({"detail":"upload_id required"}, status=400)
+        try:
+            s3_storage().abort_multipart(asset.storage_key, upload_id)
+        except ClientError as e:
+            return _s3_error(e)
+        return Response(status=204)
+
+class AssetMultipartComplete(APIView):
+    """Completion callback: {"upload_id": ..., "parts": [{"PartNumber": 1, "ETag": "..."}]} → ready."""
     permission_classes = [permissions.IsAuthenticated, IsOrgMember]
+    def post(self, request, pk):
+        asset = get_object_or_404(LessonAsset, pk=pk, org=request.org, storage_backend="s3")
+        upload_id = request.data.get("upload_id")
+        parts = request.data.get("parts") or []
+        if not upload_id or not parts:
+            return Response({"detail":"upload_id and parts required"}, status=400)
+        try:
+            size = s3_storage().complete_multipart(asset.storage_key, upload_id, parts)
+        except ClientError as e:
+            return _s3_error(e)  # asset stays as it was (not ready); the client may retry or abort
+        except (KeyError, TypeError, ValueError):
+            return Response({"detail":"parts must be [{\"PartNumber\": n, \"ETag\": ...}]"}, status=400)
+        # the init check only saw the client's claim; the object's real size decides
+        if rejected := upload_rejection(Org.objects.filter(pk=asset.org_id).first(), asset, size): # type: ignore
+            try:
+                s3_storage().delete(asset.storage_key)
+            except ClientError:
+                pass  # asset stays not ready; deleting it removes the object too
+            return Response(rejected[1], status=rejected[0])
+        charge_storage(asset.org_id, size - asset.size_bytes) # type: ignore
+        asset.size_bytes = size
+        asset.ready = True
+        asset.renditions = {"source": asset.storage_key.rsplit("/",1)[-1]}
+        asset.save(update_fields=["size_bytes","ready","renditions"])
+        return Response({"ok": True, "asset_id": asset.id, "size_bytes": asset.size_bytes}) # type: ignore
+
+def play_payload(asset) -> dict:
+    """Signed playback URL for a ready asset (shared by AssetPlayAsync and AssetPlayBatch)."""
+    return {**_source_payload(asset), **preview_payload(asset)}
+
+def preview_payload(asset) -> dict:
+    """Signed poster / seek-sprite track URLs (video, local backend) from asset.renditions."""
+    r = asset.renditions or {}
+    if asset.storage_backend != "local" or not (r.get("poster") or r.get("sprites")):
+        return {}
+    base_dir = storage_dir(asset.storage_key)
+    out = {}
+    if r.get("poster"):
+        if settings.MEDIA_SECURE_LINKS:
+            out["poster"] = secure_media_url(base_dir, r["poster"])[0]
+        else:
+            out["poster"] = f"/protected/media?token={sign_path(base_dir + '/' + r['poster'])}"
+    if r.get("sprites"):
+        sprites_dir = f"{base_dir}/{os.path.dirname(r['sprites'])}"
+        if settings.MEDIA_SECURE_LINKS:
+            # sheet references in the .vtt are relative → covered by the same link
+            out["sprites"] = secure_media_url(sprites_dir, os.path.basename(r["sprites"]))[0]
+        else:
+            token = PLAYLIST_SIGNER.sign(f"{asset.pk}:{sprites_dir}")
+            out["sprites"] = f"/api/assets/{asset.pk}/sprites.vtt?{urlencode({'token': token})}"
+    return out
+
+def _source_payload(asset) -> dict:
+    if asset.storage_backend == "s3":
+        ttl = settings.MEDIA_LINK_TTL_SEC
+        return {"url": s3_storage().presign_get(asset.storage_key, ttl), "expires_at": int(time.time()) + ttl}
+    # decided from asset.renditions only — no stat on the media volume
+    rel_path, scope_dir = pick_play_path(asset)
+    if settings.MEDIA_SECURE_LINKS:
+        # nginx validates the link itself — no Django hit per file/segment
+        url, expires_at = secure_media_url(scope_dir, rel_path[len(scope_dir)+1:])
+        return {"url": url, "expires_at": expires_at}
+    if rel_path.endswith(".m3u8"):
+        # relative variants/segments can't pass ProtectedMediaAsync → rewrite playlists
+        token = PLAYLIST_SIGNER.sign(f"{asset.pk}:{scope_dir}")
+        return {"url": f"/api/assets/{asset.pk}/hls/index.m3u8?{urlencode({'token': token})}"}
+    token = sign_path(rel_path)
+    return {"url": f"/protected/media?token={token}"}
+
+class AssetPlayBatch(APIView):
+    """
+    Signed URLs + lock state for every asset of a lesson (or a whole course) in one
+    response, 2 queries total. Same access rule as LessonAssetViewSet.open:
+    preview assets are open, the rest need an enrollment in the course.
+    """
+    permission_classes = [permissions.AllowAny]
+    def get(self, request, lesson_id=None, course_id=None):
+        qs = (LessonAsset.objects.filter(published=True, ready=True)
+              .select_related("lesson__module")
+              .order_by("lesson__module__order", "lesson__order", "lesson_id", "id"))
+        qs = qs.filter(lesson_id=lesson_id) if lesson_id else qs.filter(lesson__module__course_id=course_id)
+        assets = list(qs)
+
+        enrolled = set()
+        if request.user.is_authenticated and assets:
+            course_ids = {a.lesson.module.course_id for a in assets}
+            enrolled = set(Enrollment.objects.filter(
+                user=request.user, course_id__in=course_ids
+            ).values_list("course_id", flat=True))
+
+        out = []
+        for a in assets:
+            locked = not (a.is_preview or a.lesson.module.course_id in enrolled)
+            item = {"id": a.id, "lesson_id": a.lesson_id, "type": a.type, "locked": locked}
+            if not locked:
+                item.update(play_payload(a))
+            out.append(item)
+        key = "lesson_id" if lesson_id else "course_id"
+        return Response({key: lesson_id or course_id, "assets": out})
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[\\/:*?"<>|]+', "_", name).strip() or "untitled"
+
+def _read_chunks(path, chunk_size=1024 * 1024):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+def _zip_entries(assets, per_lesson: bool):
+    for i, a in enumerate(assets, 1):
+        arcname = f"{i:02d}-{a.type.lower()}-{a.id}{'.pdf' if a.type == 'PDF' else '.mp4'}"
+        if per_lesson:
+            arcname = f"{a.lesson.order:02d}-{_safe_name(a.lesson.title)}/{arcname}"
+        # video is already compressed → store; deflate only pays off for PDFs
+        compress = zipfile.ZIP_STORED if a.type in VIDEO_TYPES else zipfile.ZIP_DEFLATED
+        date_time = a.created_at.timetuple()[:6]
+        if a.storage_backend == "s3":
+            yield arcname, a.size_bytes, compress, date_time, partial(s3_storage().iter_object, a.storage_key)
+            continue
+        path = _build_media_path(source_key(a))
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue  # missing on disk → leave it out instead of breaking the archive
+        yield arcname, size, compress, date_time, partial(_read_chunks, path)
+
+class AssetZip(APIView):
+    """
+    All permitted assets of a lesson (or module) as one ZIP, built while it is sent:
+    no temp archive, memory independent of total size. ?type=PDF limits the kinds.
+    Same access rule as LessonAssetViewSet.open (preview, or enrolled in the course).
+    """
+    permission_classes = [permissions.AllowAny]
+    def get(self, request, lesson_id=None, module_id=None):
+        qs = (LessonAsset.objects.filter(published=True, ready=True)
+              .select_related("lesson__module")
+              .order_by("lesson__order", "lesson_id", "id"))
+        qs = qs.filter(lesson_id=lesson_id) if lesson_id else qs.filter(lesson__module_id=module_id)
+        if request.GET.get("type"):
+            qs = qs.filter(type=request.GET["type"].upper())
+        assets = list(qs)
+        if not assets:
+            raise Http404
+        module = assets[0].lesson.module
+        if not all(a.is_preview for a in assets):
+            enrolled = request.user.is_authenticated and Enrollment.objects.filter(
+                user=request.user, course_id=module.course_id
+            ).exists()
+            if not enrolled:
+                assets = [a for a in assets if a.is_preview]
+        if not assets:
+            return Response({"detail":"Locked"}, status=status.HTTP_403_FORBIDDEN)
+
+        title = assets[0].lesson.title if lesson_id else module.title
+        return zip_response(request, _zip_entries(assets, per_lesson=not lesson_id), f"{_safe_name(title)}.zip")
+
+def zip_response(request, entries, filename: str) -> StreamingHttpResponse:
+    body = stream_zip(entries)
+    if is_asgi(request):
+        body = iterate_in_thread(body)  # async body: sent piece by piece, file reads off the loop
+    resp = StreamingHttpResponse(body, content_type="application/zip")
+    resp["Content-Disposition"] = content_disposition_header(True, filename)
+    resp["X-Accel-Buffering"] = "no"  # nginx: pass chunks through, don't spool the archive
+    return resp
+
+class HlsPlaylist(APIView):
+    """
+    Master/variant playlists with every URI rewritten: nested playlists point back
+    here (same token), segments get their own ProtectedMediaAsync token.
+    The token (issued by AssetPlayAsync) is the credential; no auth/DB work per request.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    def get(self, request, pk, name):
+        try:
+            signed = PLAYLIST_SIGNER.unsign(request.GET.get("token", ""), max_age=settings.MEDIA_LINK_TTL_SEC)
+        except signing.BadSignature:
+            return HttpResponseForbidden("invalid token")
+        asset_id, _, hls_rel = signed.partition(":")
+        name = resolve("", name) or ""
+        if asset_id != str(pk) or not name.endswith(".m3u8"):
+            return HttpResponseForbidden("invalid token")
+        parts = load_template(hls_rel, _build_media_path(hls_rel), name)
+        if parts is None:
+            raise Http404
+        query = urlencode({"token": request.GET["token"]})
+
+        def sign_uri(uri):
+            rel = resolve(name, uri)
+            if rel is None:
+                return uri
+            if rel.endswith(".m3u8"):
+                return f"/api/assets/{pk}/hls/{quote(rel)}?{query}"
+            return f"/protected/media?token={sign_path(f'{hls_rel}/{rel}')}"
+
+        resp = HttpResponse(render_playlist(parts, sign_uri), content_type="application/vnd.apple.mpegurl")
+        resp["Cache-Control"] = "private, max-age=60"
+        return resp
+
+class SpriteTrack(APIView):
+    """
+    WebVTT seek-preview track with every sheet reference signed for ProtectedMediaAsync
+    (only needed without MEDIA_SECURE_LINKS). Token issued by play_payload.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
     def get(self, request, pk):
-        org = request.org
-        asset = get_object_or_404(LessonAsset, pk=pk, org=org, ready=True)
-        rel_path = asset.storage_key  # e.g. .../asset/77/source
-        base_dir = rel_path.rsplit("/",1)[0]
-        abs_dir = _build_media_path(base_dir)
-        if asset.type in ("VIDEO","RECORDING"):
-            hls = os.path.join(abs_dir, "hls", "index.m3u8")
-            if os.path.exists(hls):
-                rel_path = f"{base_dir}/hls/index.m3u8"
-        token = sign_path(rel_path)
-        return Response({"url": f"/protected/media?token={token}"})
-
-class ProtectedMedia(APIView):
-    """Nginx X-Accel-Redirect; validates token & points to alias."""
-    permission_classes = [permissions.IsAuthenticated]
-    def get(self, request):
-        token = request.GET.get("token")
-        if not token: return HttpResponseForbidden("missing token")
         try:
-            rel = SIGNER.unsign(token, max_age=3600)  # 1 hour
-        except Exception:
+            signed = PLAYLIST_SIGNER.unsign(request.GET.get("token", ""), max_age=settings.MEDIA_LINK_TTL_SEC)
+        except signing.BadSignature:
             return HttpResponseForbidden("invalid token")
-        # internal redirect path must match nginx.conf `/_internal_media/`
-        resp = HttpResponse()
-        resp["X-Accel-Redirect"] = f"/_internal_media/{rel}"
-        # allow range for video
-        resp["Accept-Ranges"] = "bytes"
+        asset_id, _, sprites_rel = signed.partition(":")
+        if asset_id != str(pk):
+            return HttpResponseForbidden("invalid token")
+        try:
+            with open(_build_media_path(sprites_rel, "index.vtt"), encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            raise Http404
+        signed_sheets = {}  # a few sheets, hundreds of cues
+        lines = []
+        for line in text.splitlines():
+            name, sep, frag = line.partition("#xywh=")
+            if sep and "-->" not in line and "/" not in name:
+                if name not in signed_sheets:
+                    signed_sheets[name] = f"/protected/media?token={sign_path(f'{sprites_rel}/{name}')}"
+                line = f"{signed_sheets[name]}#xywh={frag}"
+            lines.append(line)
+        resp = HttpResponse("\n".join(lines) + "\n", content_type="text/vtt")
+        resp["Cache-Control"] = "private, max-age=60"
         return resp
@@ -1,4 +1,5 @@
 # api/views_crud.py
+import hashlib
 from rest_framework.viewsets import ModelViewSet
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.response import Response
@@ -7,7 +8,8 @@ from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.db.models import Q, Prefetch
 from rest_framework.views import APIView
-from django_filters.rest_framework import DjangoFilterBackend, FilterSet, NumberFilter
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet, NumberFilter, CharFilter
+from django.contrib.postgres.search import SearchQuery
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -16,6 +18,9 @@ from api.models import Attendance, LiveSession
 from orgs.permissions import IsOrgMemberOrPreviewReadOnly
 from .models_academics import Course, Enrollment, Module, Lesson, LessonAsset
 from .serializers import CourseSer, CourseTreeSerializer,  LessonSer, AssetSer
+from .views_content import preview_payload
+from .utils_quota import charge_storage, quota_allows, quota_exceeded_payload
+from .tasks import schedule_asset_processing
 from .serializers_academics import LessonAssetSerializer, ModuleSer  # ဘယ် serializer သံုးထားသလဲအပေါ်မူတည်
 
 
@@ -132,6 +137,8 @@ class CourseViewSet(BaseOrgViewSet, viewsets.ModelViewSet):
                 "ready": a.ready,
                 "size_bytes": a.size_bytes,
                 "duration_seconds": a.duration_seconds,
+                "page_count": a.page_count,
+                "poster": preview_payload(a).get("poster", ""),  # VIDEO/RECORDING, signed
             })
 
         data = []
@@ -196,10 +203,14 @@ class LessonViewSet(BaseOrgViewSet, viewsets.ModelViewSet):
 class AssetFilter(FilterSet):
     lesson = NumberFilter(field_name="lesson_id", lookup_expr="exact")
     course = NumberFilter(field_name="lesson__module__course_id", lookup_expr="exact")
+    q = CharFilter(method="filter_q")  # full-text over extracted PDF text
     class Meta:
         model = LessonAsset
         fields = ["lesson", "course"]
 
+    def filter_q(self, queryset, name, value):
+        return queryset.filter(search_vector=SearchQuery(value, search_type="websearch"))
+
 
 class LessonAssetViewSet(BaseOrgViewSet, viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
@@ -216,10 +227,29 @@ class LessonAssetViewSet(BaseOrgViewSet, viewsets.ModelViewSet):
             qs = qs.filter(is_preview=True, published=True) # type: ignore
         return qs
 
+    def create(self, request, *args, **kwargs):
+        # same 413 + usage payload as the upload endpoints, before anything is hashed or saved
+        org = getattr(request, "org", None)
+        if org and not quota_allows(org, getattr(request.FILES.get("file"), "size", 0) or 0):
+            return Response(quota_exceeded_payload(org), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         f = self.request.FILES.get("file")
         size = getattr(f, "size", 0) or 0
-        serializer.save(org=getattr(self.request, "org", None), size_bytes=size)
+        org = getattr(self.request, "org", None)
+        digest = hashlib.sha256()  # integrity baseline for verify_media
+        for chunk in (f.chunks() if f else ()):
+            digest.update(chunk)
+        if f:
+            f.seek(0)
+        asset = serializer.save(org=org, size_bytes=size, sha256=digest.hexdigest() if f else "", storage_backend="local")
+        charge_storage(asset.org_id, size)
+        if f:
+            # the bytes sit at `file` in their own dir → storage_key points there, pipeline runs as for init uploads
+            asset.storage_key = asset.file.name
+            asset.save(update_fields=["storage_key"])
+            schedule_asset_processing(asset)
 
 
     @action(detail=True, methods=["GET"])
@@ -234,7 +264,9 @@ class LessonAssetViewSet(BaseOrgViewSet, viewsets.ModelViewSet):
         if not can_view:
             return Response({"detail":"Locked"}, status=status.HTTP_403_FORBIDDEN)
 
-        # TODO: generate and return time-limited URL (S3, GCS, etc.)
+        if asset.storage_backend == "s3" and asset.storage_key:
+            from .asset_storage import s3_storage
+            return Response({"url": s3_storage().presign_get(asset.storage_key)})
         return Response({"url": asset.file.url})
 
 
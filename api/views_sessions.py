@@ -1,5 +1,4 @@
 # api/views_sessions.py
-import time
 from django.conf import settings
 from django.utils import timezone
 from django_filters import rest_framework as dj_filters
@@ -22,8 +21,10 @@ from .serializers import (
     SeatReservationSer, AttendanceSer,
 )
 from .permissions import IsSessionModeratorOrOwner
+from . import admission, heartbeats
+from .utils_attendance import close_segments, open_segment
 
-from agora_token_builder import RtcTokenBuilder
+from .agora_utils import issue_rtc_token
 
 
 # ---------- Agora helpers ----------
@@ -91,15 +92,23 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["POST"])
     def join(self, request, pk=None):
         sess = self.get_object()
-        att, created = Attendance.objects.get_or_create(
+        if request.user.pk != sess.owner_id:  # the host always gets in
+            # capacity check + reservation in one Redis round trip (api.admission)
+            admitted, taken, expires = admission.admit(sess, request.user.pk)
+            if not admitted:
+                return response.Response(
+                    {"detail": "Room full", "capacity": sess.max_participants, "taken": taken},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            admission.queue_write(sess, request.user.pk, "PENDING", expires)
+        now = timezone.now()
+        att, _ = Attendance.objects.get_or_create(
             org=sess.org, session=sess, user=request.user,
-            defaults={"joined_at": timezone.now()}
+            defaults={"joined_at": now}
         )
-        if not created and att.left_at:
-            att.joined_at = timezone.now()
-            att.left_at = None
-            att.total_seconds = 0
-            att.save(update_fields=["joined_at","left_at","total_seconds"])
+        # rejoin → new segment; earlier minutes stay in total_seconds
+        att = open_segment(att, now)
+        heartbeats.start(sess.pk, request.user.pk)
         return response.Response({"joined": True, "attendance_id": att.id})
 
     @action(detail=True, methods=["POST"])
@@ -109,13 +118,25 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
             att = Attendance.objects.get(org=sess.org, session=sess, user=request.user)
         except Attendance.DoesNotExist:
             return response.Response({"detail":"not joined"}, status=400)
-        if not att.left_at:
-            att.left_at = timezone.now()
-            if att.joined_at:
-                att.total_seconds = int((att.left_at - att.joined_at).total_seconds())
-            att.save(update_fields=["left_at","total_seconds"])
+        if request.user.pk != sess.owner_id:
+            admission.release(sess.pk, request.user.pk)
+            admission.queue_write(sess, request.user.pk, "RELEASED")
+        heartbeats.stop(sess.pk, request.user.pk)
+        close_segments(Attendance.objects.filter(pk=att.pk), timezone.now())
+        att.refresh_from_db(fields=["left_at", "total_seconds"])
         return response.Response({"left": True, "total_seconds": att.total_seconds})
 
+    @action(detail=True, methods=["POST"])
+    def heartbeat(self, request, pk=None):
+        # Redis only (api.heartbeats): no session lookup, no Attendance write
+        try:
+            alive = heartbeats.beat(int(pk), request.user.pk)  # type: ignore
+        except (TypeError, ValueError):
+            return response.Response({"detail": "Not found."}, status=404)
+        if not alive:
+            return response.Response({"detail": "not joined"}, status=status.HTTP_409_CONFLICT)
+        return response.Response({"alive": True})
+
     def _can_host(self, user, sess: LiveSession) -> bool:
         # global
         if user.is_superuser or user.is_staff:
@@ -167,12 +188,10 @@ class LiveSessionViewSet(viewsets.ModelViewSet):
         if not app_id or not app_cert:
             return response.Response({"detail": "agora creds missing"}, status=500)
 
-        expire_at = int(time.time()) + 60 * 60
         uid = _uid_for(user)
-        role = 1 if want_host else 2  # 1=Publisher, 2=Subscriber
-
-        token = RtcTokenBuilder.buildTokenWithUid(
-            app_id, app_cert, sess.channel_name, uid, role, expire_at
+        # shared Redis cache per (channel, uid, role); expire_at is the cached token's own
+        token, expire_at = issue_rtc_token(
+            sess.channel_name, uid, role="publisher" if want_host else "subscriber", ttl=60 * 60,
         )
         return response.Response({
             "token": token,
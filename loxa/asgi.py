@@ -13,4 +13,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'loxa.settings')
 
-application = get_asgi_application()
+django_asgi_app = get_asgi_application()
+
+# needs the app registry → import after get_asgi_application()
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from api.asgi_upload import StreamingUploadApp  # noqa: E402
+from api.routing import websocket_urlpatterns  # noqa: E402
+from api.utils_async import QueryTokenAuthMiddleware, WebsocketOriginValidator  # noqa: E402
+
+application = ProtocolTypeRouter({
+    # PUT /api/assets/<id>/upload/ is streamed to disk without Django; the rest is Django
+    "http": StreamingUploadApp(django_asgi_app),
+    # origin check needs the ?token= user, so it runs inside the auth middleware
+    "websocket": QueryTokenAuthMiddleware(
+        WebsocketOriginValidator(URLRouter(websocket_urlpatterns))
+    ),
+})
@@ -1,5 +1,5 @@
-# # loxa/celery.py
-# import os
-# from celery import Celery
-# os.environ.setdefault("DJANGO_SETTINGS_MODULE","loxa.settings")
-# app = Celery("loxa"); app.config_from_object("django.conf:settings", namespace="CELERY"); app.autodiscover_tasks()
+# loxa/celery.py
+import os
+from celery import Celery
+os.environ.setdefault("DJANGO_SETTINGS_MODULE","loxa.settings")
+app = Celery("loxa"); app.config_from_object("django.conf:settings", namespace="CELERY"); app.autodiscover_tasks()
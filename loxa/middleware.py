@@ -1,6 +1,8 @@
 # middleware.py
 import os, re
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.http import JsonResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
 from orgs.models import Org
 from django.utils.deprecation import MiddlewareMixin
 from typing import Optional
@@ -61,6 +63,34 @@ class TenantResolver(MiddlewareMixin):
         return None
 
 
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, and one sync middleware makes Django run the whole
+    chain (async views included) in a worker thread. Static hits are rare here
+    (nginx serves /static/), so only those take the sync path.
+    """
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:  # DEBUG: stats the filesystem
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
 # (optional) very lightweight CORS for local dev if you haven't set django-cors-headers
 # class SimpleCORS(MiddlewareMixin):
 #     def process_response(self, request, response):
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 from corsheaders.defaults import default_headers
 
 # --- Basic Django Setup ---
@@ -11,6 +12,7 @@ DEBUG = os.getenv("DJANGO_DEBUG", "1") == "1"
 ALLOWED_HOSTS = ['lms.ai1.com.mm','lms2.ai1.com.mm', 'web', 'localhost']
 ROOT_URLCONF = 'loxa.urls'
 WSGI_APPLICATION = 'loxa.wsgi.application'
+ASGI_APPLICATION = 'loxa.asgi.application'   # HTTP + WebSockets (api.routing)
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -49,6 +51,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 
     # Third Party Apps
     "rest_framework",
@@ -59,6 +62,7 @@ INSTALLED_APPS = [
     "drf_yasg",
     "django_filters",
     "django_prometheus",
+    "channels",
     
     # Social authentication
     # 'social_django',
@@ -85,7 +89,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django_prometheus.middleware.PrometheusBeforeMiddleware",
     'django.middleware.security.SecurityMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "loxa.middleware.AsyncWhiteNoiseMiddleware",  # whitenoise, minus the sync-only penalty
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
@@ -160,6 +164,27 @@ STORAGES = {
     "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
     "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
 }
+# nginx secure_link media URLs (deploy/nginx*.conf `/secure-media/`); the secret
+# is rendered into nginx from the same env var (deploy/secure_link_secret.conf.template)
+MEDIA_SECURE_LINKS = os.getenv("MEDIA_SECURE_LINKS", "0") == "1"
+MEDIA_LINK_SECRET = os.getenv("MEDIA_LINK_SECRET", "")
+if MEDIA_SECURE_LINKS and MEDIA_LINK_SECRET in ("", "insecure-media-link-secret"):
+    # a known secret lets anyone mint /secure-media/ URLs → refuse to start
+    raise ImproperlyConfigured("MEDIA_SECURE_LINKS=1 requires a private MEDIA_LINK_SECRET")
+MEDIA_LINK_TTL_SEC = int(os.getenv("MEDIA_LINK_TTL_SEC", "3600"))
+# no nginx in front (DEBUG / single container): ProtectedMediaAsync serves bytes itself, Range-aware
+MEDIA_SERVE_DIRECT = os.getenv("MEDIA_SERVE_DIRECT", "1" if DEBUG else "0") == "1"
+# LessonAsset bytes: "local" (MEDIA_ROOT) or "s3" (S3/MinIO, presigned direct uploads)
+ASSET_STORAGE_BACKEND = os.getenv("ASSET_STORAGE_BACKEND", "local")
+ASSET_S3_BUCKET = os.getenv("ASSET_S3_BUCKET", "loxa-media")
+ASSET_S3_ENDPOINT_URL = os.getenv("ASSET_S3_ENDPOINT_URL", "")  # e.g. http://minio:9000
+ASSET_S3_REGION = os.getenv("ASSET_S3_REGION", "")
+ASSET_S3_ACCESS_KEY = os.getenv("ASSET_S3_ACCESS_KEY", "")
+ASSET_S3_SECRET_KEY = os.getenv("ASSET_S3_SECRET_KEY", "")
+ASSET_S3_PRESIGN_TTL_SEC = int(os.getenv("ASSET_S3_PRESIGN_TTL_SEC", "3600"))
+ASSET_S3_PART_SIZE = int(os.getenv("ASSET_S3_PART_SIZE", str(64 * 1024 * 1024)))  # >= 5 MiB
+# Content-addressed asset layout (MEDIA_ROOT/cas/...), dedupes identical uploads
+ASSET_CAS_ENABLED = os.getenv("ASSET_CAS_ENABLED", "0") == "1"
 
 
 # --- REST Framework and JWT Configuration ---
@@ -290,12 +315,53 @@ CHANNEL_LAYERS = {
         "CONFIG": {"hosts": [REDIS_URL]},
     },
 }
+PRESENCE_TTL_SEC = int(os.getenv("PRESENCE_TTL_SEC", str(6 * 3600)))  # stale rosters expire
+# seat admission (api.admission): a seat is held this long past the last join/heartbeat
+SEAT_HOLD_SEC = int(os.getenv("SEAT_HOLD_SEC", "180"))          # keep > HEARTBEAT_TIMEOUT_SEC
+SEAT_FLUSH_DELAY_SEC = int(os.getenv("SEAT_FLUSH_DELAY_SEC", "2"))  # batch window for SeatReservation rows
+# attendance heartbeats (api.heartbeats): clients ping every ~30s
+HEARTBEAT_TIMEOUT_SEC = int(os.getenv("HEARTBEAT_TIMEOUT_SEC", "90"))  # silent this long → left
+HEARTBEAT_FLUSH_SEC = int(os.getenv("HEARTBEAT_FLUSH_SEC", "60"))
+# attendance reports (api.views_analytics)
+LATE_JOIN_GRACE_SEC = int(os.getenv("LATE_JOIN_GRACE_SEC", "300"))   # first join later than start + this → late
+ANALYTICS_CACHE_SEC = int(os.getenv("ANALYTICS_CACHE_SEC", str(7 * 86400)))  # reports of ended sessions
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = CELERY_BROKER_URL
+# heavy media work runs on its own queue: `celery -A loxa worker -Q media`
+CELERY_TASK_ROUTES = {
+    "api.tasks.transcode_asset_hls": {"queue": "media"},
+    "api.tasks.probe_asset": {"queue": "media"},
+    "api.tasks.process_pdf": {"queue": "media"},
+    "api.tasks.build_video_previews": {"queue": "media"},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# `celery -A loxa beat`
+CELERY_BEAT_SCHEDULE = {
+    "release-expired-seats": {"task": "api.tasks.release_expired_seats", "schedule": 60.0},
+    # safety net for buffered SeatReservation writes if a scheduled flush was lost
+    "flush-seat-writes": {"task": "api.tasks.flush_seat_writes", "schedule": 30.0},
+    "flush-attendance": {"task": "api.tasks.flush_attendance", "schedule": float(HEARTBEAT_FLUSH_SEC)},
+}
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+FFMPEG_TIMEOUT_SEC = int(os.getenv("FFMPEG_TIMEOUT_SEC", str(6 * 3600)))  # a whole HLS ladder run
+FFPROBE_TIMEOUT_SEC = int(os.getenv("FFPROBE_TIMEOUT_SEC", "60"))
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+HLS_X264_PRESET = os.getenv("HLS_X264_PRESET", "veryfast")
+SPRITE_INTERVAL_SEC = int(os.getenv("SPRITE_INTERVAL_SEC", "10"))  # one seek thumbnail per N seconds
+SPRITE_THUMB_WIDTH = int(os.getenv("SPRITE_THUMB_WIDTH", "160"))
+SPRITE_COLUMNS = int(os.getenv("SPRITE_COLUMNS", "10"))            # sheets are N x N thumbnails
+QPDF_BIN = os.getenv("QPDF_BIN", "qpdf")
+PDFTOPPM_BIN = os.getenv("PDFTOPPM_BIN", "pdftoppm")
+PDF_THUMB_MAX_PAGES = int(os.getenv("PDF_THUMB_MAX_PAGES", "50"))
+PDF_TOOL_TIMEOUT_SEC = int(os.getenv("PDF_TOOL_TIMEOUT_SEC", "300"))  # qpdf / pdftoppm
 
 AGORA_APP_ID = os.getenv("AGORA_APP_ID", "ddf12d43c7f446aaaad63571b86f348d")
 AGORA_APP_CERT = os.getenv("AGORA_APP_CERT", "21509bc3f9eb4753857c83389329da24")
 AGORA_TOKEN_TTL_SEC = int(os.getenv("AGORA_TOKEN_TTL_SEC", "3600"))
+# re-issue a cached token once this fraction of its TTL has elapsed (0 = never reuse)
+AGORA_TOKEN_REUSE_FRACTION = float(os.getenv("AGORA_TOKEN_REUSE_FRACTION", "0.5"))
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
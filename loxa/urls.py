@@ -11,6 +11,8 @@ from drf_yasg import openapi
 from django.http import JsonResponse
 from django.db import connection
 
+from api.views_async import ProtectedMediaAsync
+
 
 
 # --- Social Authentication Views ---
@@ -90,6 +92,7 @@ urlpatterns = [
      # --- Utility and Documentation URLs ---
     path("swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("protected/media", ProtectedMediaAsync.as_view(), name="protected-media"),
     path("health/live/", live),
     path("health/ready/", ready),
     path("", include("django_prometheus.urls")),
@@ -3,7 +3,8 @@ from .models import*
 
 @admin.register(Org)
 class OrgAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "type")          # removed created_at
+    list_display = ("id", "name", "type", "storage_used_bytes", "storage_quota_bytes")  # removed created_at
+    readonly_fields = ("storage_used_bytes",)
     search_fields = ("name",)
     list_filter = ("type",)                         # removed created_at
     ordering = ("name",)
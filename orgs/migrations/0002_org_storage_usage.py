@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orgs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='org',
+            name='storage_quota_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='org',
+            name='storage_used_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
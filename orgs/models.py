@@ -6,6 +6,9 @@ class Org(models.Model):
     TYPE = [("KG","KG"),("UNI","University"),("CERT","Certification")]
     name = models.CharField(max_length=200)
     type = models.CharField(max_length=10, choices=TYPE, default="KG")
+    # sum of LessonAsset.size_bytes, kept by api.utils_quota (recompute_storage_usage fixes drift)
+    storage_used_bytes  = models.BigIntegerField(default=0)
+    storage_quota_bytes = models.BigIntegerField(default=0)   # 0 = unlimited
     def __str__(self): return f"{self.name} ({self.type})"
 
 class OrgMembership(models.Model):
@@ -18,3 +18,17 @@ class IsOrgMemberOrPreviewReadOnly(BasePermission):
         org = getattr(request, "org", None)
         return bool(user and user.is_authenticated and org and
                     user.orgmembership.filter(org=org).exists())
+
+
+class IsOrgMember(BasePermission):
+    """
+    Authenticated user + request.org (X-Org-ID) + membership in that org.
+    """
+    message = "Org membership required (set X-Org-ID header)."
+
+    def has_permission(self, request, view):
+        from .models import OrgMembership
+        user = request.user
+        org = getattr(request, "org", None)
+        return bool(user and user.is_authenticated and org and
+                    OrgMembership.objects.filter(org=org, user=user).exists())